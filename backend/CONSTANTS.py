@@ -16,6 +16,8 @@ from PROMPTS import (
 )
 
 DEEP_DIVE = False
+# max tokens of person["insights"] (linkedin + internet content + twitter) fed into drafting prompts
+INSIGHTS_TOKEN_BUDGET = 1500
 
 load_dotenv()
 
@@ -27,6 +29,51 @@ EDGE_USER_DATA_DIR = os.getenv("EDGE_USER_DATA_DIR")
 EDGE_PROFILE_DIRECTORY = os.getenv("EDGE_PROFILE_DIRECTORY")
 RESUME_PATH = os.getenv("RESUME_PATH")
 CHATGPT_URL = os.getenv("CHATGPT_URL")
+# record every page the browser context loads into data/recordings/<PAGE_RECORDING> (see utils/page_recorder.py)
+PAGE_RECORDING = os.getenv("PAGE_RECORDING")
+# seconds a raw page snapshot is served from data/snapshots before the url is navigated again
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", "3600"))
+# max number of linkedin pages loading at once, across all scrapes
+LINKEDIN_CONCURRENCY = int(os.getenv("LINKEDIN_CONCURRENCY", "4"))
+# people-tab searches hold their page for the whole scroll, so they get their own slots instead of
+# starving profile fetches out of LINKEDIN_CONCURRENCY
+LINKEDIN_SEARCH_CONCURRENCY = int(os.getenv("LINKEDIN_SEARCH_CONCURRENCY", "2"))
+# summarize / classify a company's profiles through the OpenAI Batch API instead of live requests,
+# half the price but results take up to 24h (python -m tools.linkedin collect <domain> picks them up)
+LINKEDIN_OFFLINE_BATCH = os.getenv("LINKEDIN_OFFLINE_BATCH", "false").lower() in ("1", "true", "yes")
+# stop crawling a company's people tab once this many unique profiles have been found
+EMPLOYEE_TARGET_COUNT = int(os.getenv("EMPLOYEE_TARGET_COUNT", "50"))
+# proxycurl api backend for linkedin profiles, point PROXYCURL_BASE_URL at a local mock server for testing
+PROXYCURL_BASE_URL = os.getenv("PROXYCURL_BASE_URL") or "https://nubela.co/proxycurl"
+PROXYCURL_CONCURRENCY = int(os.getenv("PROXYCURL_CONCURRENCY", "8"))
+PROXYCURL_CACHE_TTL = int(os.getenv("PROXYCURL_CACHE_TTL", str(7 * 24 * 3600)))
+# only email this many of the most likely address permutations per person (see tools/email_patterns.py)
+EMAIL_TOP_K = int(os.getenv("EMAIL_TOP_K", "3"))
+# check permutations against the domain's mail server (MX + SMTP RCPT) before sending, needs
+# dnspython and outbound port 25 (see tools/email_verify.py)
+EMAIL_VERIFY = os.getenv("EMAIL_VERIFY", "false").lower() in ("1", "true", "yes")
+EMAIL_VERIFY_CONCURRENCY = int(os.getenv("EMAIL_VERIFY_CONCURRENCY", "5"))
+EMAIL_VERIFY_TIMEOUT = float(os.getenv("EMAIL_VERIFY_TIMEOUT", "10"))
+# empty is the null sender (MAIL FROM:<>), empty HELO uses this machine's hostname
+EMAIL_VERIFY_FROM = os.getenv("EMAIL_VERIFY_FROM", "")
+EMAIL_VERIFY_HELO = os.getenv("EMAIL_VERIFY_HELO") or None
+# how emails go out: "gmail-ui" drives the logged-in Gmail tab, "smtp" sends over pooled SMTP
+# connections (see tools/email_transport.py), for Gmail use smtp.gmail.com with an app password
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "gmail-ui").lower()
+SMTP_HOST = os.getenv("SMTP_HOST") or "smtp.gmail.com"
+SMTP_PORT = int(os.getenv("SMTP_PORT") or "587")
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", "")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE") or "3")
+# seconds before a scraped linkedin section is stale and gets re-fetched on the next scrape
+LINKEDIN_SECTION_TTL = {
+    "profile": 7 * 24 * 3600,
+    "experience": 14 * 24 * 3600,
+    "education": 30 * 24 * 3600,
+    "posts": 2 * 24 * 3600,
+}
 
 
 @total_ordering
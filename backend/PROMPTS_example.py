@@ -43,6 +43,7 @@ example_dms = [
 ]
 
 # -- Multi-step cold email prompting flow, this is for the method that doesn't use chatgpt.com and instead uses a series of GPT prompts in a way that is logically structured and tries to minimize the number of tokens / credits used --
+# -- {{placeholders}} are filled by utils/prompt_assembly.assemble, which sends them after the static text (background, examples) so the provider can cache that part across recipients --
 COLD_EMAIL_PROMPTS = [
     f"""
     You are helping a technical college student land an internship at {{company}} via cold outreach.
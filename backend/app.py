@@ -5,17 +5,30 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import asyncio
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
+from tools.email_transport import close_transport
 from tools.linkedin import get_employees
+from tools.proxycurl import close_client
+from utils.llm_scheduler import get_llm_metrics
+from utils.local_model import LOCAL_MODEL_PRELOAD, local_model
+from utils.model_router import router
+from utils.outbox import outbox
+from utils.page_pool import close_page_pools
 from utils.person_cache import get_person_data, get_records
+from utils.prompt_cache import get_prompt_cache_stats
+from utils.semantic_cache import get_semantic_cache_stats
+from utils.telemetry import llm_report
 from person_processor import (
     generate_email,
     initialize_globals,
     parse_text_with_gpt,
+    queue_messages,
     scrape_person,
-    send_messages,
+    start_outbox,
 )
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -40,12 +53,21 @@ async def lifespan(app: FastAPI):
         # print("Browser initialized successfully")
         global b, context
         b, context = await initialize_globals()
+        # deliver whatever was approved but not yet sent, including before a restart
+        start_outbox()
+        if LOCAL_MODEL_PRELOAD:
+            # warm the local model in the background so the first local prompt doesn't pay for it
+            asyncio.create_task(local_model.start())
         yield  # This yields control back to FastAPI
     except Exception as e:
         print(f"Error initializing browser: {e}")
         raise
     finally:
         # Cleanup on shutdown
+        await outbox.stop()
+        await close_page_pools()
+        await close_client()
+        await close_transport()
         print("Done")
 
 app = FastAPI(lifespan=lifespan)
@@ -74,6 +96,44 @@ async def generate_content(text: TextRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/generate-person-content-stream")
+async def generate_content_stream(text: TextRequest):
+    """
+    Same as /api/generate-person-content but drafts through the API and streams newline-delimited
+    JSON events: {"type": "status"}, {"type": "token"} for each piece of the email as it's written,
+    then {"type": "person"} with the finished record (or {"type": "error"}).
+    """
+    events = asyncio.Queue()
+
+    async def on_token(delta):
+        await events.put({"type": "token", "text": delta})
+
+    async def run():
+        try:
+            await events.put({"type": "status", "message": "parsing"})
+            person_data = await parse_text_with_gpt(text.text)
+            await events.put({"type": "status", "message": "scraping"})
+            person = await scrape_person(person_data)
+            await events.put({"type": "status", "message": "drafting"})
+            await generate_email(person, method="gpt-api", on_token=on_token)
+            await events.put({"type": "person", "person": person})
+        except Exception as e:
+            traceback.print_exc()
+            await events.put({"type": "error", "detail": str(e)})
+        finally:
+            await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield json.dumps(event) + "\n"
+        finally:
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.post("/api/send-person")
 async def send_person(person_request: PersonRequest):
     try:
@@ -81,8 +141,10 @@ async def send_person(person_request: PersonRequest):
         person_record = get_person_data(person.get("domain", None), person.get("name", None))
         # update person_record with new data from person
         person_record.update(person)
-        await send_messages(person_record)
-        return person_record
+        # sent in the background under the outbox's rate limits, the frontend polls /api/outbox
+        # for the queued ids (email_sent / twitter_message_sent are only set once delivered)
+        queued = queue_messages(person_record)
+        return {**person_record, "queued": queued}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
@@ -96,6 +158,29 @@ async def get_company_people(companyRequest: CompanyRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/llm-metrics")
+async def llm_metrics():
+    return {
+        "scheduler": get_llm_metrics(),
+        "prompt_cache": get_prompt_cache_stats(),
+        "semantic_cache": get_semantic_cache_stats(),
+        "local_model": local_model.get_stats(),
+        "model_router": router.get_stats(),
+    }
+
+@app.get("/api/llm-telemetry")
+async def llm_telemetry(by: str = "call_site", since_hours: float = None):
+    """LLM calls, tokens, cost and latency aggregated by call_site, person or model"""
+    try:
+        return llm_report(by, since_hours)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/outbox")
+async def get_outbox(domain: str = None, name: str = None, limit: int = 100):
+    """Queued / sent / failed messages, optionally for one person, and counts per channel"""
+    return {"stats": outbox.get_stats(), "messages": outbox.get_messages(domain, name, limit)}
+
 # # run the damn app
 # if __name__ == "__main__":
 #     import uvicorn
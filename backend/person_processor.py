@@ -3,19 +3,30 @@ from typing import Any, Dict
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 
-from CONSTANTS import CHATGPT_URL, DEEP_DIVE
+from CONSTANTS import CHATGPT_URL, DEEP_DIVE, EMAIL_TRANSPORT, INSIGHTS_TOKEN_BUDGET, PAGE_RECORDING
 
 load_dotenv()
 import argparse
 import asyncio
-from tools.linkedin import scrape_linkedin_profile
-from tools.twitter import scrape_twitter_posts, send_twitter_dm
+from tools.linkedin import (
+    needs_linkedin_summary,
+    scrape_linkedin_profile,
+    stale_linkedin_sections,
+)
+from tools.twitter import format_tweets, scrape_twitter_posts, send_twitter_dm
 from tools.osint import crawl_person
-from tools.email import craft_messages, find_all_permutation_emails, send_gmail
-from utils.person_cache import get_person_data, make_auto_caching
+from tools.email import craft_messages, find_all_permutation_emails, send_gmail, send_gmail_many
+from tools.email_patterns import record_email_evidence
+from tools.email_transport import get_transport
+from utils.lead_parser import extract_lead_fields
+from utils.outbox import Undeliverable, outbox
+from utils.page_pool import close_page_pools
+from utils.page_recorder import attach_recorder
+from utils.person_cache import get_person_data, make_auto_caching, update_person_data
 from browser_use import Browser, BrowserConfig
 
 from utils.prompter import prompt
+from utils.token_budget import build_insights
 import json
 import tempfile
 import os
@@ -52,25 +63,41 @@ Example output:
     "notes": "Met at MIT hackathon\nWorking on LLM agents\nPreviously at Google Brain"
 }
 
-Text to parse:
-"""
+Only these fields are needed, leave out the rest:"""
 
 
 async def parse_text_with_gpt(text: str) -> Dict[str, Any]:
-    """Use GPT to parse text into structured info"""
+    """
+    Parse text into structured info. Urls, handles, the domain and an obvious name are read off
+    the text locally, GPT is only asked about the fields that are missing or ambiguous
+    """
+    person_data, unresolved = extract_lead_fields(text)
+    if not unresolved:
+        return person_data
+
+    print(f"Asking GPT for {', '.join(unresolved)}")
     response = await prompt(
-        system_prompt=PARSE_PROMPT,
+        system_prompt=f"{PARSE_PROMPT} {', '.join(unresolved)}",
         user_prompt=text,
-        model="gpt-3.5-turbo",
+        task="extract",
         provider="openai",
+        call_site="parse_text",
+        json_mode=True,
     )
-
     try:
-        return json.loads(response)
+        parsed = json.loads(response)
     except json.JSONDecodeError as e:
+        # truncated or refused, keep what could be read off the text
         print(f"Error parsing GPT response: {e}")
         print("GPT response:", response)
-        return {}
+        return person_data
+    if not isinstance(parsed, dict):
+        print("GPT response:", response)
+        return person_data
+    for field in unresolved:
+        if parsed.get(field):
+            person_data[field] = parsed[field]
+    return person_data
 
 
 async def edit_message(message: str) -> str:
@@ -118,7 +145,8 @@ async def scrape_person(person_data):
     else:
         person = make_auto_caching(person_data.get("domain"), person)
 
-    if person.get("linkedin_summary") is None:
+    # re-scrapes only re-fetch stale sections and only re-summarize if something changed
+    if stale_linkedin_sections(person) or needs_linkedin_summary(person):
         await scrape_linkedin_profile(person, page=page)
 
     print(person)
@@ -128,43 +156,63 @@ async def scrape_person(person_data):
     if person_data.get("notes"):
         person["notes"] = person_data.get("notes")
 
-    person["insights"] = f"LinkedIn: {person['linkedin_summary']}"
-
     if DEEP_DIVE:
         # updates person["insights"], person["internet_content"], and person["twitter_summary"] with internet content
         await crawl_person(browser, context, person["domain"], person)
     else:
         # no deep dive but still scrape twitter if twitter handle was provided
+        twitter_summary = None
         if person.get("twitter_handle"):
             page = await context.new_page()
-            person["twitter_summary"] = await scrape_twitter_posts(
+            person["twitter_summary"] = twitter_summary = await scrape_twitter_posts(
                 person["twitter_handle"], browser=browser, page=page
             )
-            person["insights"] += f"\n\nTwitter: {person['twitter_summary']}"
             await page.close()
 
+        # keep the drafting prompt a predictable size however much we scraped
+        person["insights"] = build_insights(
+            {
+                "LinkedIn": person.get("linkedin_summary"),
+                "Twitter": format_tweets(twitter_summary),
+            },
+            INSIGHTS_TOKEN_BUDGET,
+            separator="\n\n",
+        )
+
     return person
 
 
-async def generate_email(person: dict):
+async def generate_email(person: dict, method="playwright-gpt", on_token=None):
     # Compile insights
     if person.get("email") is None:
-        # Draft message using ChatGPT (or switch to API if you want)
-        page = await context.new_page()
-        await page.goto(CHATGPT_URL)
-        await craft_messages(
-            browser,
-            context,
-            page,
-            person["domain"],
-            person,
-            notes=person.get("notes", ""),
-        )
-        await page.close()
+        if method == "playwright-gpt":
+            # Draft message using ChatGPT (or switch to API if you want)
+            page = await context.new_page()
+            await page.goto(CHATGPT_URL)
+            await craft_messages(
+                browser,
+                context,
+                page,
+                person["domain"],
+                person,
+                notes=person.get("notes", ""),
+            )
+            await page.close()
+        else:
+            await craft_messages(
+                browser,
+                context,
+                None,
+                person["domain"],
+                person,
+                method=method,
+                notes=person.get("notes", ""),
+                on_token=on_token,
+            )
 
     # Optional: email permutations
     person["possible_emails"] = await find_all_permutation_emails(
-        person["name"], person["domain"]
+        person["name"], person["domain"], person=person
     )
 
     # print("\n📧 POSSIBLE EMAILS:")
@@ -177,24 +225,25 @@ async def generate_email(person: dict):
 
 
 async def send_messages(person):
-    gmail_page = await context.new_page()
-    await gmail_page.goto("https://mail.google.com/mail/u/0/#inbox")
-
     if person.get("email_sent", None) is None:
         person["email_sent"] = []
 
-    for email in person["possible_emails"]:
+    unsent = [e for e in person["possible_emails"] if e not in person["email_sent"]]
+    if unsent and person.get("email2"):
+        # smtp doesn't need the gmail tab
+        gmail_page = None
+        if EMAIL_TRANSPORT != "smtp":
+            gmail_page = await context.new_page()
+            await gmail_page.goto("https://mail.google.com/mail/u/0/#inbox")
         try:
-            if email not in person["email_sent"]:
-                if person.get("email2"):
-                    status = await send_gmail(email, person["email2"], gmail_page)
-                    if status:
-                        print(f"Email sent to {email}, should be appending to list")
-                        person["email_sent"] = person["email_sent"] + [email]
-
+            sent = await send_gmail_many(unsent, person["email2"], gmail_page)
+            person["email_sent"] = person["email_sent"] + [e for e in unsent if sent[e]]
+            refused = [e for e in unsent if not sent[e] and e in get_transport().refused]
+            record_email_evidence(person, bounced=refused)
         except Exception as e:
-            print(f"Error sending email {email}: {e}")
-    await gmail_page.close()
+            print(f"Error sending emails to {', '.join(unsent)}: {e}")
+        if gmail_page is not None:
+            await gmail_page.close()
 
     if person.get("twitter_handle") and person.get("twitter_message"):
         twitter_page = await context.new_page()
@@ -212,6 +261,94 @@ async def send_messages(person):
         await twitter_page.close()
 
 
+
+def queue_messages(person) -> list:
+    """
+    Put the person's approved email (one per unsent permutation) and twitter DM in the outbox,
+    the dispatcher sends them later. Returns the ids of the newly queued messages.
+    """
+    queued = []
+    unsent = [e for e in person.get("possible_emails") or [] if e not in (person.get("email_sent") or [])]
+    if unsent and person.get("email2"):
+        # over smtp every permutation is compiled up front, sharing one encoded resume
+        compiled = get_transport().compile(unsent, person["email2"]) if EMAIL_TRANSPORT == "smtp" else {}
+        for email in unsent:
+            queued.append(
+                outbox.enqueue(
+                    "email",
+                    email,
+                    {"email_data": person["email2"]},
+                    person.get("domain"),
+                    person["name"],
+                    mime=compiled.get(email),
+                )
+            )
+    if person.get("twitter_handle") and person.get("twitter_message") and not person.get("twitter_message_sent"):
+        queued.append(
+            outbox.enqueue(
+                "twitter_dm",
+                person["twitter_handle"],
+                {"message": person["twitter_message"]},
+                person.get("domain"),
+                person["name"],
+            )
+        )
+    return [message_id for message_id in queued if message_id is not None]
+
+
+_gmail_page = None
+
+
+async def _send_outbox_email(email, payload) -> bool:
+    global _gmail_page
+    if EMAIL_TRANSPORT == "smtp":
+        transport = get_transport()
+        if payload.get("mime") is not None:
+            ok = await transport.send_compiled(email, payload["mime"])
+        else:
+            ok = await send_gmail(email, payload["email_data"])
+        if not ok and email in transport.refused:
+            raise Undeliverable(f"{email} was refused")
+        return ok
+    # one gmail tab for the whole outbox, reopened if it got closed
+    if _gmail_page is None or _gmail_page.is_closed():
+        _gmail_page = await context.new_page()
+        await _gmail_page.goto("https://mail.google.com/mail/u/0/#inbox")
+    return await send_gmail(email, payload["email_data"], _gmail_page)
+
+
+async def _send_outbox_dm(handle, payload) -> bool:
+    twitter_page = await context.new_page()
+    try:
+        await twitter_page.goto("https://x.com/messages")
+        return await send_twitter_dm(handle, payload["message"], twitter_page)
+    finally:
+        await twitter_page.close()
+
+
+def _record_email_sent(row):
+    person = get_person_data(row["domain"], row["person"])
+    if person is not None and row["recipient"] not in (person.get("email_sent") or []):
+        person["email_sent"] = (person.get("email_sent") or []) + [row["recipient"]]
+
+
+def _record_email_failed(row):
+    # refused addresses are a bounce for the domain's pattern learning, other failures say nothing
+    person = get_person_data(row["domain"], row["person"])
+    if person is not None and (row["error"] or "").startswith("undeliverable"):
+        record_email_evidence(person, bounced=[row["recipient"]])
+
+
+def _record_dm_sent(row):
+    update_person_data(row["domain"], row["person"], {"twitter_message_sent": True})
+
+
+def start_outbox():
+    """Start delivering queued messages, needs initialize_globals() first for the browser"""
+    outbox.register("email", _send_outbox_email, on_sent=_record_email_sent, on_failed=_record_email_failed)
+    outbox.register("twitter_dm", _send_outbox_dm, on_sent=_record_dm_sent)
+    outbox.start()
+
 async def run(person_data):
     # this first func returns the person obj
     person = await scrape_person(person_data)
@@ -234,6 +371,8 @@ async def initialize_globals():
     global b, context
     b = await browser.get_playwright_browser()
     context = b.contexts[0]
+    if PAGE_RECORDING:
+        await attach_recorder(context, PAGE_RECORDING, mode="record")
     return b, context
 
 
@@ -296,7 +435,10 @@ Met at hackathon, interested in LLMs""",
     print(json.dumps(person_data, indent=2))
 
     # Continue with processing...
-    await run(person_data)
+    try:
+        await run(person_data)
+    finally:
+        await close_page_pools()
 
 
 # if running this file standalone on the backend
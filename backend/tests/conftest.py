@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# the backend uses flat imports (from CONSTANTS import ...), same as running from backend/
+sys.path.insert(0, BACKEND_DIR)
+
+# the openai client wants a key at import, nothing in the tests reaches the real api
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+# PROMPTS.py is personal and not checked in, fall back to the example (plus the one name it lacks)
+try:
+    import PROMPTS  # noqa: F401
+except ImportError:
+    PROMPTS = sys.modules["PROMPTS"] = importlib.import_module("PROMPTS_example")
+    PROMPTS.__dict__.setdefault("MY_UNIVERSITY", "stanford")
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Every test runs in its own directory, so data/ (caches, snapshots, recordings) starts empty"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "data"
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion, the tests are plain functions"""
+    return lambda coroutine: asyncio.run(coroutine)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fixture_text(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def write_recording(name: str, pages: dict):
+    """
+    A recording in the layout utils/page_recorder.py writes, url -> html (or a list of html for a
+    url served several times), under data/recordings/<name> of the current directory
+    """
+    from utils.page_recorder import PageRecorder, _request_key
+
+    recorder = PageRecorder(name)
+    os.makedirs(recorder.bodies_dir, exist_ok=True)
+    with open(recorder.index_path, "a") as index:
+        for url, bodies in pages.items():
+            for html in [bodies] if isinstance(bodies, str) else bodies:
+                body = html.encode()
+                body_hash = hashlib.sha256(body).hexdigest()
+                with open(os.path.join(recorder.bodies_dir, body_hash), "wb") as f:
+                    f.write(body)
+                entry = {
+                    "key": _request_key("GET", url),
+                    "method": "GET",
+                    "url": url,
+                    "resource_type": "document",
+                    "status": 200,
+                    "headers": {"content-type": "text/html; charset=utf-8"},
+                    "body": body_hash,
+                    "recorded_at": time.time(),
+                }
+                index.write(json.dumps(entry) + "\n")
+    return recorder
@@ -0,0 +1,77 @@
+from tools.email_patterns import (
+    PATTERNS,
+    labeled_permutations,
+    learn_domain_patterns,
+    local_parts,
+    pattern_of,
+    rank_company_emails,
+    rank_emails,
+    record_email_evidence,
+)
+from utils.person_cache import cache_person_data
+
+
+def test_local_parts():
+    parts = local_parts("Gerardo San Jose III")
+    assert parts["first.last"] == "gerardo.jose"
+    assert parts["firstmiddlelast"] == "gerardosanjose"
+    assert list(parts) == [label for label in PATTERNS if label in parts]
+
+
+def test_single_word_names_only_get_the_first_name():
+    assert local_parts("Cher") == {"first": "cher"}
+    assert labeled_permutations("Cher", "x.com") == [("first", "cher@x.com")]
+
+
+def test_duplicate_local_parts_keep_the_first_pattern():
+    parts = local_parts("Al Al")
+    assert len(set(parts.values())) == len(parts)
+    assert parts["first"] == "al" and "last" not in parts
+
+
+def test_pattern_of():
+    assert pattern_of("J.Zhang@decagon.ai", "Jesse Zhang") == "f.last"
+    assert pattern_of("ceo@decagon.ai", "Jesse Zhang") is None
+
+
+def test_unknown_domain_ranks_by_priors():
+    assert rank_emails(["Jesse Zhang"], "x.com", top_k=2, persons=[]) == [["jesse.zhang@x.com", "jesse@x.com"]]
+
+
+def test_confirmed_addresses_teach_the_domain_format():
+    persons = [
+        {"name": "Ashwin Sreenivas", "email_confirmed": ["asreenivas@x.com"]},
+        {"name": "Bihan Jiang", "email_confirmed": ["bjiang@x.com"]},
+    ]
+    assert rank_emails(["Jesse Zhang"], "x.com", top_k=1, persons=persons) == [["jzhang@x.com"]]
+
+
+def test_bounces_count_against_a_format_and_sends_count_for_nothing():
+    persons = [
+        {"name": "Ashwin Sreenivas", "email_bounced": ["ashwin.sreenivas@x.com"]},
+        {"name": "Bihan Jiang", "email_bounced": ["bihan.jiang@x.com"], "email_sent": ["bihan.jiang@x.com"]},
+    ]
+    scores = learn_domain_patterns("x.com", persons)
+    assert scores.argmax() != PATTERNS.index("first.last")
+    assert rank_emails(["Jesse Zhang"], "x.com", top_k=1, persons=persons) == [["jesse@x.com"]]
+
+    # what we sent ourselves isn't evidence either way
+    sent_only = [{"name": "Bihan Jiang", "email_sent": ["bjiang@x.com"]}]
+    assert (learn_domain_patterns("x.com", sent_only) == learn_domain_patterns("x.com", [])).all()
+
+
+def test_a_bounce_overrides_an_earlier_confirmation():
+    person = {"name": "Bihan Jiang"}
+    record_email_evidence(person, confirmed=["bjiang@x.com"])
+    record_email_evidence(person, confirmed=["bjiang@x.com"], bounced=["bjiang@x.com"])
+    assert person == {"name": "Bihan Jiang", "email_confirmed": ["bjiang@x.com"], "email_bounced": ["bjiang@x.com"]}
+    assert learn_domain_patterns("x.com", [person])[PATTERNS.index("flast")] < learn_domain_patterns("x.com", [])[
+        PATTERNS.index("flast")
+    ]
+
+
+def test_ranking_learns_from_the_person_cache():
+    cache_person_data("x.com", {"name": "Ashwin Sreenivas", "email_confirmed": ["ashwins@x.com"]})
+    cache_person_data("x.com", {"name": "Bihan Jiang", "email_confirmed": ["bihanj@x.com"]})
+    persons = rank_company_emails("x.com", [{"name": "Jesse Zhang"}, {"profile_link": "no name yet"}], top_k=2)
+    assert [p["possible_emails"] for p in persons] == [["jessez@x.com", "jesse.zhang@x.com"]]
@@ -0,0 +1,147 @@
+import email
+from email.policy import default
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from conftest import free_port
+from tools import email_transport
+from tools.email_transport import SmtpTransport, compile_messages
+
+SENDER = "me@example.com"
+EMAIL = {"subject": "Hello", "body": "Hi there,\nquick question."}
+
+
+class Inbox:
+    """aiosmtpd handler that keeps what it receives and refuses anything at nobody@"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("nobody@"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, email.message_from_bytes(envelope.content, policy=default)))
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_server():
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+
+@pytest.fixture(autouse=True)
+def no_notifications(monkeypatch):
+    monkeypatch.setattr(email_transport, "notify_user", lambda *args, **kwargs: None)
+
+
+def make_transport(controller, pool_size=2):
+    return SmtpTransport(
+        host=controller.hostname, port=controller.port, user=SENDER, password="", starttls=False, pool_size=pool_size
+    )
+
+
+def test_compile_messages_headers_per_address(tmp_path):
+    resume = tmp_path / "resume.pdf"
+    resume.write_bytes(b"%PDF-1.4 not really a pdf")
+    compiled = compile_messages(SENDER, ["a@x.com", "b@x.com"], "Hello\nHi there", str(resume))
+
+    messages = {address: email.message_from_bytes(data, policy=default) for address, data in compiled.items()}
+    assert [m["To"] for m in messages.values()] == ["a@x.com", "b@x.com"]
+    assert messages["a@x.com"]["Message-ID"] != messages["b@x.com"]["Message-ID"]
+    assert messages["a@x.com"]["Message-ID"].endswith("@example.com>")
+    for message in messages.values():
+        assert message["Date"] and message["Subject"] == "Hello"
+        attachment = next(message.iter_attachments())
+        assert attachment.get_filename() == "resume.pdf"
+        assert attachment.get_content() == b"%PDF-1.4 not really a pdf"
+
+
+def test_compile_messages_non_ascii_address():
+    compiled = compile_messages(SENDER, ["zoë@x.com", "a@x.com"], EMAIL, attachment_path=None)
+    messages = {address: email.message_from_bytes(data, policy=default) for address, data in compiled.items()}
+    assert messages["a@x.com"]["To"] == "a@x.com"
+    assert messages["zoë@x.com"]["Message-ID"] != messages["a@x.com"]["Message-ID"]
+    assert len(messages["zoë@x.com"].get_all("Date")) == 1
+
+
+def test_send_many_delivers_one_message_per_address(smtp_server, run):
+    controller, inbox = smtp_server
+    transport = make_transport(controller)
+    addresses = ["a@x.com", "b@x.com", "c@x.com", "a@x.com"]
+
+    async def send():
+        try:
+            return await transport.send_many(addresses, EMAIL)
+        finally:
+            await transport.close()
+
+    results = run(send())
+    assert results == {"a@x.com": True, "b@x.com": True, "c@x.com": True}
+    assert sorted(rcpts[0] for rcpts, _ in inbox.messages) == ["a@x.com", "b@x.com", "c@x.com"]
+    assert all(rcpts == [message["To"]] for rcpts, message in inbox.messages)
+    # connections are reused, never more than the pool
+    assert transport.stats["connections"] <= 2
+    assert transport.stats["sent"] == 3
+
+
+def test_refused_address_is_remembered(smtp_server, run):
+    controller, inbox = smtp_server
+    transport = make_transport(controller, pool_size=1)
+
+    async def send():
+        try:
+            return await transport.send_many(["nobody@x.com", "a@x.com"], EMAIL)
+        finally:
+            await transport.close()
+
+    assert run(send()) == {"nobody@x.com": False, "a@x.com": True}
+    assert transport.refused == {"nobody@x.com"}
+    # the refusal didn't cost the connection
+    assert transport.stats["connections"] == 1
+
+
+def test_reconnects_when_the_server_dropped_the_connection(smtp_server, run):
+    controller, inbox = smtp_server
+    transport = make_transport(controller, pool_size=1)
+
+    async def send():
+        try:
+            assert await transport.send("a@x.com", EMAIL)
+            # the idle pooled connection goes away
+            smtp = transport._pool.get_nowait()
+            smtp.close()
+            transport._pool.put_nowait(smtp)
+            return await transport.send("b@x.com", EMAIL)
+        finally:
+            await transport.close()
+
+    assert run(send())
+    assert transport.stats["reconnects"] == 1
+    assert [rcpts for rcpts, _ in inbox.messages] == [["a@x.com"], ["b@x.com"]]
+
+
+def test_failed_reconnect_gives_the_slot_back(smtp_server, run):
+    controller, inbox = smtp_server
+    transport = make_transport(controller, pool_size=1)
+
+    async def send():
+        assert await transport.send("a@x.com", EMAIL)
+        smtp = transport._pool.get_nowait()
+        smtp.close()
+        transport._pool.put_nowait(smtp)
+        # nothing listens there, so the reconnect fails too
+        transport.port = free_port()
+        return await transport.send("b@x.com", EMAIL)
+
+    assert run(send()) is False
+    assert transport._opened == 0 and transport._pool.empty()
+    assert transport.stats["failed"] == 1
@@ -0,0 +1,127 @@
+import pytest
+from aiosmtpd.controller import Controller
+
+from conftest import free_port
+from tools.email_verify import CATCH_ALL, INVALID, UNKNOWN, VALID, EmailVerifier, SmtpProber
+
+
+class FakeResolver:
+    def __init__(self, hosts=("mx.x.com",), error=None):
+        self.hosts = list(hosts)
+        self.error = error
+        self.lookups = 0
+
+    async def mx_hosts(self, domain):
+        self.lookups += 1
+        if self.error is not None:
+            raise self.error
+        return self.hosts
+
+
+class FakeProber:
+    """RCPT codes from a dict, anything not listed gets `default` (what the canary gets)"""
+
+    def __init__(self, codes=None, default=550):
+        self.codes = codes or {}
+        self.default = default
+        self.probed = []
+
+    async def probe(self, host, addresses):
+        self.probed.append(list(addresses))
+        return {a: self.codes.get(a, self.default) for a in addresses}
+
+
+def make_verifier(tmp_path, resolver=None, prober=None):
+    return EmailVerifier(resolver or FakeResolver(), prober or FakeProber(), cache_dir=str(tmp_path / "verify"))
+
+
+def test_valid_and_invalid_are_cached(tmp_path, run):
+    prober = FakeProber({"jane@x.com": 250})
+    verifier = make_verifier(tmp_path, prober=prober)
+
+    verdicts = run(verifier.verify("x.com", ["jane@x.com", "jdoe@x.com"]))
+    assert verdicts == {"jane@x.com": VALID, "jdoe@x.com": INVALID}
+    # the canary went along in the same session
+    assert len(prober.probed) == 1 and len(prober.probed[0]) == 3
+
+    assert run(verifier.verify("x.com", ["jane@x.com", "jdoe@x.com"])) == verdicts
+    assert len(prober.probed) == 1
+    assert run(verifier.filter_deliverable("x.com", ["jdoe@x.com", "jane@x.com"])) == ["jane@x.com"]
+
+
+def test_catch_all_domain(tmp_path, run):
+    prober = FakeProber(default=250)
+    verifier = make_verifier(tmp_path, prober=prober)
+
+    assert run(verifier.verify("x.com", ["jane@x.com"])) == {"jane@x.com": CATCH_ALL}
+    # known catch-all, later addresses aren't probed at all
+    assert run(verifier.verify("x.com", ["john@x.com"])) == {"john@x.com": CATCH_ALL}
+    assert len(prober.probed) == 1
+
+
+def test_greylisted_canary_leaves_catch_all_open(tmp_path, run):
+    prober = FakeProber({"jane@x.com": 250, "jdoe@x.com": 550}, default=451)
+    verifier = make_verifier(tmp_path, prober=prober)
+
+    verdicts = run(verifier.verify("x.com", ["jane@x.com", "jdoe@x.com"]))
+    # a 250 means nothing until we know the server doesn't accept everyone
+    assert verdicts == {"jane@x.com": UNKNOWN, "jdoe@x.com": INVALID}
+    assert verifier.cache.get("catchall:x.com") is None
+
+    prober.default = 550
+    assert run(verifier.verify("x.com", ["jane@x.com"])) == {"jane@x.com": VALID}
+    assert verifier.cache.get("catchall:x.com") is False
+
+
+@pytest.mark.parametrize("error", [TimeoutError("lifetime expired"), ImportError("No module named 'dns'")])
+def test_resolver_errors_are_unknown_and_not_cached(tmp_path, run, error):
+    resolver = FakeResolver(error=error)
+    verifier = make_verifier(tmp_path, resolver=resolver)
+
+    assert run(verifier.verify("x.com", ["jane@x.com"])) == {"jane@x.com": UNKNOWN}
+    resolver.error = None
+    assert run(verifier.verify("x.com", ["jane@x.com"])) == {"jane@x.com": INVALID}
+    assert resolver.lookups == 2
+
+
+def test_domain_without_mail_servers(tmp_path, run):
+    prober = FakeProber()
+    verifier = make_verifier(tmp_path, resolver=FakeResolver(hosts=[]), prober=prober)
+
+    assert run(verifier.verify("x.com", ["jane@x.com"])) == {"jane@x.com": INVALID}
+    assert prober.probed == []
+
+
+def test_unreachable_mail_servers_are_unknown(tmp_path, run):
+    class DownProber:
+        async def probe(self, host, addresses):
+            raise ConnectionRefusedError(111, "Connection refused")
+
+    verifier = make_verifier(tmp_path, resolver=FakeResolver(hosts=["mx1.x.com", "mx2.x.com"]), prober=DownProber())
+    assert run(verifier.verify("x.com", ["jane@x.com"])) == {"jane@x.com": UNKNOWN}
+    assert verifier.cache.get("addr:jane@x.com") is None
+
+
+class Mailboxes:
+    """aiosmtpd handler that only knows a few mailboxes"""
+
+    def __init__(self, mailboxes):
+        self.mailboxes = set(mailboxes)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address not in self.mailboxes:
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+
+def test_smtp_prober_against_a_real_server(tmp_path, run):
+    controller = Controller(Mailboxes({"jane@x.com"}), hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        prober = SmtpProber(port=controller.port, timeout=5)
+        verifier = make_verifier(tmp_path, resolver=FakeResolver(hosts=["127.0.0.1"]), prober=prober)
+        verdicts = run(verifier.verify("x.com", ["jane@x.com", "jdoe@x.com"]))
+    finally:
+        controller.stop()
+    assert verdicts == {"jane@x.com": VALID, "jdoe@x.com": INVALID}
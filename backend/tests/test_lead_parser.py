@@ -0,0 +1,90 @@
+from utils.lead_parser import extract_lead_fields
+
+
+def test_full_lead_needs_no_llm():
+    fields, unresolved = extract_lead_fields(
+        "Jesse Zhang\nhttps://www.linkedin.com/in/thejessezhang/\nx.com/thejessezhang\njesse@decagon.ai\nmet at the ai dinner"
+    )
+    assert unresolved == []
+    assert fields == {
+        "linkedin": "https://www.linkedin.com/in/thejessezhang/",
+        "twitter_handle": "https://x.com/thejessezhang",
+        "domain": "decagon.ai",
+        "name": "Jesse Zhang",
+        "notes": "jesse@decagon.ai\nmet at the ai dinner",
+    }
+
+
+def test_domains_ending_in_x_are_not_twitter():
+    fields, unresolved = extract_lead_fields("Reed Hastings\nnetflix.com/careers\ndropbox.com/about")
+    assert "twitter_handle" not in fields
+    fields, unresolved = extract_lead_fields("Reed Hastings\nhttps://netflix.com/careers")
+    assert "twitter_handle" not in fields
+    assert fields["domain"] == "netflix.com"
+
+
+def test_twitter_url_forms():
+    for url in ("https://twitter.com/jesse_z", "www.x.com/jesse_z", "mobile.twitter.com/jesse_z?s=20"):
+        fields, _ = extract_lead_fields(f"Jesse Zhang\n{url}")
+        assert fields["twitter_handle"] == "https://x.com/jesse_z"
+
+
+def test_bare_handle_alone_or_next_to_the_name():
+    fields, _ = extract_lead_fields("Jesse Zhang\n@thejessezhang\ndecagon.ai")
+    assert fields["twitter_handle"] == "https://x.com/thejessezhang"
+    fields, _ = extract_lead_fields("Twitter: @thejessezhang\ndecagon.ai")
+    assert fields["twitter_handle"] == "https://x.com/thejessezhang"
+
+    fields, unresolved = extract_lead_fields("Jesse Zhang @thejessezhang\ndecagon.ai")
+    assert fields["twitter_handle"] == "https://x.com/thejessezhang"
+    assert fields["name"] == "Jesse Zhang"
+    assert unresolved == []
+
+
+def test_mentions_are_not_the_persons_handle():
+    fields, _ = extract_lead_fields("Jesse Zhang\ndecagon.ai\nmet at @ycombinator demo day")
+    assert "twitter_handle" not in fields
+    assert "met at @ycombinator demo day" in fields["notes"].splitlines()
+    # an email address isn't a handle either
+    fields, _ = extract_lead_fields("Jesse Zhang\njesse@decagon.ai")
+    assert "twitter_handle" not in fields
+
+
+def test_several_profiles_are_left_to_the_llm():
+    fields, unresolved = extract_lead_fields(
+        "Jesse Zhang\nlinkedin.com/in/thejessezhang\nlinkedin.com/in/ashwin-sreenivas\ndecagon.ai"
+    )
+    assert "linkedin" not in fields and "linkedin" in unresolved
+
+    fields, unresolved = extract_lead_fields("Jesse Zhang\nx.com/thejessezhang\n@decagon\ndecagon.ai")
+    assert "twitter_handle" not in fields and "twitter_handle" in unresolved
+
+    # the same profile twice isn't ambiguous
+    fields, unresolved = extract_lead_fields(
+        "Jesse Zhang\nhttps://x.com/TheJesseZhang\nx.com/thejessezhang/status/1\ndecagon.ai"
+    )
+    assert fields["twitter_handle"] == "https://x.com/TheJesseZhang"
+    assert unresolved == []
+
+
+def test_name_must_match_the_linkedin_slug():
+    fields, unresolved = extract_lead_fields("Stanford University\nlinkedin.com/in/thejessezhang\ndecagon.ai")
+    assert "name" not in fields and "name" in unresolved
+
+    fields, unresolved = extract_lead_fields("Head Of Sales\nJesse Zhang\nlinkedin.com/in/thejessezhang\ndecagon.ai")
+    assert fields["name"] == "Jesse Zhang"
+    assert fields["notes"].splitlines()[0] == "Head Of Sales"
+
+
+def test_competing_capitalized_lines_leave_the_name_unresolved():
+    fields, unresolved = extract_lead_fields("Jesse Zhang\nHead Of Sales\ndecagon.ai")
+    assert "name" not in fields and "name" in unresolved
+    fields, unresolved = extract_lead_fields("Jesse Zhang\ndecagon.ai")
+    assert fields["name"] == "Jesse Zhang"
+
+
+def test_domain_from_work_email_not_freemail():
+    fields, unresolved = extract_lead_fields("Jesse Zhang\njesse@gmail.com\njesse@decagon.ai")
+    assert fields["domain"] == "decagon.ai"
+    fields, unresolved = extract_lead_fields("Jesse Zhang\ndecagon.ai\nsierra.ai")
+    assert "domain" not in fields and "domain" in unresolved
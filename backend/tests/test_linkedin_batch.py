@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("browser_use")
+
+from tools import linkedin
+from utils.person_cache import cache_person_data, get_all_cached_persons
+
+DOMAIN = "example.com"
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Stand-in for the Batch API: records submitted input files, returns queued results"""
+    state = {"submitted": [], "results": {}}
+
+    async def submit_batch_file(path):
+        state["submitted"].append(path)
+        return f"batch-{len(state['submitted'])}"
+
+    async def fetch_batch_results(batch_id, output_path):
+        return state["results"].get(batch_id)
+
+    monkeypatch.setattr(linkedin, "submit_batch_file", submit_batch_file)
+    monkeypatch.setattr(linkedin, "fetch_batch_results", fetch_batch_results)
+    return state
+
+
+def _requests(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def _cache_people():
+    scraped = {"name": "Jane Doe"}
+    linkedin._store_linkedin_sections(
+        scraped, {"profile": {"name": "Jane Doe", "description": "Software Engineer at Example"}}
+    )
+    cache_person_data(DOMAIN, scraped)
+    cache_person_data(DOMAIN, {"name": "John Roe"})
+
+
+def _person(name):
+    return next(p for p in get_all_cached_persons(DOMAIN) if p["name"] == name)
+
+
+def test_summaries_then_likely_roles(run, batches):
+    _cache_people()
+
+    assert run(linkedin.submit_company_batch(DOMAIN)) == "batch-1"
+    requests = _requests(batches["submitted"][0])
+    assert [r["custom_id"] for r in requests] == ["Jane Doe"]
+    assert requests[0]["body"]["messages"][0]["content"] == linkedin.LINKEDIN_SUMMARY_PROMPT
+
+    # not done yet: nothing changes, still pending
+    assert run(linkedin.collect_company_batch(DOMAIN)) is False
+    assert "linkedin_summary" not in _person("Jane Doe")
+
+    batches["results"]["batch-1"] = {"Jane Doe": "Backend engineer at Example."}
+    assert run(linkedin.collect_company_batch(DOMAIN)) is False
+    jane = _person("Jane Doe")
+    assert jane["linkedin_summary"] == "Backend engineer at Example."
+    assert not linkedin.needs_linkedin_summary(jane)
+
+    requests = _requests(batches["submitted"][1])
+    assert [r["custom_id"] for r in requests] == ["Jane Doe"]
+    assert requests[0]["body"]["messages"][0]["content"] == linkedin.LIKELY_ROLE_PROMPT
+    assert requests[0]["body"]["messages"][1]["content"] == "Backend engineer at Example."
+
+    batches["results"]["batch-2"] = {"Jane Doe": "Backend engineer"}
+    assert run(linkedin.collect_company_batch(DOMAIN)) is True
+    assert _person("Jane Doe")["linkedin_relevant"] == "Backend engineer"
+    assert not os.path.exists(os.path.join("data", DOMAIN, "batches", "pending.json"))
+    assert run(linkedin.submit_company_batch(DOMAIN)) is None
+
+
+def test_one_batch_in_flight_and_errors_are_resubmitted(run, batches):
+    _cache_people()
+
+    assert run(linkedin.submit_company_batch(DOMAIN)) == "batch-1"
+    assert run(linkedin.submit_company_batch(DOMAIN)) is None
+    assert len(batches["submitted"]) == 1
+
+    batches["results"]["batch-1"] = {"Jane Doe": None}
+    assert run(linkedin.collect_company_batch(DOMAIN)) is False
+    assert "linkedin_summary" not in _person("Jane Doe")
+    assert [r["custom_id"] for r in _requests(batches["submitted"][1])] == ["Jane Doe"]
@@ -0,0 +1,71 @@
+import pytest
+
+from conftest import fixture_text
+from tools.linkedin_parser import LOCATION_RE, _parse_role, parse_education, parse_experience
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "San Francisco, California",
+        "San Francisco, California, United States · Hybrid",
+        "Washington, District of Columbia, United States",
+        "Greater Boston Area",
+        "San Francisco Bay Area · On-site",
+        "Remote",
+    ],
+)
+def test_location_lines(line):
+    assert LOCATION_RE.match(line)
+
+
+@pytest.mark.parametrize(
+    "line",
+    ["Leads the perception team.", "Built ML infra, Python", "Python, Go and Rust", "Skills: Python · Go"],
+)
+def test_short_description_lines_are_not_locations(line):
+    assert not LOCATION_RE.match(line)
+
+
+def test_role_without_a_location_keeps_its_description():
+    role = _parse_role(["Software Engineer", "Acme · Full-time", "Sep 2021 - Dec 2022 · 1 yr 4 mos", "Built ML infra, Python"])
+    assert (role.company, role.employment_type, role.dates, role.duration) == (
+        "Acme",
+        "Full-time",
+        "Sep 2021 - Dec 2022",
+        "1 yr 4 mos",
+    )
+    assert role.location == ""
+    assert role.description == "Built ML infra, Python"
+
+
+def test_role_with_a_location():
+    role = _parse_role(["Staff Engineer", "Jan 2023 - Present", "San Francisco, California · Hybrid", "Leads it."], company="Acme")
+    assert role.location == "San Francisco, California"
+    assert role.description == "Leads it."
+
+
+def test_parse_experience_fixture():
+    roles = parse_experience(fixture_text("linkedin_experience.html"))
+    assert [(r.company, r.role, r.location, r.description) for r in roles] == [
+        ("Acme Robotics", "Staff Engineer", "San Francisco, California", "Leads the perception team."),
+        ("Acme Robotics", "Software Engineer", "", ""),
+        ("Globex", "Intern", "", ""),
+    ]
+    assert roles[0].employment_type == "Full-time"
+
+
+def test_parse_education():
+    html = """
+    <div class="pvs-list__container"><ul>
+      <li><span aria-hidden="true">Stanford University</span><span aria-hidden="true">BS, Computer Science</span>
+          <span aria-hidden="true">2016 - 2020</span><span aria-hidden="true">Robotics club</span></li>
+    </ul></div>
+    """
+    [school] = parse_education(html)
+    assert (school.school, school.degree, school.dates, school.description) == (
+        "Stanford University",
+        "BS, Computer Science",
+        "2016 - 2020",
+        "Robotics club",
+    )
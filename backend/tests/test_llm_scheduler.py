@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from utils import prompt_cache, prompter, telemetry
+from utils.llm_scheduler import LLMScheduler, TokenBucket
+
+
+def rate_limit_error(headers=None):
+    response = httpx.Response(429, headers=headers or {}, request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+class FlakyCall:
+    """A request that fails with the given errors first, then answers"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_retries_honor_retry_after(run):
+    scheduler = LLMScheduler(max_retries=3)
+    call = FlakyCall(rate_limit_error({"retry-after-ms": "50"}), rate_limit_error({"retry-after": "0.05"}))
+
+    start = time.monotonic()
+    assert run(scheduler.run("gpt-4o", 100, call)) == "ok"
+    assert 0.1 <= time.monotonic() - start < 1
+    metrics = scheduler.get_metrics()
+    assert (call.calls, metrics["retries"], metrics["rate_limited"], metrics["in_flight"]) == (3, 2, 2, 0)
+
+
+def test_gives_up_after_max_retries(run):
+    scheduler = LLMScheduler(max_retries=1)
+    call = FlakyCall(*(rate_limit_error({"retry-after-ms": "1"}) for _ in range(3)))
+    with pytest.raises(openai.RateLimitError):
+        run(scheduler.run("gpt-4o", 100, call))
+    assert call.calls == 2 and scheduler.get_metrics()["failures"] == 1
+
+
+def test_other_errors_are_not_retried(run):
+    scheduler = LLMScheduler()
+    call = FlakyCall(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        run(scheduler.run("gpt-4o", 100, call))
+    assert call.calls == 1 and scheduler.get_metrics()["in_flight"] == 0
+
+
+def test_a_model_out_of_budget_doesnt_hold_a_slot(run):
+    scheduler = LLMScheduler(max_concurrency=1)
+    # gpt-4 has used up its requests for the minute, the next one frees up in ~60s
+    exhausted = TokenBucket(1)
+    exhausted.tokens = 0
+    scheduler.buckets["gpt-4"] = (exhausted, TokenBucket(10_000))
+
+    async def answer():
+        return "ok"
+
+    async def both():
+        waiting = asyncio.create_task(scheduler.run("gpt-4", 10, answer))
+        await asyncio.sleep(0.05)
+        try:
+            return await asyncio.wait_for(scheduler.run("gpt-4o-mini", 10, answer), timeout=1)
+        finally:
+            waiting.cancel()
+
+    assert run(both()) == "ok"
+
+
+def test_a_stream_holds_its_slot_until_read(run):
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def chunks():
+        for chunk in ("a", "b"):
+            yield chunk
+
+    async def open_stream():
+        return chunks()
+
+    async def read():
+        seen = []
+        async for chunk in scheduler.stream("gpt-4o", 10, open_stream):
+            seen.append((chunk, scheduler.metrics["in_flight"]))
+        return seen, scheduler.metrics["in_flight"]
+
+    assert run(read()) == ([("a", 1), ("b", 1)], 0)
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """/v1/chat/completions that rate limits the first request, then answers (streamed if asked)"""
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeOpenAI.requests.append(body)
+        if len(FakeOpenAI.requests) == 1:
+            self._send(429, {"error": {"message": "slow down", "type": "rate_limit"}}, {"retry-after-ms": "20"})
+            return
+        completion = {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " Hello Jane"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 2, "total_tokens": 14},
+        }
+        if not body.get("stream"):
+            self._send(200, completion)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for delta in (" Hello", " Jane"):
+            chunk = {**completion, "object": "chat.completion.chunk", "usage": None,
+                     "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        usage = {**completion, "object": "chat.completion.chunk", "choices": []}
+        self.wfile.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode())
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """prompter pointed at a local fake server, the way OPENAI_BASE_URL does it"""
+    FakeOpenAI.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    monkeypatch.setattr(prompter, "openai", AsyncOpenAI(api_key="test-key", base_url=base_url, max_retries=0))
+    monkeypatch.setattr(prompter, "scheduler", LLMScheduler())
+    monkeypatch.setattr(prompt_cache, "_cache", None)
+    monkeypatch.setattr(telemetry, "_db", None)
+    yield FakeOpenAI.requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_prompt_through_a_fake_server(fake_openai, run):
+    response = run(prompter.prompt("Greet them", "Jane Doe", model="gpt-4o", cache=False, json_mode=True))
+    assert response == "Hello Jane"
+    assert len(fake_openai) == 2 and prompter.scheduler.get_metrics()["retries"] == 1
+    assert fake_openai[-1]["response_format"] == {"type": "json_object"}
+    assert fake_openai[-1]["messages"][1] == {"role": "user", "content": "Jane Doe"}
+
+
+def test_prompt_stream_through_a_fake_server(fake_openai, run):
+    async def stream():
+        return [delta async for delta in prompter.prompt_stream("Greet them", "Jane Doe", model="gpt-4o", cache=False)]
+
+    assert run(stream()) == ["Hello", " Jane"]
+    assert fake_openai[-1]["stream"] is True
+    assert prompter.scheduler.get_metrics()["in_flight"] == 0
@@ -0,0 +1,155 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from utils import outbox as outbox_module
+from utils.outbox import FAILED, PENDING, SENDING, SENT, Outbox, Undeliverable
+
+
+@pytest.fixture
+def box(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox_module, "RETRY_BASE_S", 0)
+    return Outbox(db_path=str(tmp_path / "outbox.db"), intervals={"email": 0, "twitter_dm": 0})
+
+
+async def wait_for(box, status, count=1, timeout=5):
+    """Wait until `count` messages have `status`"""
+    for _ in range(int(timeout / 0.01)):
+        if sum(m["status"] == status for m in box.get_messages()) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"no {status} message: {box.get_messages()}")
+
+
+def test_enqueue_skips_duplicates(box):
+    assert box.enqueue("email", "a@x.com", {"subject": "Hi"}, domain="x.com", person="Jane Doe")
+    assert box.enqueue("email", "a@x.com", {"subject": "Hi"}, domain="x.com", person="Jane Doe") is None
+    assert box.enqueue("email", "b@x.com", {"subject": "Hi"}, domain="x.com", person="Jane Doe")
+    assert box.get_stats() == {"email": {PENDING: 2}}
+
+
+def test_sends_and_records_the_outcome(box, run):
+    sent, recorded = [], []
+
+    async def send(recipient, payload):
+        sent.append((recipient, payload))
+        return True
+
+    async def deliver():
+        box.register("email", send, on_sent=recorded.append)
+        box.start()
+        try:
+            box.enqueue("email", "a@x.com", {"subject": "Hi"}, person="Jane Doe", mime=b"raw message")
+            await wait_for(box, SENT)
+        finally:
+            await box.stop()
+
+    run(deliver())
+    assert sent == [("a@x.com", {"subject": "Hi", "mime": b"raw message"})]
+    assert recorded[0]["recipient"] == "a@x.com" and recorded[0]["status"] == SENT
+    # a sent message isn't queued again
+    assert box.enqueue("email", "a@x.com", {"subject": "Hi"}, person="Jane Doe") is None
+
+
+def test_failed_sends_are_retried_then_given_up(box, run, monkeypatch):
+    monkeypatch.setattr(outbox_module, "OUTBOX_MAX_ATTEMPTS", 3)
+    attempts, failed = [], []
+
+    async def send(recipient, payload):
+        attempts.append(recipient)
+        if len(attempts) == 1:
+            raise ConnectionResetError("dropped")
+        return False
+
+    async def deliver():
+        box.register("email", send, on_failed=failed.append)
+        box.start()
+        try:
+            box.enqueue("email", "a@x.com", {})
+            await wait_for(box, FAILED)
+        finally:
+            await box.stop()
+
+    run(deliver())
+    assert len(attempts) == 3
+    assert failed[0]["attempts"] == 3 and failed[0]["error"] == "send failed"
+
+
+def test_undeliverable_fails_without_retrying(box, run):
+    attempts, failed = [], []
+
+    async def send(recipient, payload):
+        attempts.append(recipient)
+        raise Undeliverable("550 no such user")
+
+    async def deliver():
+        box.register("email", send, on_failed=failed.append)
+        box.start()
+        try:
+            box.enqueue("email", "nobody@x.com", {})
+            await wait_for(box, FAILED)
+        finally:
+            await box.stop()
+
+    run(deliver())
+    assert attempts == ["nobody@x.com"]
+    assert failed[0]["error"] == "undeliverable: 550 no such user"
+    # failed messages can be queued again
+    assert box.enqueue("email", "nobody@x.com", {})
+
+
+def test_channels_dont_wait_on_each_other(box, run):
+    box.intervals = {"email": 60, "twitter_dm": 0}
+    sent = []
+
+    async def send(recipient, payload):
+        sent.append(recipient)
+        return True
+
+    async def deliver():
+        box.register("email", send)
+        box.register("twitter_dm", send)
+        box.start()
+        try:
+            box.enqueue("email", "a@x.com", {})
+            box.enqueue("email", "b@x.com", {})
+            box.enqueue("twitter_dm", "janedoe", {})
+            box.enqueue("twitter_dm", "johnroe", {})
+            await wait_for(box, SENT, count=3)
+        finally:
+            await box.stop()
+
+    run(deliver())
+    # the second email is still waiting out the email interval
+    assert sorted(sent) == ["a@x.com", "janedoe", "johnroe"]
+
+
+def test_interrupted_sends_go_out_again(box, tmp_path):
+    box.enqueue("email", "a@x.com", {})
+    assert box._claim("email")["recipient"] == "a@x.com"
+    assert box.get_stats() == {"email": {SENDING: 1}}
+    box._db.close()
+
+    reopened = Outbox(db_path=str(tmp_path / "outbox.db"))
+    assert reopened.get_stats() == {"email": {PENDING: 1}}
+
+
+def test_outbox_from_before_precompiled_messages(tmp_path):
+    db = sqlite3.connect(tmp_path / "old.db")
+    db.execute(
+        """
+        CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, recipient TEXT NOT NULL,
+            payload TEXT NOT NULL, domain TEXT, person TEXT, status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, created_at REAL NOT NULL,
+            sent_at REAL, error TEXT
+        )
+        """
+    )
+    db.commit()
+    db.close()
+
+    box = Outbox(db_path=str(tmp_path / "old.db"))
+    box.enqueue("email", "a@x.com", {}, mime=b"raw")
+    assert box.get_messages()[0]["mime"] == 3
@@ -0,0 +1,70 @@
+import pytest
+
+from utils import prompt_cache, prompter, telemetry
+from utils.prompt_cache import get_prompt_cache_stats, prompt_cache_key
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    # the cache and telemetry db live under data/ of the test's own directory
+    monkeypatch.setattr(prompt_cache, "_cache", None)
+    monkeypatch.setattr(prompt_cache, "_stats", {"hits": 0, "misses": 0})
+    monkeypatch.setattr(telemetry, "_db", None)
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    """Fake backend for prompt(), every call is answered with its call number"""
+    calls = []
+
+    async def complete(system_prompt, user_prompt, model, provider, temperature, max_tokens, json_mode=False):
+        calls.append((system_prompt, user_prompt, model, temperature))
+        return f"answer {len(calls)}", (10, 2, 0)
+
+    monkeypatch.setattr(prompter, "_complete", complete)
+    return calls
+
+
+def test_key_covers_every_parameter():
+    key = prompt_cache_key(provider="openai", model="gpt-4o", user_prompt="hi", temperature=0.3)
+    assert key == prompt_cache_key(temperature=0.3, user_prompt="hi", model="gpt-4o", provider="openai")
+    assert key != prompt_cache_key(provider="openai", model="gpt-4o", user_prompt="hi", temperature=0.7)
+
+
+def test_repeated_prompts_are_served_from_the_cache(completions, run):
+    ask = lambda **kwargs: run(prompter.prompt("Summarize", "Jane Doe, staff engineer", model="gpt-4o", **kwargs))
+
+    assert ask() == "answer 1"
+    assert ask() == "answer 1"
+    assert len(completions) == 1
+    # anything that changes the completion is a different entry
+    assert ask(temperature=0.9) == "answer 2"
+    assert ask(json_mode=True) == "answer 3"
+
+    stats = get_prompt_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 3)
+
+
+def test_uncached_prompts_always_go_out(completions, run):
+    for _ in range(2):
+        run(prompter.prompt("Write an email", "Jane Doe", model="gpt-4o", cache=False))
+    assert len(completions) == 2
+    assert get_prompt_cache_stats()["entries"] == 0
+
+
+def test_streamed_completions_are_shared_with_prompt(completions, run):
+    async def stream():
+        return [delta async for delta in prompter.prompt_stream("Summarize", "Jane Doe", provider="local")]
+
+    assert run(stream()) == ["answer 1"]
+    assert run(prompter.prompt("Summarize", "Jane Doe", provider="local")) == "answer 1"
+    assert run(stream()) == ["answer 1"]
+    assert len(completions) == 1
+
+
+def test_the_cache_survives_a_restart(completions, run, monkeypatch):
+    run(prompter.prompt("Summarize", "Jane Doe", model="gpt-4o"))
+    prompt_cache.get_prompt_cache().close()
+    monkeypatch.setattr(prompt_cache, "_cache", None)
+    assert run(prompter.prompt("Summarize", "Jane Doe", model="gpt-4o")) == "answer 1"
+    assert len(completions) == 1
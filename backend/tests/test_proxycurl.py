@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from tools import proxycurl
+from tools.proxycurl import fetch_profile, profile_to_sections
+
+JANE = {
+    "full_name": "Jane Doe",
+    "headline": "Staff Engineer at Acme Robotics",
+    "summary": "Builds planners.",
+    "experiences": [
+        {
+            "title": "Staff Engineer",
+            "company": "Acme Robotics",
+            "starts_at": {"month": 1, "year": 2023},
+            "ends_at": None,
+            "location": "San Francisco, California",
+        }
+    ],
+    "education": [{"school": "Stanford University", "degree_name": "BS", "field_of_study": "Computer Science"}],
+    "activities": [{"title": "We're hiring!"}],
+}
+
+
+class MockProxycurl(BaseHTTPRequestHandler):
+    """
+    /api/v2/linkedin?url=... answering per profile: "jane" is found, "busy" is rate limited once,
+    "slow" is rate limited once with a 1s Retry-After, "broken" sends invalid json, anything else 404s
+    """
+
+    requests = []
+
+    def do_GET(self):
+        url = parse_qs(urlparse(self.path).query)["url"][0]
+        MockProxycurl.requests.append((url, time.monotonic()))
+        seen = sum(u == url for u, _ in MockProxycurl.requests)
+        if url.endswith("/busy") and seen == 1:
+            self._send(429, b'{"error": "slow down"}', {"Retry-After": "0"})
+        elif url.endswith("/slow") and seen == 1:
+            self._send(429, b'{"error": "slow down"}', {"Retry-After": "1"})
+        elif url.endswith(("/jane", "/busy", "/slow")):
+            self._send(200, json.dumps(JANE).encode())
+        elif url.endswith("/broken"):
+            self._send(200, b"<html>maintenance</html>")
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """proxycurl pointed at a local mock, the way PROXYCURL_BASE_URL does it"""
+    MockProxycurl.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockProxycurl)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(proxycurl, "PROXYCURL_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(proxycurl, "_client", None)
+    monkeypatch.setattr(proxycurl, "_semaphore", None)
+    monkeypatch.setattr(proxycurl, "_cache", None)
+    yield MockProxycurl.requests
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(run, *links, **kwargs):
+    async def go():
+        try:
+            return await asyncio.gather(*(fetch_profile(link, **kwargs) for link in links))
+        finally:
+            await proxycurl.close_client()
+
+    return run(go())
+
+
+def test_fetch_and_cache(mock_server, run):
+    assert fetch(run, "https://www.linkedin.com/in/jane") == [JANE]
+    assert fetch(run, "https://www.linkedin.com/in/jane") == [JANE]
+    assert len(mock_server) == 1
+    assert fetch(run, "https://www.linkedin.com/in/jane", use_cache=False) == [JANE]
+    assert len(mock_server) == 2
+
+
+def test_rate_limits_are_retried_and_missing_profiles_are_not(mock_server, run):
+    assert fetch(run, "https://www.linkedin.com/in/busy", "https://www.linkedin.com/in/nobody") == [JANE, None]
+    assert [url.rsplit("/", 1)[-1] for url, _ in mock_server].count("busy") == 2
+    assert [url.rsplit("/", 1)[-1] for url, _ in mock_server].count("nobody") == 1
+
+
+def test_backing_off_doesnt_hold_a_slot(mock_server, run, monkeypatch):
+    monkeypatch.setattr(proxycurl, "PROXYCURL_CONCURRENCY", 1)
+    start = time.monotonic()
+    fetch(run, "https://www.linkedin.com/in/slow", "https://www.linkedin.com/in/jane")
+    finished = {url.rsplit("/", 1)[-1]: at - start for url, at in mock_server}
+    # jane went out while slow was waiting out its Retry-After
+    assert finished["jane"] < 0.5
+
+
+def test_profile_to_sections():
+    sections = profile_to_sections(JANE)
+    assert sections["profile"] == {
+        "name": "Jane Doe",
+        "description": "Staff Engineer at Acme Robotics",
+        "about": "Builds planners.",
+    }
+    assert sections["experience"][0]["dates"] == "1/2023 - Present"
+    assert sections["education"][0]["degree"] == "BS, Computer Science"
+    assert sections["posts"] == ["We're hiring!"]
+
+
+def test_one_bad_profile_doesnt_stop_the_company(mock_server, run, monkeypatch):
+    pytest.importorskip("browser_use")
+    from tools import linkedin
+
+    async def summarize(person):
+        if person.get("name") == "Jane Doe":
+            person["linkedin_summary"] = "Staff engineer"
+            return
+        raise KeyError("name")
+
+    monkeypatch.setattr(linkedin, "summarize_linkedin_profile", summarize)
+    profiles = [
+        {"profile_link": "https://www.linkedin.com/in/jane"},
+        {"profile_link": "https://www.linkedin.com/in/broken"},
+        {"name": "John Roe", "profile_link": "https://www.linkedin.com/in/busy"},
+    ]
+    run(linkedin.enrich_profiles(profiles))
+    assert profiles[0]["name"] == "Jane Doe" and profiles[0]["linkedin_summary"] == "Staff engineer"
+    assert "linkedin_sections" not in profiles[1]
+    assert profiles[2]["linkedin_sections"]["profile"]["text"]["name"] == "Jane Doe"
@@ -0,0 +1,139 @@
+"""
+The scrapers run against recordings (utils/page_recorder.py) in a local headless chromium, no
+logged-in browser or network needed. Needs playwright and its chromium (playwright install chromium).
+"""
+import asyncio
+import os
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from conftest import fixture_text, write_recording
+from utils.page_recorder import attach_recorder, replay_context
+
+
+@pytest.fixture(scope="module", autouse=True)
+def chromium():
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as pw:
+        if not os.path.exists(pw.chromium.executable_path):
+            pytest.skip("chromium isn't installed, run: playwright install chromium")
+
+
+def test_replay_serves_repeats_in_order_and_aborts_misses(run):
+    url = "https://example.com/feed"
+    write_recording("feed", {url: ["<p>first</p>", "<p>second</p>"]})
+
+    async def browse():
+        async with replay_context("feed") as context:
+            page = await context.new_page()
+            seen = []
+            for _ in range(3):
+                await page.goto(url)
+                seen.append(await page.inner_text("p"))
+            with pytest.raises(Exception):
+                await page.goto("https://example.com/never-recorded")
+            return seen
+
+    # the last recorded response sticks
+    assert run(browse()) == ["first", "second", "second"]
+
+
+def test_twitter_posts_from_replay(run):
+    pytest.importorskip("browser_use")
+    from tools.twitter import scrape_twitter_posts
+
+    write_recording("jane-twitter", {"https://twitter.com/janedoe": fixture_text("twitter_profile.html")})
+
+    async def scrape():
+        async with replay_context("jane-twitter") as context:
+            page = await context.new_page()
+            return await scrape_twitter_posts("https://x.com/janedoe", max_tweets=2, scroll_attempts=0, page=page)
+
+    assert run(scrape()) == ["Shipped the new planner today.", "Hiring robotics interns!"]
+
+
+class FixtureSite(BaseHTTPRequestHandler):
+    """Serves the linkedin fixtures at the paths the scrapers visit"""
+
+    pages = {
+        "/in/jane/details/experience": "linkedin_experience.html",
+        "/company/acme/people?keywords=cto": "linkedin_people.html",
+    }
+
+    def do_GET(self):
+        name = self.pages.get(self.path)
+        if name is None:
+            self.send_error(404)
+            return
+        body = fixture_text(name).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_linkedin_record_then_replay_offline(data_dir, run):
+    pytest.importorskip("browser_use")
+    from playwright.async_api import async_playwright
+
+    from tools.linkedin import _scrape_details_section, _search_people
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureSite)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async def scrape(context):
+        page = await context.new_page()
+        experience = await _scrape_details_section(page, f"{site}/in/jane", "experience")
+        found, seen = asyncio.Queue(), set()
+        await _search_people(page, f"{site}/company/acme", "cto", found, seen, target_count=10, max_scrolls=1)
+        people = [found.get_nowait() for _ in range(found.qsize())]
+        await page.close()
+        return experience, people
+
+    async def record():
+        async with async_playwright() as pw:
+            browser = await pw.chromium.launch(headless=True)
+            context = await browser.new_context()
+            await attach_recorder(context, "jane", mode="record")
+            try:
+                return await scrape(context)
+            finally:
+                await context.close()
+                await browser.close()
+
+    async def replay():
+        async with replay_context("jane") as context:
+            return await scrape(context)
+
+    try:
+        recorded = run(record())
+    finally:
+        server.shutdown()
+        server.server_close()
+    # the site is gone and the snapshot cache is cold, everything has to come from the recording
+    shutil.rmtree(data_dir / "snapshots")
+    replayed = run(replay())
+
+    assert replayed == recorded
+    experience, people = replayed
+    assert [(e["company"], e["role"], e["dates"]) for e in experience] == [
+        ("Acme Robotics", "Staff Engineer", "Jan 2023 - Present"),
+        ("Acme Robotics", "Software Engineer", "Sep 2021 - Dec 2022"),
+        ("Globex", "Intern", "Jun 2020 - Aug 2020"),
+    ]
+    assert experience[0]["location"] == "San Francisco, California"
+    assert people == [
+        {"name": "Jane Doe", "profile_link": "https://www.linkedin.com/in/jane-doe"},
+        {"name": "John Roe", "profile_link": "https://www.linkedin.com/in/john-roe"},
+    ]
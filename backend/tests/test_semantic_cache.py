@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils import prompt_cache, prompter, semantic_cache, telemetry
+from utils.semantic_cache import SEMANTIC_CACHE_DIR, SemanticIndex
+
+LEAD = "Jesse Zhang, CEO at decagon.ai, linkedin.com/in/thejessezhang, met at the ai dinner"
+OTHER_LEAD = "Jessie Zheng, CEO at decagon.ai, linkedin.com/in/jessiezheng, met at the ai dinner"
+
+
+def embed(text):
+    """Bag of words hashed into 64 dims, close texts get close vectors"""
+    vector = np.zeros(64, dtype=np.float32)
+    for word in text.lower().replace(",", " ").split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture(autouse=True)
+def semantic(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "SEMANTIC_CACHE", True)
+    monkeypatch.setattr(semantic_cache, "SEMANTIC_THRESHOLDS", {"parse_text": 0.6, "email_extract": 0.6})
+    monkeypatch.setattr(semantic_cache, "_disabled", False)
+    monkeypatch.setattr(semantic_cache, "_indexes", {})
+    monkeypatch.setattr(semantic_cache, "_stats", {"hits": 0, "misses": 0, "rejected": 0})
+    monkeypatch.setattr(semantic_cache, "_embed", embed)
+    monkeypatch.setattr(prompt_cache, "_cache", None)
+    monkeypatch.setattr(telemetry, "_db", None)
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    """Fake backend extracting the name the way parse_text would"""
+    calls = []
+
+    async def complete(system_prompt, user_prompt, model, provider, temperature, max_tokens, json_mode=False):
+        calls.append(user_prompt)
+        name = " ".join(user_prompt.split(",")[0].split())
+        return json.dumps({"name": name, "domain": "decagon.ai"}), (10, 5, 0)
+
+    monkeypatch.setattr(prompter, "_complete", complete)
+    return calls
+
+
+def parse(run, text):
+    return json.loads(run(prompter.prompt("Extract", text, model="gpt-4o", call_site="parse_text")))
+
+
+def test_near_duplicates_reuse_the_completion(completions, run):
+    assert parse(run, LEAD)["name"] == "Jesse Zhang"
+    # same lead pasted with different spacing / notes order
+    assert parse(run, LEAD.replace(", met at the ai dinner", ",  met at  the ai dinner ")) == {
+        "name": "Jesse Zhang",
+        "domain": "decagon.ai",
+    }
+    assert len(completions) == 1
+    assert semantic_cache.get_semantic_cache_stats()["hits"] == 1
+
+
+def test_a_near_duplicate_about_someone_else_is_not_reused(completions, run):
+    parse(run, LEAD)
+    assert parse(run, OTHER_LEAD)["name"] == "Jessie Zheng"
+    assert len(completions) == 2
+    assert semantic_cache.get_semantic_cache_stats()["rejected"] == 1
+
+
+def test_plain_text_completions_carrying_the_old_name_are_not_reused():
+    assert semantic_cache._same_subject(LEAD, LEAD + " ", "Hi Jesse, congrats on Decagon")
+    assert not semantic_cache._same_subject(LEAD, OTHER_LEAD, "Hi Jesse, congrats on Decagon")
+
+
+def test_missing_embedding_model_turns_the_cache_off(completions, run, monkeypatch):
+    def no_model(text):
+        raise ImportError("No module named 'sentence_transformers'")
+
+    monkeypatch.setattr(semantic_cache, "_embed", no_model)
+    assert parse(run, LEAD)["name"] == "Jesse Zhang"
+    assert parse(run, OTHER_LEAD)["name"] == "Jessie Zheng"
+    assert len(completions) == 2
+    assert not semantic_cache.semantic_cache_enabled("parse_text")
+    assert semantic_cache.get_semantic_cache_stats()["enabled"] is False
+
+
+def test_entries_are_appended_and_reloaded():
+    index = SemanticIndex("parse_text-test")
+    index.add(embed(LEAD), LEAD, "jesse")
+    vectors_size = os.path.getsize(index.vectors_path)
+    index.add(embed(OTHER_LEAD), OTHER_LEAD, "jessie")
+    assert os.path.getsize(index.vectors_path) == 2 * vectors_size
+    with open(index.entries_path) as f:
+        assert len(f.readlines()) == 2
+
+    reloaded = SemanticIndex("parse_text-test")
+    similarity, entry = reloaded.search(embed(OTHER_LEAD))
+    assert entry["response"] == "jessie" and similarity == pytest.approx(1.0)
+
+
+def test_store_is_compacted_past_the_cap(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "SEMANTIC_CACHE_MAX_ENTRIES", 4)
+    index = SemanticIndex("parse_text-test")
+    for i in range(6):
+        index.add(embed(f"lead {i}"), f"lead {i}", str(i))
+    assert [e["response"] for e in SemanticIndex("parse_text-test").entries] == ["2", "3", "4", "5"]
+
+
+def test_a_crash_between_appends_is_lined_back_up():
+    index = SemanticIndex("parse_text-test")
+    index.add(embed(LEAD), LEAD, "jesse")
+    # the vector made it to disk, its entry didn't
+    with open(index.vectors_path, "ab") as f:
+        f.write(embed("lost").tobytes())
+
+    index = SemanticIndex("parse_text-test")
+    index.add(embed(OTHER_LEAD), OTHER_LEAD, "jessie")
+    reloaded = SemanticIndex("parse_text-test")
+    assert [e["response"] for e in reloaded.entries] == ["jesse", "jessie"]
+    assert reloaded.search(embed(OTHER_LEAD))[1]["response"] == "jessie"
+
+
+def test_legacy_store_is_migrated():
+    os.makedirs(SEMANTIC_CACHE_DIR)
+    np.savez(os.path.join(SEMANTIC_CACHE_DIR, "parse_text-test.npz"), vectors=np.stack([embed(LEAD)]))
+    with open(os.path.join(SEMANTIC_CACHE_DIR, "parse_text-test.json"), "w") as f:
+        json.dump(["jesse"], f)
+
+    index = SemanticIndex("parse_text-test")
+    assert index.search(embed(LEAD))[1]["response"] == "jesse"
+    assert not os.path.exists(os.path.join(SEMANTIC_CACHE_DIR, "parse_text-test.npz"))
+    assert [e["response"] for e in SemanticIndex("parse_text-test").entries] == ["jesse"]
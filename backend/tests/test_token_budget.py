@@ -0,0 +1,44 @@
+import pytest
+
+from utils.token_budget import build_insights, compress_text, count_tokens, fit_sections
+
+LONG = " ".join(f"Sentence {i} is about robotics planners and their launch." for i in range(60))
+LONGER = " ".join(f"Tweet {i} talks about hiring interns for the perception team." for i in range(90))
+
+
+def total(sections: dict) -> int:
+    return sum(count_tokens(text) for text in sections.values() if text)
+
+
+def test_under_budget_is_untouched():
+    sections = {"LinkedIn": "Staff engineer at Acme.", "Twitter": "Shipped the planner."}
+    assert fit_sections(sections, 1000) == sections
+
+
+def test_small_sections_are_kept_and_large_ones_compressed(capsys):
+    sections = {"LinkedIn": LONG, "Twitter": LONGER, "Notes": "Met at the ai dinner."}
+    fitted = fit_sections(sections, 300)
+    assert total(fitted) <= 300
+    assert fitted["Notes"] == "Met at the ai dinner."
+    # compression keeps whole sentences of the original
+    assert all(sentence in LONG for sentence in fitted["LinkedIn"].splitlines())
+    assert "Trimmed LinkedIn, Twitter" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("budget", [0, 3, 10, 40])
+def test_tiny_budgets_are_never_exceeded(budget, capsys):
+    sections = {"LinkedIn": LONG, "Twitter": LONGER, "Notes": "x", "OSINT": "Short one."}
+    fitted = fit_sections(sections, budget)
+    assert total(fitted) <= budget
+    assert "Trimmed" in capsys.readouterr().out
+
+
+def test_compress_text_fits():
+    compressed = compress_text(LONG, 50)
+    assert count_tokens(compressed) <= 50
+    assert compress_text("Short.", 50) == "Short."
+
+
+def test_build_insights_labels_and_skips_empty():
+    insights = build_insights({"LinkedIn": "Staff engineer.", "Twitter": "", "Notes": None}, 100, separator="\n\n")
+    assert insights == "LinkedIn: Staff engineer."
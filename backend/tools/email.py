@@ -7,63 +7,56 @@ from langchain_openai import ChatOpenAI
 import pandas as pd
 from playwright.async_api import Page
 
-from CONSTANTS import COLD_EMAIL_PROMPTS, RESUME_PATH
+from CONSTANTS import COLD_EMAIL_PROMPTS, EMAIL_TOP_K, EMAIL_TRANSPORT, EMAIL_VERIFY, RESUME_PATH
 from PROMPTS import SIGNATURE
+from tools.email_patterns import labeled_permutations, rank_emails, record_email_evidence
+from tools.email_transport import get_attachment, get_transport, split_email
+from tools.email_verify import INVALID, VALID, get_verifier
 from utils.notifications import notify_user
-from utils.prompter import prompt
+from utils.prompt_assembly import assemble
+from utils.prompter import prompt, prompt_stream
 
 
 def generate_permutations(name, domain):
-    # Split name and clean up any suffixes (III, Jr., etc.)
-    name_parts = name.lower().split()
-    name_parts = [
-        part
-        for part in name_parts
-        if not part.upper() in ["II", "III", "IV", "JR", "SR", "JR.", "SR."]
-    ]
-
-    # Handle first name and remaining parts
-    first = name_parts[0]
-    last = name_parts[-1]  # Last actual surname
-
-    # Get initials
-    f = first[0]
-    l = last[0]
-
-    # For multi-word names, also get the middle part if it exists
-    middle = ""
-    if len(name_parts) > 2:
-        middle = "".join(name_parts[1:-1])
-
-    formats = [
-        f"{first}",  # gerardo
-        f"{last}",  # jose
-        f"{first}{last}",  # gerardojose
-        f"{f}{last}",  # gjose
-        f"{f}.{last}",  # g.jose
-        f"{first}{l}",  # gerardog
-        f"{f}{l}",  # gj
-    ]
-
-    # Add multi-word name variants if applicable
-    if len(name_parts) > 2:
-        formats.extend(
-            [
-                f"{first}{middle}{last}",  # gerardosanjose
-                f"{first}.{last}",  # gerardo.jose
-                f"{first}{middle[0]}{last}",  # gerardosjose
-            ]
-        )
-
-    return [f"{fmt}@{domain}" for fmt in formats]
+    # every format we know how to build for the name, see tools/email_patterns.py for the list
+    return [address for _, address in labeled_permutations(name, domain)]
 
 
 # ---------------------------- Simplified Finder ----------------------------
 
 
-async def find_all_permutation_emails(name, domain):
-    print(f"📇 Generating permutations for {name} at {domain}...")
-    return generate_permutations(name, domain)
+async def find_all_permutation_emails(name, domain, top_k=EMAIL_TOP_K, verify=EMAIL_VERIFY, person=None):
+    """
+    The top_k permutations, ranked by what we've learned about the domain's email format.
+    With verify, ones the domain's mail server rejects are dropped first, and the verdicts are
+    recorded on person (if given) for the ranking to learn from.
+    """
+    print(f"📇 Ranking permutations for {name} at {domain}...")
+    ranked = rank_emails([name], domain)[0]
+    if verify:
+        verdicts = await get_verifier().verify(domain, ranked)
+        if person is not None:
+            record_email_evidence(
+                person,
+                confirmed=[a for a in ranked if verdicts[a] == VALID],
+                bounced=[a for a in ranked if verdicts[a] == INVALID],
+            )
+        dropped = [a for a in ranked if verdicts[a] == INVALID]
+        if dropped:
+            print(f"📭 Dropping undeliverable {', '.join(dropped)}")
+        ranked = [a for a in ranked if verdicts[a] != INVALID]
+    return ranked[:top_k]
+
+
+async def _prompt_streaming(on_token, **kwargs) -> str:
+    """prompt(), but passing each delta to on_token as it arrives when there is one"""
+    if on_token is None:
+        return await prompt(**kwargs)
+    chunks = []
+    async for delta in prompt_stream(**kwargs):
+        chunks.append(delta)
+        await on_token(delta)
+    return "".join(chunks).strip()
 
 
 async def craft_messages(
@@ -75,9 +68,12 @@ async def craft_messages(
     method="playwright-gpt",
     regen=False,
     notes=None,
+    on_token=None,
 ):
     """
     Craft an email to the person.
+
+    on_token: optional async callback, gets the email text as it's generated (gpt-api only)
     """
     # we'll split into 2 steps:
     # given my background and the person's insights, generate a list of 3-5 email subjects
@@ -123,8 +119,10 @@ async def craft_messages(
             email_content = await prompt(
                 system_prompt=f"From this GPT response, extract just the email subject and body. In the past you've been exclusing the subject from the output - it usually has occurrences of \"<>\" and \"|\" in it. The first line of output should be the subject (without the words Subject or anything) and afterwards should be the body. Replace whatever signature is in the email with the following:\n{SIGNATURE}.",
                 user_prompt=email,
-                model="gpt-3.5-turbo",
+                task="extract",
                 provider="openai",
+                call_site="email_extract",
+                person=person["name"],
             )
 
             person["email"] = email_content
@@ -159,26 +157,42 @@ async def craft_messages(
     if method == "gpt-api":
         if not person.get("email") or regen:
             # Step 1: Generate email subjects. assume output is a list of phrases, each on a new line.
+            # templates are split into a static system prompt + per-person user prompt so the
+            # provider can cache the long static part across everyone we draft for
+            system_prompt, user_prompt = assemble(
+                COLD_EMAIL_PROMPTS[0],
+                company=domain,
+                name=person["name"],
+                recipient_insights=person["insights"],
+            )
             email_topics = await prompt(
-                system_prompt=COLD_EMAIL_PROMPTS[0].format(
-                    name=person["name"],
-                    company=domain,
-                    recipient_insights=person["insights"],
-                ),
-                user_prompt=person["insights"],
-                model="gpt-3.5-turbo",
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                task="summarize",
                 provider="openai",
+                # regenerating means we want a different draft, not the cached one
+                cache=not regen,
+                call_site="email_topics",
+                person=person["name"],
             )
             email_topics = email_topics.split("\n")
             print("generated email topics")
 
-            # Step 2: Generate email bodies for each subject
-            email = await prompt(
-                user_prompt=COLD_EMAIL_PROMPTS[1].format(
-                    recipient_insights=person["insights"], email_topics=email_topics
-                ),
-                model="gpt-4o",
+            # Step 2: Generate email bodies for each subject, streamed to the caller if they want it
+            system_prompt, user_prompt = assemble(
+                COLD_EMAIL_PROMPTS[1],
+                recipient_insights=person["insights"],
+                email_topics=email_topics,
+            )
+            email = await _prompt_streaming(
+                on_token,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                task="write",
                 provider="openai",
+                cache=not regen,
+                call_site="email_body",
+                person=person["name"],
             )
 
             person["email"] = email
@@ -186,15 +200,18 @@ async def craft_messages(
         else:
             print(f"using cached email for {person['name']}")
 
-        if not person["twitter_handle"] == "NONE":
+        if person.get("twitter_handle", "NONE") != "NONE":
             if not person.get("twitter_message") or regen:
                 # also draft a twitter message
+                system_prompt, user_prompt = assemble(COLD_EMAIL_PROMPTS[2], email=person["email"])
                 twitter_message = await prompt(
-                    user_prompt=COLD_EMAIL_PROMPTS[2].format(
-                        email=person["email"]["body"]
-                    ),
-                    model="gpt-4o",
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    task="write",
                     provider="openai",
+                    cache=not regen,
+                    call_site="twitter_dm",
+                    person=person["name"],
                 )
                 person["twitter_message"] = twitter_message
                 print("generated twitter message")
@@ -240,14 +257,10 @@ async def craft_messages(
 
 
 async def send_gmail(email_address, email_data, page: Page = None):
+    if EMAIL_TRANSPORT == "smtp":
+        return await get_transport().send(email_address, email_data)
     try:
-
-        if type(email_data) == str:
-            email_subject = email_data.split("\n")[0]
-            email_body = "\n".join(email_data.split("\n")[1:]).strip()
-        else:
-            email_subject = email_data["subject"]
-            email_body = email_data["body"]
+        email_subject, email_body = split_email(email_data)
 
         # Click Compose
         await page.click("div.T-I.T-I-KE.L3")
@@ -275,8 +288,10 @@ async def send_gmail(email_address, email_data, page: Page = None):
         # attach_files = page.locator("div[command='+untrackedFile']")
         # await attach_files.click()
 
+        # the resume is read once and handed over from memory, not from disk on every send
+        resume = get_attachment(RESUME_PATH)
         input = page.locator("input[type='file']").nth(2)
-        await input.set_input_files(RESUME_PATH)
+        await input.set_input_files({"name": resume.name, "mimeType": resume.mime_type, "buffer": resume.data})
 
         # Wait a bit for the upload to complete
         await page.wait_for_timeout(2000)
@@ -296,6 +311,13 @@ async def send_gmail(email_address, email_data, page: Page = None):
         return False
 
 
+async def send_gmail_many(email_addresses, email_data, page: Page = None) -> dict:
+    """address -> sent?, over the SMTP pool all at once, or one compose after another in the Gmail tab"""
+    if EMAIL_TRANSPORT == "smtp":
+        return await get_transport().send_many(email_addresses, email_data)
+    return {address: await send_gmail(address, email_data, page) for address in email_addresses}
+
+
 # Example usage
 # asyncio.run(send_gmail_emails(df, sent_emails, subject, template))
 
@@ -0,0 +1,171 @@
+import numpy as np
+
+from utils.person_cache import get_all_cached_persons
+
+NAME_SUFFIXES = {"II", "III", "IV", "JR", "SR", "JR.", "SR."}
+
+# every address format we generate, in the order generate_permutations has always listed them
+PATTERNS = [
+    "first",  # gerardo
+    "last",  # jose
+    "firstlast",  # gerardojose
+    "flast",  # gjose
+    "f.last",  # g.jose
+    "firstl",  # gerardoj
+    "fl",  # gj
+    "first.last",  # gerardo.jose
+    "firstmiddlelast",  # gerardosanjose
+    "firstmlast",  # gerardosjose
+]
+PATTERN_INDEX = {label: i for i, label in enumerate(PATTERNS)}
+# rough share of companies using each format, what a domain we know nothing about is ranked by
+PRIORS = np.array([0.22, 0.03, 0.08, 0.17, 0.04, 0.03, 0.02, 0.37, 0.02, 0.02])
+# how many confirmed addresses the priors are worth, evidence overtakes them quickly
+PRIOR_STRENGTH = 2.0
+# a confirmed address (the mail server accepted it on a domain that isn't catch-all) counts for
+# the format, a bounce (rejected by the verifier or refused at send time) against it. email_sent on
+# its own is no evidence, we only ever send to our own top picks
+CONFIRMED_WEIGHT = 1.0
+BOUNCE_PENALTY = 1.0
+
+
+def name_parts(name: str):
+    """
+    (first, middle, last) lowercased with suffixes (III, Jr., ...) dropped, middle may be '' and
+    so may last for a single-word name
+    """
+    parts = [p for p in name.lower().split() if p.upper() not in NAME_SUFFIXES]
+    if not parts:
+        return None
+    middle = "".join(parts[1:-1]) if len(parts) > 2 else ""
+    return parts[0], middle, parts[-1] if len(parts) > 1 else ""
+
+
+def local_parts(name: str) -> dict:
+    """
+    pattern label -> local part for this name, only the patterns that apply to it. When two
+    patterns give the same local part (Al Al) only the first in PATTERNS order is kept.
+    """
+    parts = name_parts(name)
+    if parts is None:
+        return {}
+    first, middle, last = parts
+    if not last:
+        # Cher, everything else needs a last name
+        return {"first": first}
+    f, l = first[0], last[0]
+    locals_ = {
+        "first": first,
+        "last": last,
+        "firstlast": f"{first}{last}",
+        "flast": f"{f}{last}",
+        "f.last": f"{f}.{last}",
+        "firstl": f"{first}{l}",
+        "fl": f"{f}{l}",
+        "first.last": f"{first}.{last}",
+    }
+    if middle:
+        locals_["firstmiddlelast"] = f"{first}{middle}{last}"
+        locals_["firstmlast"] = f"{first}{middle[0]}{last}"
+    unique = {}
+    for label in PATTERNS:
+        if label in locals_ and locals_[label] not in unique.values():
+            unique[label] = locals_[label]
+    return unique
+
+
+def labeled_permutations(name: str, domain: str) -> list:
+    """[(pattern label, address)] in PATTERNS order"""
+    locals_ = local_parts(name)
+    return [(label, f"{locals_[label]}@{domain}") for label in PATTERNS if label in locals_]
+
+
+def pattern_of(address: str, name: str):
+    """Which pattern label an address follows for this name, None if it's none of ours"""
+    local = address.lower().split("@")[0]
+    for label, candidate in local_parts(name).items():
+        if candidate == local:
+            return label
+    return None
+
+
+def _addresses(value) -> list:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def learn_domain_patterns(domain: str, persons: list = None) -> np.ndarray:
+    """
+    Log-score of every pattern at this domain, from what's in the person cache:
+    email_confirmed and email_bounced (see record_email_evidence). Domains with no history fall
+    back to PRIORS.
+    """
+    persons = get_all_cached_persons(domain) if persons is None else persons
+    evidence = np.zeros(len(PATTERNS))
+    bounces = np.zeros(len(PATTERNS))
+    for person in persons:
+        name = person.get("name")
+        if not name:
+            continue
+        bounced = set(_addresses(person.get("email_bounced")))
+        confirmed = set(_addresses(person.get("email_confirmed")))
+        observations = [(a, CONFIRMED_WEIGHT, evidence) for a in confirmed - bounced]
+        observations += [(a, 1.0, bounces) for a in bounced]
+        for address, weight, counts in observations:
+            label = pattern_of(address, name)
+            if label is not None:
+                counts[PATTERN_INDEX[label]] += weight
+    return np.log(PRIOR_STRENGTH * PRIORS + evidence) - BOUNCE_PENALTY * bounces
+
+
+def record_email_evidence(person, confirmed=(), bounced=()):
+    """Add addresses to the person's email_confirmed / email_bounced, what the ranking learns from"""
+    for field, addresses in (("email_confirmed", confirmed), ("email_bounced", bounced)):
+        known = _addresses(person.get(field))
+        new = [a for a in addresses if a not in known]
+        if new:
+            person[field] = known + new
+
+
+def rank_emails(names: list, domain: str, top_k: int = None, persons: list = None) -> list:
+    """
+    Candidate addresses for each name, most likely first, cut to top_k. The domain's pattern
+    scores are learned once and every name is ranked in one pass over a names x patterns matrix.
+    """
+    scores = learn_domain_patterns(domain, persons)
+    locals_ = [local_parts(name) for name in names]
+    available = np.array([[label in l for label in PATTERNS] for l in locals_], dtype=bool).reshape(
+        len(names), len(PATTERNS)
+    )
+    matrix = np.where(available, scores[None, :], -np.inf)
+    # stable, so ties keep the PATTERNS order
+    order = np.argsort(-matrix, axis=1, kind="stable")
+    counts = available.sum(axis=1)
+
+    ranked = []
+    for row, l, count in zip(order, locals_, counts):
+        keep = count if top_k is None else min(top_k, count)
+        ranked.append([f"{l[PATTERNS[i]]}@{domain}" for i in row[:keep]])
+    return ranked
+
+
+def rank_company_emails(domain: str, persons: list, top_k: int = None) -> list:
+    """Set possible_emails on everyone at a company in one ranking pass"""
+    persons = [p for p in persons if p.get("name")]
+    ranked = rank_emails([p["name"] for p in persons], domain, top_k)
+    for person, emails in zip(persons, ranked):
+        person["possible_emails"] = emails
+    return persons
+
+
+# run from backend/: python -m tools.email_patterns decagon.ai
+if __name__ == "__main__":
+    import sys
+
+    domain = sys.argv[1]
+    scores = learn_domain_patterns(domain)
+    probabilities = np.exp(scores) / np.exp(scores).sum()
+    print(f"📇 Email patterns at {domain}:")
+    for i in np.argsort(-probabilities):
+        print(f"  {PATTERNS[i]:<16}{probabilities[i]:.2f}")
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import smtplib
+from collections import namedtuple
+from email.message import EmailMessage, MIMEPart
+from email.policy import SMTP
+from email.utils import formataddr, formatdate, make_msgid
+
+from CONSTANTS import (
+    RESUME_PATH,
+    SMTP_FROM_NAME,
+    SMTP_HOST,
+    SMTP_PASSWORD,
+    SMTP_POOL_SIZE,
+    SMTP_PORT,
+    SMTP_STARTTLS,
+    SMTP_USER,
+)
+from utils.notifications import notify_user
+
+# data is the raw file (what the gmail upload gets), part the same file already base64-encoded
+Attachment = namedtuple("Attachment", ["name", "mime_type", "data", "sha256", "part"])
+
+TO_PLACEHOLDER = "to-placeholder@invalid"
+
+# sha256 -> Attachment, and (path, mtime, size) -> sha256 so an unchanged file isn't even re-read
+_attachments = {}
+_attachment_hashes = {}
+
+
+def get_attachment(path: str = RESUME_PATH) -> Attachment:
+    """The file ready to attach, read and base64-encoded once per version of the file"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _attachment_hashes.get(key)
+    if digest is None:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in _attachments:
+            name = os.path.basename(path)
+            mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            maintype, subtype = mime_type.split("/", 1)
+            part = MIMEPart()
+            part.set_content(data, maintype=maintype, subtype=subtype, disposition="attachment", filename=name)
+            _attachments[digest] = Attachment(name, mime_type, data, digest, part)
+        _attachment_hashes[key] = digest
+    return _attachments[digest]
+
+
+def split_email(email_data):
+    """(subject, body) from a drafted email, either "subject\\nbody" text or a {subject, body} dict"""
+    if isinstance(email_data, str):
+        return email_data.split("\n")[0], "\n".join(email_data.split("\n")[1:]).strip()
+    return email_data["subject"], email_data["body"]
+
+
+def compile_messages(sender: str, addresses: list, email_data, attachment_path: str = RESUME_PATH) -> dict:
+    """
+    address -> the finished message bytes. The message (with the already-encoded attachment) is
+    serialized once and only the To / Date / Message-ID headers are swapped in per address.
+    """
+    subject, body = split_email(email_data)
+    message = EmailMessage()
+    message["From"] = formataddr((SMTP_FROM_NAME, sender)) if SMTP_FROM_NAME else sender
+    message["To"] = TO_PLACEHOLDER
+    message["Subject"] = subject
+    message.set_content(body)
+    if attachment_path:
+        message.make_mixed()
+        message.attach(get_attachment(attachment_path).part)
+
+    template = message.as_bytes(policy=SMTP)
+    head, tail = template.split(b"To: " + TO_PLACEHOLDER.encode() + b"\r\n", 1)
+    sender_domain = sender.rsplit("@", 1)[-1] if "@" in sender else None
+    compiled = {}
+    for address in addresses:
+        date, message_id = formatdate(localtime=True), make_msgid(domain=sender_domain)
+        if address.isascii():
+            headers = f"To: {address}\r\nDate: {date}\r\nMessage-ID: {message_id}\r\n".encode()
+            compiled[address] = b"".join((head, headers, tail))
+        else:
+            # needs header encoding, let the email package do it
+            message.replace_header("To", address)
+            for name, value in (("Date", date), ("Message-ID", message_id)):
+                del message[name]
+                message[name] = value
+            compiled[address] = message.as_bytes(policy=SMTP)
+    return compiled
+
+
+class SmtpTransport:
+    """
+    Sends over a small pool of logged-in SMTP connections that stay open between sends, so a
+    message costs one DATA exchange instead of connect + TLS + AUTH + a browser compose. Sends to
+    many recipients run on all pooled connections at once. Works with Gmail (smtp.gmail.com:587
+    and an app password) or a local aiosmtpd server for testing (SMTP_STARTTLS=false).
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        user: str = SMTP_USER,
+        password: str = SMTP_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        pool_size: int = SMTP_POOL_SIZE,
+        sender: str = None,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = pool_size
+        self.sender = sender or user
+        self._pool = None
+        self._opened = 0
+        self.stats = {"sent": 0, "failed": 0, "connections": 0, "reconnects": 0}
+        # addresses the server refused outright (5xx on RCPT), no point retrying those
+        self.refused = set()
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        smtp.ehlo()
+        if self.starttls:
+            smtp.starttls()
+            smtp.ehlo()
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        self.stats["connections"] += 1
+        return smtp
+
+    async def _acquire(self):
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+        # open connections lazily, up to pool_size
+        if self._pool.empty() and self._opened < self.pool_size:
+            self._opened += 1
+            try:
+                return await asyncio.to_thread(self._connect)
+            except Exception:
+                self._opened -= 1
+                raise
+        return await self._pool.get()
+
+    def _send_on(self, smtp: smtplib.SMTP, address: str, data: bytes) -> smtplib.SMTP:
+        """Send on a pooled connection, reconnecting once if the server dropped it while idle"""
+        try:
+            smtp.sendmail(self.sender, [address], data)
+            return smtp
+        except smtplib.SMTPServerDisconnected:
+            self.stats["reconnects"] += 1
+            smtp.close()
+            try:
+                smtp = self._connect()
+            except Exception as e:
+                raise smtplib.SMTPServerDisconnected(f"reconnect failed: {type(e).__name__}: {e}") from e
+            smtp.sendmail(self.sender, [address], data)
+            return smtp
+
+    async def _send_bytes(self, address: str, data: bytes):
+        smtp = await self._acquire()
+        try:
+            smtp = await asyncio.to_thread(self._send_on, smtp, address, data)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # the server answered, the session is fine for the next message
+            self._pool.put_nowait(smtp)
+            raise
+        except BaseException:
+            # dropped, timed out or couldn't reconnect: close it and give the slot back so a
+            # later send opens a fresh one
+            smtp.close()
+            self._opened -= 1
+            raise
+        self._pool.put_nowait(smtp)
+
+    async def send_compiled(self, address: str, data: bytes) -> bool:
+        """Send a message from compile_messages(), True if it went out, False (and a notification) if not"""
+        try:
+            await self._send_bytes(address, data)
+            self.stats["sent"] += 1
+            print(f"Email sent to {address}")
+            return True
+        except smtplib.SMTPRecipientsRefused as e:
+            self.stats["failed"] += 1
+            if all(code >= 500 for code, _ in e.recipients.values()):
+                self.refused.add(address)
+            print(f"Email to {address} refused: {e.recipients}")
+            notify_user("Error Sending Email", f"{address} was refused: {e.recipients}", duration=5)
+            return False
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Error sending email to {address}: {e}")
+            notify_user("Error Sending Email", f"Error sending email to {address}: {e}", duration=5)
+            return False
+
+    def compile(self, addresses: list, email_data) -> dict:
+        return compile_messages(self.sender, addresses, email_data)
+
+    async def send(self, address: str, email_data) -> bool:
+        """Same contract as send_gmail: True if it went out, False (and a notification) if not"""
+        return await self.send_compiled(address, self.compile([address], email_data)[address])
+
+    async def send_many(self, addresses: list, email_data) -> dict:
+        """address -> sent?, each address gets its own message, spread over the pool"""
+        compiled = self.compile(addresses, email_data)
+        results = await asyncio.gather(*(self.send_compiled(a, data) for a, data in compiled.items()))
+        return dict(zip(compiled, results))
+
+    async def close(self):
+        while self._pool is not None and not self._pool.empty():
+            smtp = self._pool.get_nowait()
+            try:
+                await asyncio.to_thread(smtp.quit)
+            except smtplib.SMTPException:
+                pass
+        self._opened = 0
+
+
+_transport = None
+
+
+def get_transport() -> SmtpTransport:
+    global _transport
+    if _transport is None:
+        _transport = SmtpTransport()
+    return _transport
+
+
+async def close_transport():
+    """Log out of the pooled SMTP connections, if any were opened"""
+    if _transport is not None:
+        await _transport.close()
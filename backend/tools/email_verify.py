@@ -0,0 +1,213 @@
+import asyncio
+import os
+import smtplib
+import uuid
+
+import diskcache
+
+from CONSTANTS import (
+    EMAIL_VERIFY_CONCURRENCY,
+    EMAIL_VERIFY_FROM,
+    EMAIL_VERIFY_HELO,
+    EMAIL_VERIFY_TIMEOUT,
+)
+
+MX_TTL = 24 * 3600
+DOMAIN_TTL = 7 * 24 * 3600
+ADDRESS_TTL = 7 * 24 * 3600
+
+# verdicts for an address
+VALID = "valid"
+INVALID = "invalid"
+# the server takes any recipient, so RCPT says nothing about this address
+CATCH_ALL = "catch_all"
+# greylisted, timed out, port 25 blocked, ...
+UNKNOWN = "unknown"
+
+
+class DnsResolver:
+    """MX lookups through dnspython (only imported when used)"""
+
+    def __init__(self, timeout: float = EMAIL_VERIFY_TIMEOUT):
+        self.timeout = timeout
+
+    async def mx_hosts(self, domain: str) -> list:
+        """Mail hosts by preference, [] if the domain can't receive mail"""
+        import dns.asyncresolver
+        import dns.resolver
+
+        try:
+            answer = await dns.asyncresolver.resolve(domain, "MX", lifetime=self.timeout)
+        except dns.resolver.NXDOMAIN:
+            return []
+        except dns.resolver.NoAnswer:
+            # no MX record means the domain itself takes mail (implicit MX)
+            return [domain]
+        records = sorted(answer, key=lambda record: record.preference)
+        # a null MX (".") explicitly says no mail
+        return [str(r.exchange).rstrip(".") for r in records if str(r.exchange).rstrip(".")]
+
+
+class SmtpProber:
+    """
+    Asks a mail host whether it would accept each address (RCPT TO) without sending anything.
+    All addresses for a host go through one session. Point port at a local aiosmtpd server to test.
+    """
+
+    def __init__(
+        self,
+        port: int = 25,
+        timeout: float = EMAIL_VERIFY_TIMEOUT,
+        helo: str = EMAIL_VERIFY_HELO,
+        mail_from: str = EMAIL_VERIFY_FROM,
+    ):
+        self.port = port
+        self.timeout = timeout
+        self.helo = helo
+        self.mail_from = mail_from
+
+    async def probe(self, host: str, addresses: list) -> dict:
+        """address -> RCPT reply code. Raises if the host can't be talked to"""
+        return await asyncio.to_thread(self._probe, host, addresses)
+
+    def _probe(self, host: str, addresses: list) -> dict:
+        with smtplib.SMTP(host, self.port, local_hostname=self.helo, timeout=self.timeout) as smtp:
+            smtp.ehlo_or_helo_if_needed()
+            code, message = smtp.mail(self.mail_from)
+            if code >= 400:
+                raise smtplib.SMTPSenderRefused(code, message, self.mail_from)
+            return {address: smtp.rcpt(address)[0] for address in addresses}
+
+
+class EmailVerifier:
+    """
+    Drops addresses a domain's mail server says don't exist. MX hosts, catch-all status and
+    per-address verdicts are cached on disk, and at most `concurrency` SMTP sessions are open at
+    once (one per domain at a time). resolver / prober can be swapped for fakes.
+    """
+
+    def __init__(self, resolver=None, prober=None, concurrency: int = EMAIL_VERIFY_CONCURRENCY, cache_dir: str = None):
+        self.resolver = resolver or DnsResolver()
+        self.prober = prober or SmtpProber()
+        self.concurrency = concurrency
+        self.cache = diskcache.Cache(cache_dir or os.path.join("data", "email_verify_cache"))
+        self._semaphore = None
+        self._domain_locks = {}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def _mx_hosts(self, domain: str) -> list:
+        hosts = self.cache.get(f"mx:{domain}")
+        if hosts is None:
+            hosts = await self.resolver.mx_hosts(domain)
+            self.cache.set(f"mx:{domain}", hosts, expire=MX_TTL)
+        return hosts
+
+    async def _probe(self, hosts: list, addresses: list) -> dict:
+        """RCPT codes from the first mail host that answers, {} if none did"""
+        for host in hosts:
+            try:
+                async with self._get_semaphore():
+                    return await self.prober.probe(host, addresses)
+            except (OSError, smtplib.SMTPException) as e:
+                print(f"📭 Couldn't probe {host}: {type(e).__name__}: {e}")
+        return {}
+
+    async def verify(self, domain: str, addresses: list) -> dict:
+        """address -> VALID / INVALID / CATCH_ALL / UNKNOWN"""
+        domain = domain.lower()
+        lock = self._domain_locks.setdefault(domain, asyncio.Lock())
+        async with lock:
+            verdicts = {a: self.cache.get(f"addr:{a.lower()}") for a in addresses}
+            todo = [a for a, verdict in verdicts.items() if verdict is None]
+            if not todo:
+                return verdicts
+
+            try:
+                hosts = await self._mx_hosts(domain)
+            except Exception as e:
+                # dns timeout / no nameservers / dnspython missing, verifying is best effort
+                print(f"📭 Couldn't look up mail servers for {domain}: {type(e).__name__}: {e}")
+                return {a: verdicts[a] or UNKNOWN for a in addresses}
+            if not hosts:
+                print(f"📭 {domain} doesn't receive mail")
+                for address in todo:
+                    verdicts[address] = INVALID
+                return self._store(verdicts, todo)
+
+            catch_all = self.cache.get(f"catchall:{domain}")
+            if catch_all:
+                return self._store(verdicts, todo, CATCH_ALL)
+
+            # an address nobody has tells us whether the server accepts everything
+            canary = f"no-such-user-{uuid.uuid4().hex[:12]}@{domain}"
+            codes = await self._probe(hosts, todo + ([canary] if catch_all is None else []))
+            if not codes:
+                for address in todo:
+                    verdicts[address] = UNKNOWN
+                # not cached, worth trying again later
+                return verdicts
+
+            canary_code = codes.get(canary)
+            if canary_code is not None and (canary_code < 300 or canary_code >= 500):
+                catch_all = canary_code < 300
+                self.cache.set(f"catchall:{domain}", catch_all, expire=DOMAIN_TTL)
+                if catch_all:
+                    print(f"📬 {domain} is catch-all, can't verify addresses there")
+                    return self._store(verdicts, todo, CATCH_ALL)
+            elif canary in codes:
+                # greylisted / deferred (4xx), catch-all is still an open question
+                catch_all = None
+
+            for address in todo:
+                code = codes.get(address)
+                if code is not None and code < 300 and catch_all is False:
+                    verdicts[address] = VALID
+                elif code is not None and code >= 500:
+                    verdicts[address] = INVALID
+                else:
+                    verdicts[address] = UNKNOWN
+            return self._store(verdicts, todo)
+
+    def _store(self, verdicts: dict, addresses: list, verdict: str = None) -> dict:
+        for address in addresses:
+            if verdict is not None:
+                verdicts[address] = verdict
+            # greylisting / timeouts can clear up, only cache the definite answers
+            if verdicts[address] != UNKNOWN:
+                self.cache.set(f"addr:{address.lower()}", verdicts[address], expire=ADDRESS_TTL)
+        return verdicts
+
+    async def filter_deliverable(self, domain: str, addresses: list) -> list:
+        """addresses minus the ones the server rejected, order kept"""
+        verdicts = await self.verify(domain, addresses)
+        dropped = [a for a in addresses if verdicts[a] == INVALID]
+        if dropped:
+            print(f"📭 Dropping undeliverable {', '.join(dropped)}")
+        return [a for a in addresses if verdicts[a] != INVALID]
+
+    async def verify_many(self, requests: list) -> list:
+        """verify() for many (domain, addresses) pairs at once, sessions bounded by concurrency"""
+        return await asyncio.gather(*(self.verify(domain, addresses) for domain, addresses in requests))
+
+
+_verifier = None
+
+
+def get_verifier() -> EmailVerifier:
+    global _verifier
+    if _verifier is None:
+        _verifier = EmailVerifier()
+    return _verifier
+
+
+# run from backend/: python -m tools.email_verify decagon.ai jesse@decagon.ai jesse.zhang@decagon.ai
+if __name__ == "__main__":
+    import sys
+
+    domain, addresses = sys.argv[1], sys.argv[2:]
+    for address, verdict in asyncio.run(get_verifier().verify(domain, addresses)).items():
+        print(f"{verdict:<10}{address}")
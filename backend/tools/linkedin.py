@@ -4,221 +4,528 @@ import time
 import diskcache
 import hashlib
 import json
+import sys
+from dataclasses import asdict
 from functools import wraps
 from bs4 import BeautifulSoup
 from browser_use import Agent
 from langchain_openai import ChatOpenAI
 import os
-import requests
 
+from CONSTANTS import (
+    EMAIL_TOP_K,
+    EMPLOYEE_TARGET_COUNT,
+    LINKEDIN_CONCURRENCY,
+    LINKEDIN_OFFLINE_BATCH,
+    LINKEDIN_SEARCH_CONCURRENCY,
+    LINKEDIN_SECTION_TTL,
+)
 from PROMPTS import MY_UNIVERSITY
-from utils.person_cache import make_auto_caching
-from utils.prompter import prompt
+from tools.email_patterns import rank_company_emails
+from tools.linkedin_parser import (
+    parse_education,
+    parse_experience,
+    parse_main_profile,
+    parse_posts,
+    profile_from_sections,
+    profile_to_text,
+)
+from tools.proxycurl import fetch_profile, profile_to_sections
+from utils.model_router import MODEL_ROUTES
+from utils.page_pool import get_page_pool
+from utils.person_cache import get_all_cached_persons, get_person_data, make_auto_caching
+from utils.prompter import fetch_batch_results, prompt, prompt_batch, submit_batch_file, write_batch_file
+from utils.snapshot_cache import fetch_page_html
 
 # for testing manually person needs to be a dict with name, profile_link
 
+LINKEDIN_SUMMARY_PROMPT = "Make the following linkedin summary more readable. Make it more readable and easier to understand. Keep it short, concise, don't need a ton of english, just the facts."
+LIKELY_ROLE_PROMPT = "Given this linkedin profile scraping, at the top output their likely role in the company in bold, followed by a summary of all the interesting things from the profile. Keep it short, concise, don't need a ton of english, just the facts."
+
+
+async def _scrape_main_profile(page, profile_link: str) -> dict:
+    """Name, headline and about section from the main profile page"""
+    return parse_main_profile(await fetch_page_html(page, profile_link))
+
+
+async def _scrape_details_section(page, profile_link: str, section: str) -> list:
+    """Structured entries from a /details/<section> page, experience or education"""
+    url = f"{profile_link.rstrip('/')}/details/{section}"
+    print(section, url)
+    html = await fetch_page_html(page, url)
+    parse = parse_experience if section == "experience" else parse_education
+    return [asdict(entry) for entry in parse(html)]
+
+
+async def _scrape_posts(page, profile_link: str, max_posts: int = 5) -> list:
+    """Text of the most recent posts, None if the activity list isn't there"""
+    url = f"{profile_link}/recent-activity/all/"
+    return parse_posts(await fetch_page_html(page, url), max_posts=max_posts)
+
+
+def _content_hash(content) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def stale_linkedin_sections(person: dict) -> list:
+    """Sections that have never been scraped for this person or are past their TTL"""
+    sections = person.get("linkedin_sections") or {}
+    now = time.time()
+    return [
+        section
+        for section, ttl in LINKEDIN_SECTION_TTL.items()
+        if section not in sections or now - sections[section]["fetched_at"] > ttl
+    ]
+
+
 async def scrape_linkedin_profile(
-    person: dict, method: str = "playwright", browser=None, page=None
+    person: dict, method: str = "playwright", browser=None, page=None, summarize=True
 ):
     if method == "playwright":
-        details = {}
-        # get the about section first
-        url = f"{person['profile_link']}"
+        profile_link = person["profile_link"]
 
         try:
-
-            await page.goto(url)
-            await page.wait_for_timeout(3000)
-            html = await page.content()
-            soup = BeautifulSoup(html, "html.parser")
-
             # get the name, and if it's not already set return so that it can be collected and then go back to main function and continue data processing until scraping is called again
-            name_section = soup.select_one("a.ember-view > h1")
-            if name_section:
-                details["name"] = name_section.get_text(strip=True)
-                if not person.get("name"):
-                    person["name"] = details["name"]
+            if not person.get("name"):
+                main = await _scrape_main_profile(page, profile_link)
+                if main.get("name"):
+                    person["name"] = main["name"]
                     return
 
-            # get the quick description
-            quick_description = soup.select_one("div.text-body-medium")
-            if quick_description:
-                details["description"] = quick_description.get_text(strip=True)
-
-            # get the about section, will be the first one under this selector
-            about_section = soup.select_one(
-                'div.inline-show-more-text--is-collapsed span[aria-hidden="true"]'
-            )
-            if about_section:
-                details["about"] = about_section.get_text(strip=True, separator="\n")
-
-            for section in ["experience", "education"]:
-                url = f"{person['profile_link'].rstrip('/')}/details/{section}"
-                print(person["name"], section, url)
-                await page.goto(url)
-                await page.wait_for_timeout(3000)
-                # extract from div.pvs-list__container
-                html = await page.content()
-                soup = BeautifulSoup(html, "html.parser")
-
-                # extract from div.pvs-list__container
-                container = soup.find("div", class_="pvs-list__container")
-
-                if container:
-                    details[section] = container.get_text(strip=True)
-                else:
-                    details[section] = ""
-
-            # want to also scrape posts
-            url = f"{person['profile_link']}/recent-activity/all/"
-            await page.goto(url)
-            await page.wait_for_timeout(3000)
-            html = await page.content()
-            soup = BeautifulSoup(html, "html.parser")
-            post_container = soup.find("ul", class_="justify-center")
-            if post_container:
-                posts = post_container.find_all("li")
-                details["posts"] = []
-                for post in posts[:5]:
-                    post_text = post.get_text(strip=True)
-                    if post_text:
-                        details["posts"].append(post_text)
-
-
-            # combined everything into one string
-            insights = "\n".join(
-                [f"{section}:\n{text}" for section, text in details.items()]
-            )
-
-            print(f"{person['name']} done:\n{insights}")
-            # make summary more readable
-            insights = await prompt(
-                system_prompt="Make the following linkedin summary more readable. Make it more readable and easier to understand. Keep it short, concise, don't need a ton of english, just the facts.",
-                user_prompt=insights,
-                model="gpt-3.5-turbo",
-                provider="openai",
-            )
-            person["linkedin_summary"] = insights
+            # only re-fetch the sections that are missing or past their TTL
+            stale = stale_linkedin_sections(person)
+
+            # the sections are independent once we have the profile link, so fetch them all at once
+            # on pages leased from the shared linkedin pool (which caps how many load at a time)
+            pool = get_page_pool(page.context, "linkedin", LINKEDIN_CONCURRENCY)
+
+            async def leased(fetch, *args):
+                async with pool.lease() as leased_page:
+                    return await fetch(leased_page, profile_link, *args)
+
+            fetchers = {
+                "profile": lambda: leased(_scrape_main_profile),
+                "experience": lambda: leased(_scrape_details_section, "experience"),
+                "education": lambda: leased(_scrape_details_section, "education"),
+                "posts": lambda: leased(_scrape_posts),
+            }
+            results = await asyncio.gather(*(fetchers[section]() for section in stale))
+
+            _store_linkedin_sections(person, dict(zip(stale, results)))
+            if summarize:
+                await summarize_linkedin_profile(person)
 
         except Exception as e:
-            print(f"Error scraping linkedin profile for {person['name']}: {e}")
+            print(f"Error scraping linkedin profile for {person.get('name')}: {e}")
 
     elif method == "proxycurl":
-        headers = {"Authorization": f"Bearer {os.getenv('PROXYCURL_API_KEY')}"}
+        # api backend, no browser needed so whole companies can be enriched at once
+        try:
+            data = await fetch_profile(person["profile_link"])
+            if not data:
+                return
+
+            sections = profile_to_sections(data)
+            if not person.get("name") and sections["profile"].get("name"):
+                person["name"] = sections["profile"]["name"]
+            _store_linkedin_sections(person, sections)
+            if summarize:
+                await summarize_linkedin_profile(person)
 
-        params = {
-            "url": person["profile_link"],
-            "use_cache": "if-present",
-            "fallback_to_cache": "true",
+        except Exception as e:
+            print(f"Error fetching linkedin profile for {person.get('name') or person.get('profile_link')}: {e}")
+
+
+def _store_linkedin_sections(person: dict, fetched: dict):
+    """Store freshly fetched sections (raw text + content hash + fetch time) on the person"""
+    sections = dict(person.get("linkedin_sections") or {})
+    fetched_at = time.time()
+    for section, text in fetched.items():
+        sections[section] = {
+            "text": text,
+            "hash": _content_hash(text),
+            "fetched_at": fetched_at,
         }
+    person["linkedin_sections"] = sections
+    person["linkedin_profile"] = profile_from_sections(sections).to_dict()
+
+
+def _sections_hash(person: dict) -> str:
+    sections = person.get("linkedin_sections") or {}
+    return _content_hash({section: entry["hash"] for section, entry in sections.items()})
+
+
+def needs_linkedin_summary(person: dict) -> bool:
+    """True unless the summary was made from exactly the sections we have now"""
+    return not person.get("linkedin_summary") or person.get(
+        "linkedin_summary_hash"
+    ) != _sections_hash(person)
+
+
+async def summarize_linkedin_profile(person: dict):
+    """Turn the stored sections into linkedin_summary, skipped if no section changed since the last one"""
+    if not needs_linkedin_summary(person):
+        print(f"{person['name']} linkedin unchanged, reusing summary")
+        return
+
+    # compact structured rendering instead of glued page text, far fewer tokens to summarize
+    insights = profile_to_text(profile_from_sections(person["linkedin_sections"]))
+
+    print(f"{person['name']} done:\n{insights}")
+    # make summary more readable
+    insights = await prompt(
+        system_prompt=LINKEDIN_SUMMARY_PROMPT,
+        user_prompt=insights,
+        task="summarize",
+        provider="openai",
+        call_site="linkedin_summary",
+        person=person["name"],
+    )
+    person["linkedin_summary"] = insights
+    person["linkedin_summary_hash"] = _sections_hash(person)
+
+
+async def summarize_linkedin_profiles(persons: list):
+    """summarize_linkedin_profile for many people, packed into as few requests as possible"""
+    todo = [p for p in persons if p.get("linkedin_sections") and needs_linkedin_summary(p)]
+    if not todo:
+        return
+    summaries = await prompt_batch(
+        LINKEDIN_SUMMARY_PROMPT,
+        [profile_to_text(profile_from_sections(p["linkedin_sections"])) for p in todo],
+        task="summarize",
+        provider="openai",
+        call_site="linkedin_summary",
+        persons=[p["name"] for p in todo],
+    )
+    for person, summary in zip(todo, summaries):
+        person["linkedin_summary"] = summary
+        person["linkedin_summary_hash"] = _sections_hash(person)
+
+
+async def enrich_profiles(profiles: list, method: str = "proxycurl") -> list:
+    """Scrape a whole list of profiles at once through the api backend"""
+    await asyncio.gather(*(scrape_linkedin_profile(p, method=method) for p in profiles))
+    return profiles
 
-        response = requests.get(
-            "https://nubela.co/proxycurl/api/v2/linkedin",
-            params=params,
-            headers=headers,
-        )
 
-        if response.status_code != 200:
-            print("Proxycurl error:", response.text)
-            return {}
-
-        data = response.json()
-
-        return {
-            "name": data.get("full_name"),
-            "title": data.get("occupation"),
-            "about": data.get("summary"),
-            "experience": "\n".join(
-                f"{item.get('title', '')} at {item.get('company', {}).get('name', '')}"
-                for item in (data.get("experiences", []) or [])
-            ),
-            "location": data.get("location"),
-            "linkedin": person["profile_link"],
-        }
+EMPLOYEE_KEYWORDS = ["cofounder", "ceo", "cto", MY_UNIVERSITY]
 
 
-async def get_employees(context, company_url: str, domain: str):
-    """
-    Get the people associated with a company.
-    """
-    page = await context.new_page()
+def _parse_people_results(html: str) -> list:
+    """Profiles listed on a company's people tab"""
+    soup = BeautifulSoup(html, "html.parser")
+    profile_links = soup.find_all(
+        "a",
+        href=lambda h: h and "linkedin.com/in/" in h,
+        attrs={"aria-label": re.compile(r"^View .+ profile$")},
+    )
+
     profiles = []
+    for link in profile_links:
+        href = link["href"]
+        href = href.split("?")[0]
+        name_div = link.find("div")
+        name_text = name_div.text.strip() if name_div and name_div.text.strip() else ""
+        if not name_text:
+            aria = link.get("aria-label", "")
+            name_text = aria.replace("View ", "").split("'")[0].strip()
+        if name_text:
+            profiles.append({"name": name_text, "profile_link": href})
+    return profiles
+
+
+async def _search_people(page, company_url, keyword, found, seen, target_count, max_scrolls):
+    """Keep scrolling one keyword search until it stops growing, pushing new profiles into found"""
+    await page.goto(f"{company_url}/people?keywords={keyword}")
+    await page.wait_for_timeout(3000)
+
+    last_count = 0
+    for _ in range(max_scrolls):
+        results = _parse_people_results(await page.content())
+        for profile in results:
+            if profile["profile_link"] not in seen:
+                seen.add(profile["profile_link"])
+                await found.put(profile)
+
+        if len(results) <= last_count or len(seen) >= target_count:
+            break
+        last_count = len(results)
 
-    for keyword in ["cofounder", "ceo", "cto", MY_UNIVERSITY]:
-        url_with_keyword = f"{company_url}/people?keywords={keyword}"
-        await page.goto(url_with_keyword)
-        await page.wait_for_timeout(3000)
         await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+        # past the first couple of screens linkedin wants a click to load more
+        load_more = page.locator("button.scaffold-finite-scroll__load-button")
+        if await load_more.count() and await load_more.first.is_visible():
+            await load_more.first.click()
         await page.wait_for_timeout(2000)
 
-        html = await page.content()
-        soup = BeautifulSoup(html, "html.parser")
 
-        profile_links = soup.find_all(
-            "a",
-            href=lambda h: h and "linkedin.com/in/" in h,
-            attrs={"aria-label": re.compile(r"^View .+ profile$")},
-        )
+async def crawl_employees(
+    context,
+    company_url: str,
+    keywords: list = None,
+    target_count: int = EMPLOYEE_TARGET_COUNT,
+    max_scrolls: int = 10,
+):
+    """
+    Stream the people associated with a company as they're found. The keyword searches run on
+    their own pool of pages (a search keeps its page for the whole scroll), so profile fetches
+    from the linkedin pool aren't stuck behind them. Each one scrolls until its results stop
+    growing or target_count unique profiles have been found overall.
+    """
+    pool = get_page_pool(context, "linkedin-search", LINKEDIN_SEARCH_CONCURRENCY)
+    found = asyncio.Queue()
+    seen = set()
+
+    async def search(keyword):
+        async with pool.lease() as page:
+            try:
+                await _search_people(
+                    page, company_url, keyword, found, seen, target_count, max_scrolls
+                )
+            except Exception as e:
+                print(f"Error searching {company_url} people for {keyword}: {e}")
+
+    async def search_all():
+        await asyncio.gather(*(search(k) for k in keywords or EMPLOYEE_KEYWORDS))
+        await found.put(None)
+
+    searcher = asyncio.create_task(search_all())
+    try:
+        yielded = 0
+        while yielded < target_count:
+            profile = await found.get()
+            if profile is None:
+                break
+            yielded += 1
+            yield profile
+    finally:
+        searcher.cancel()
 
-        for link in profile_links:
-            href = link["href"]
-            href = href.split("?")[0]
-            name_div = link.find("div")
-            name_text = (
-                name_div.text.strip() if name_div and name_div.text.strip() else ""
-            )
-            if not name_text:
-                aria = link.get("aria-label", "")
-                name_text = aria.replace("View ", "").split("'")[0].strip()
-            if not name_text or any(p["profile_link"] == href for p in profiles):
-                continue
-            profiles.append({"name": name_text, "profile_link": href})
 
+async def get_employees(context, company_url: str, domain: str):
+    """
+    Get the people associated with a company.
+    """
+    profiles = [profile async for profile in crawl_employees(context, company_url)]
     print([p["name"] for p in profiles])
     return profiles
 
 
-async def scrape_company_employees(context, company_url: str, domain: str):
+async def _next_batch(queue: asyncio.Queue, max_items: int):
+    """Wait for one item, then take whatever else is already queued. Returns (batch, done)"""
+    item = await queue.get()
+    if item is None:
+        return [], True
+    batch = [item]
+    while len(batch) < max_items and not queue.empty():
+        item = queue.get_nowait()
+        if item is None:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+async def scrape_company_employees(
+    context,
+    company_url: str,
+    domain: str,
+    method: str = "playwright",
+    queue_size: int = 10,
+    batch_size: int = 10,
+    offline: bool = LINKEDIN_OFFLINE_BATCH,
+):
     """
-    1) For each keyword in JOB_KEYWORDS, go to the "people" tab with that keyword.
-    2) Scroll & parse the page to find up to MAX_PEOPLE total.
-    3) Open each profile to gather 'about' and 'experience', then filter via LLM.
+    1) Stream the company's people from the "people" tab keyword searches.
+    2) Scrape each profile's sections (browser or proxycurl).
+    3) Summarize the profile, then pull out their likely role with the LLM.
+    4) Rank everyone's likely email addresses in one pass.
+
+    The stages are connected by bounded queues, so the browser moves on to the next profile
+    while the LLM is still summarizing the previous ones. Throughput is set by the slowest
+    stage instead of the sum of all of them. The LLM stages take whatever has piled up in their
+    queue (up to batch_size) and send it as one batched request.
+
+    offline leaves step 3 to the Batch API: the summaries are submitted as one batch at the end
+    and collect_company_batch() applies them (and then the likely roles) once they're done.
     """
-
-    profiles = await get_employees(context, company_url, domain)
-
-    # scrape linkedin profiles as a first step
     page = await context.new_page()
-    for person in profiles:
-        if not person.get("linkedin_summary"):
-            linkedin = await scrape_linkedin_profile(person, page=page)
-            # prettyify the linkedin summary probably with gpt
-            linkedin = await prompt(
-                system_prompt="Prettyify the following linkedin summary. Make it more readable and easier to understand. Keep it short, concise, don't need a ton of english, just the facts.",
-                user_prompt=linkedin,
-                model="gpt-3.5-turbo",
-                provider="openai",
-            )
-            person["linkedin_summary"] = linkedin
-
-        if not person.get("linkedin_relevant"):
-            # quickly ascertain if this is a good person to email
-            verdict = await prompt(
-                system_prompt="Given this linkedin profile scraping, at the top output their likely role in the company in bold, followed by a summary of all the interesting things from the profile. Keep it short, concise, don't need a ton of english, just the facts.",
-                user_prompt=f"{person['linkedin_summary']}",
-                model="gpt-3.5-turbo",
-                provider="openai",
-            )
-            person["linkedin_relevant"] = verdict
-
-    # When creating new profiles, wrap them in AutoCachingPerson
-    profiles = [make_auto_caching(domain, profile) for profile in profiles]
+    to_summarize = asyncio.Queue(maxsize=queue_size)
+    to_classify = asyncio.Queue(maxsize=queue_size)
+    profiles = []
 
+    async def scrape_stage():
+        try:
+            async for profile in crawl_employees(context, company_url):
+                # When creating new profiles, wrap them in AutoCachingPerson
+                person = get_person_data(domain, profile["name"]) or make_auto_caching(
+                    domain, profile
+                )
+                profiles.append(person)
+                try:
+                    if stale_linkedin_sections(person):
+                        await scrape_linkedin_profile(
+                            person, method=method, page=page, summarize=False
+                        )
+                except Exception as e:
+                    print(f"Error scraping linkedin profile for {person['name']}: {e}")
+                await to_summarize.put(person)
+        finally:
+            await to_summarize.put(None)
+
+    async def summarize_stage():
+        try:
+            done = False
+            while not done:
+                batch, done = await _next_batch(to_summarize, batch_size)
+                try:
+                    if not offline:
+                        await summarize_linkedin_profiles(batch)
+                except Exception as e:
+                    print(f"Error summarizing {len(batch)} linkedin profiles: {e}")
+                for person in batch:
+                    await to_classify.put(person)
+        finally:
+            await to_classify.put(None)
+
+    async def classify_stage():
+        done = False
+        while not done:
+            batch, done = await _next_batch(to_classify, batch_size)
+            # quickly ascertain if these are good people to email
+            todo = [
+                p for p in batch if p.get("linkedin_summary") and not p.get("linkedin_relevant")
+            ]
+            if offline or not todo:
+                continue
+            try:
+                verdicts = await prompt_batch(
+                    LIKELY_ROLE_PROMPT,
+                    [p["linkedin_summary"] for p in todo],
+                    task="classify",
+                    provider="openai",
+                    call_site="linkedin_role",
+                    persons=[p["name"] for p in todo],
+                )
+                for person, verdict in zip(todo, verdicts):
+                    person["linkedin_relevant"] = verdict
+            except Exception as e:
+                print(f"Error classifying {len(todo)} linkedin profiles: {e}")
+
+    try:
+        await asyncio.gather(scrape_stage(), summarize_stage(), classify_stage())
+    finally:
+        await page.close()
+
+    rank_company_emails(domain, profiles, EMAIL_TOP_K)
+    if offline:
+        await submit_company_batch(domain, profiles)
     return profiles
 
 
-# run from root python -m utils.linkedin
-if __name__ == "__main__":
+# ---------------------------- Offline batch mode ----------------------------
+
+# stage -> (instructions, route the model comes from, who still needs it, what it's made from)
+BATCH_STAGES = {
+    "summarize": (
+        LINKEDIN_SUMMARY_PROMPT,
+        "summarize",
+        lambda p: p.get("linkedin_sections") and needs_linkedin_summary(p),
+        lambda p: profile_to_text(profile_from_sections(p["linkedin_sections"])),
+    ),
+    "classify": (
+        LIKELY_ROLE_PROMPT,
+        "classify",
+        lambda p: p.get("linkedin_summary") and not p.get("linkedin_relevant"),
+        lambda p: p["linkedin_summary"],
+    ),
+}
+
+
+def _batch_path(domain: str, name: str) -> str:
+    batch_dir = os.path.join("data", domain, "batches")
+    os.makedirs(batch_dir, exist_ok=True)
+    return os.path.join(batch_dir, name)
+
+
+def _pending_batch(domain: str):
+    path = _batch_path(domain, "pending.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+async def submit_company_batch(domain: str, persons: list = None):
+    """
+    Submit the next stage that has work left for a company's people (summaries first, then likely
+    roles) as one Batch API job, returns the batch id or None if there's nothing to do. One batch
+    per company is in flight at a time, tracked in data/<domain>/batches/pending.json.
+    """
+    pending = _pending_batch(domain)
+    if pending:
+        print(f"Batch {pending['batch_id']} ({pending['stage']}) is still pending for {domain}")
+        return None
+
+    persons = get_all_cached_persons(domain) if persons is None else persons
+    for stage, (instructions, task, needed, text) in BATCH_STAGES.items():
+        todo = [p for p in persons if p.get("name") and needed(p)]
+        if not todo:
+            continue
+        path = write_batch_file(
+            _batch_path(domain, f"{stage}-{int(time.time())}.jsonl"),
+            [{"custom_id": p["name"], "system_prompt": instructions, "user_prompt": text(p)} for p in todo],
+            model=MODEL_ROUTES[task]["models"][0],
+        )
+        batch_id = await submit_batch_file(path)
+        with open(_batch_path(domain, "pending.json"), "w") as f:
+            json.dump({"batch_id": batch_id, "stage": stage, "input": path, "count": len(todo)}, f)
+        print(f"Submitted {len(todo)} {stage} requests for {domain} as batch {batch_id}")
+        return batch_id
+    return None
+
+
+async def collect_company_batch(domain: str) -> bool:
+    """
+    Apply a company's finished batch to its people and submit the next stage, True once there's
+    nothing left pending. Requests that errored are left as they were and go in a later batch.
+    """
+    pending = _pending_batch(domain)
+    if pending is None:
+        return True
+    results = await fetch_batch_results(pending["batch_id"], pending["input"].replace(".jsonl", "-results.jsonl"))
+    if results is None:
+        return False
+
+    persons = {p["name"]: p for p in get_all_cached_persons(domain) if p.get("name")}
+    applied = 0
+    for name, text in results.items():
+        person = persons.get(name)
+        if person is None or text is None:
+            continue
+        if pending["stage"] == "summarize":
+            person["linkedin_summary"] = text
+            person["linkedin_summary_hash"] = _sections_hash(person)
+        else:
+            person["linkedin_relevant"] = text
+        applied += 1
+    print(f"Applied {applied}/{pending['count']} {pending['stage']} results for {domain}")
+
+    os.remove(_batch_path(domain, "pending.json"))
+    return await submit_company_batch(domain, list(persons.values())) is None
+
+
+# run from backend/:
+#   python -m tools.linkedin submit decagon.ai    (offline batch of whatever the cached people still need)
+#   python -m tools.linkedin collect decagon.ai   (apply it once it's done, and submit the next stage)
+if __name__ == "__main__" and len(sys.argv) == 3 and sys.argv[1] in ("submit", "collect"):
+    command, domain = sys.argv[1:]
+    if command == "submit":
+        asyncio.run(submit_company_batch(domain))
+    elif asyncio.run(collect_company_batch(domain)):
+        print(f"Nothing pending for {domain}")
+
+elif __name__ == "__main__":
     from browser_use import Browser, BrowserConfig
     from dotenv import load_dotenv
 
@@ -0,0 +1,247 @@
+import re
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from bs4 import BeautifulSoup
+
+# anything that looks like a date range on a details page, e.g. "Jan 2020 - Present · 4 yrs"
+DATE_RE = re.compile(
+    r"\b(19|20)\d{2}\b|\bPresent\b|^(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\w*\b"
+)
+DURATION_RE = re.compile(r"^\d+\s+(yrs?|mos?)\b")
+# a role's location line: "City, Region[, Country]", "Greater Boston Area", or just the work
+# arrangement, optionally after a " · " ("San Francisco, California · Hybrid", "Remote")
+_PLACE = r"[A-Z][\w.'’-]*(?: (?:[A-Z][\w.'’-]*|of|de|la|del))*"
+_ARRANGEMENT = r"(?:Remote|On-site|Onsite|Hybrid)"
+LOCATION_RE = re.compile(
+    rf"^(?:{_PLACE}(?:, {_PLACE}){{1,2}}|{_PLACE} (?:Area|Metropolitan Area|Bay Area)|{_ARRANGEMENT})"
+    rf"(?: · {_ARRANGEMENT})?$"
+)
+
+
+@dataclass
+class Experience:
+    role: str = ""
+    company: str = ""
+    employment_type: str = ""
+    dates: str = ""
+    duration: str = ""
+    location: str = ""
+    description: str = ""
+
+
+@dataclass
+class Education:
+    school: str = ""
+    degree: str = ""
+    dates: str = ""
+    description: str = ""
+
+
+@dataclass
+class LinkedInProfile:
+    name: str = ""
+    headline: str = ""
+    about: str = ""
+    experience: List[Experience] = field(default_factory=list)
+    education: List[Education] = field(default_factory=list)
+    posts: Optional[List[str]] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# ---------------------------- HTML parsing ----------------------------
+
+
+def parse_main_profile(html: str) -> dict:
+    """Name, headline and about section from the main profile page"""
+    soup = BeautifulSoup(html, "html.parser")
+    details = {}
+
+    name_section = soup.select_one("a.ember-view > h1")
+    if name_section:
+        details["name"] = name_section.get_text(strip=True)
+
+    # get the quick description
+    quick_description = soup.select_one("div.text-body-medium")
+    if quick_description:
+        details["description"] = quick_description.get_text(strip=True)
+
+    # get the about section, will be the first one under this selector
+    about_section = soup.select_one(
+        'div.inline-show-more-text--is-collapsed span[aria-hidden="true"]'
+    )
+    if about_section:
+        details["about"] = about_section.get_text(strip=True, separator="\n")
+    return details
+
+
+def _item_texts(item) -> list:
+    """
+    The visible lines of a details list item. LinkedIn renders every line twice (once for screen
+    readers), the aria-hidden copy is the one we want.
+    """
+    texts = []
+    for span in item.select('span[aria-hidden="true"]'):
+        # skip lines that belong to a nested list item, those get parsed on their own
+        if span.find_parent("li") is not item:
+            continue
+        text = span.get_text(" ", strip=True)
+        if text and (not texts or texts[-1] != text):
+            texts.append(text)
+    return texts
+
+
+def _is_date_line(text: str) -> bool:
+    return len(text) < 60 and bool(DATE_RE.search(text))
+
+
+def _split_dates(text: str):
+    dates, _, duration = text.partition(" · ")
+    return dates.strip(), duration.strip()
+
+
+def _top_level_items(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
+    container = soup.find("div", class_="pvs-list__container")
+    if not container:
+        return []
+    top_list = container.find("ul")
+    return top_list.find_all("li", recursive=False) if top_list else []
+
+
+def _parse_role(texts: list, company: str = "") -> Experience:
+    exp = Experience(company=company)
+    rest = list(texts)
+    if rest:
+        exp.role = rest.pop(0)
+    # second line is "Company · Full-time" unless the role is under a grouped company
+    if rest and not company and not _is_date_line(rest[0]):
+        exp.company, _, exp.employment_type = (p.strip() for p in rest.pop(0).partition(" · "))
+    elif rest and company and not _is_date_line(rest[0]) and len(rest[0]) < 40:
+        exp.employment_type = rest.pop(0)
+    if rest and _is_date_line(rest[0]):
+        exp.dates, exp.duration = _split_dates(rest.pop(0))
+    if rest and LOCATION_RE.match(rest[0]):
+        exp.location = rest.pop(0).split(" · ")[0]
+    exp.description = "\n".join(rest)
+    return exp
+
+
+def parse_experience(html: str) -> List[Experience]:
+    """Roles from a /details/experience page, including several roles grouped under one company"""
+    entries = []
+    for item in _top_level_items(html):
+        texts = _item_texts(item)
+        nested = [li for li in item.select("ul li") if _item_texts(li)]
+        nested_roles = [li for li in nested if any(_is_date_line(t) for t in _item_texts(li))]
+
+        if nested_roles:
+            # "Company / 3 yrs" header with the individual roles underneath
+            company = texts[0] if texts else ""
+            for li in nested_roles:
+                entries.append(_parse_role(_item_texts(li), company=company))
+        elif texts:
+            entries.append(_parse_role(texts))
+    return entries
+
+
+def parse_education(html: str) -> List[Education]:
+    """Schools from a /details/education page"""
+    entries = []
+    for item in _top_level_items(html):
+        texts = _item_texts(item)
+        if not texts:
+            continue
+        edu = Education(school=texts.pop(0))
+        if texts and not _is_date_line(texts[0]):
+            edu.degree = texts.pop(0)
+        if texts and _is_date_line(texts[0]):
+            edu.dates = _split_dates(texts.pop(0))[0]
+        edu.description = "\n".join(texts)
+        entries.append(edu)
+    return entries
+
+
+def parse_posts(html: str, max_posts: int = 5) -> Optional[List[str]]:
+    """Text of the most recent posts, None if the activity list isn't there"""
+    soup = BeautifulSoup(html, "html.parser")
+    post_container = soup.find("ul", class_="justify-center")
+    if not post_container:
+        return None
+
+    posts = []
+    for post in post_container.find_all("li", recursive=False)[:max_posts]:
+        # just the post body if we can find it, not the reactions / buttons around it
+        body = post.select_one("div.update-components-text") or post
+        post_text = body.get_text(" ", strip=True)
+        if post_text:
+            posts.append(post_text)
+    return posts
+
+
+# ---------------------------- Compact text ----------------------------
+
+
+def profile_from_sections(sections: dict) -> LinkedInProfile:
+    """Build the typed profile from the person's stored linkedin_sections"""
+    main = sections.get("profile", {}).get("text") or {}
+
+    def entries(section, cls):
+        text = sections.get(section, {}).get("text") or []
+        # sections scraped before the structured parser existed are one glued string
+        if isinstance(text, str):
+            return [cls(description=text)] if text else []
+        return [cls(**entry) for entry in text]
+
+    return LinkedInProfile(
+        name=main.get("name", ""),
+        headline=main.get("description", ""),
+        about=main.get("about", ""),
+        experience=entries("experience", Experience),
+        education=entries("education", Education),
+        posts=sections.get("posts", {}).get("text"),
+    )
+
+
+def profile_to_text(profile: LinkedInProfile, max_post_chars: int = 300) -> str:
+    """Compact, line-per-fact rendering of a profile for prompts"""
+    lines = []
+    if profile.name:
+        lines.append(f"Name: {profile.name}")
+    if profile.headline:
+        lines.append(f"Headline: {profile.headline}")
+    if profile.about:
+        lines.append(f"About: {profile.about}")
+
+    if profile.experience:
+        lines.append("Experience:")
+        for exp in profile.experience:
+            line = " @ ".join(p for p in (exp.role, exp.company) if p)
+            if exp.dates:
+                line += f" ({exp.dates})"
+            if exp.location:
+                line += f", {exp.location}"
+            if exp.description:
+                line += f": {exp.description}" if line else exp.description
+            lines.append(f"- {line}")
+
+    if profile.education:
+        lines.append("Education:")
+        for edu in profile.education:
+            line = ", ".join(p for p in (edu.school, edu.degree) if p)
+            if edu.dates:
+                line += f" ({edu.dates})"
+            if edu.description:
+                line += f": {edu.description}" if line else edu.description
+            lines.append(f"- {line}")
+
+    if profile.posts:
+        lines.append("Recent posts:")
+        for post in profile.posts:
+            if len(post) > max_post_chars:
+                post = post[:max_post_chars].rsplit(" ", 1)[0] + "..."
+            lines.append(f"- {post}")
+
+    return "\n".join(lines)
@@ -2,12 +2,13 @@ import re
 from llm_osint.tools.search import get_search_tool
 from llm_osint.tools.read_link import get_read_link_tool
 from llm_osint import knowledge_agent, web_agent, cache_utils, llm
-from CONSTANTS import MY_BACKGROUND, MY_VALUES, GATHER_PROMPT, ASK_PROMPT, SCRAPING_INSTRUCTIONS
+from CONSTANTS import MY_BACKGROUND, MY_VALUES, GATHER_PROMPT, ASK_PROMPT, SCRAPING_INSTRUCTIONS, INSIGHTS_TOKEN_BUDGET
 
 from dotenv import load_dotenv
 
-from tools.twitter import scrape_twitter_posts
+from tools.twitter import format_tweets, scrape_twitter_posts
 from utils.prompter import prompt
+from utils.token_budget import build_insights
 
 load_dotenv()
 
@@ -49,8 +50,10 @@ async def crawl_person(browser, context, domain, person: dict):
             twitter_handle = await prompt(
                 system_prompt="Extract the twitter handle from the following text if you are confident that it's the right one. The output should contain ONLY the handle in the format @handle, or NONE if no handle is found.",
                 user_prompt=person["internet_content"],
-                model="gpt-3.5-turbo",
+                task="extract",
                 provider="openai",
+                call_site="osint_twitter_handle",
+                person=person["name"],
             )
 
         person["twitter_handle"] = twitter_handle
@@ -66,10 +69,15 @@ async def crawl_person(browser, context, domain, person: dict):
         else:
             print(f"No twitter handle found for {person['name']} of {domain}")
 
-    insights = f"LinkedIn Summary: {person['linkedin_summary']}\nInternet Content: {person['internet_content']}"
-    if person.get("twitter_summary"):
-        insights += f"\nTwitter Summary: {person['twitter_summary']}"
-    person["insights"] = insights
+    # internet content can be huge, trim the biggest sections so the drafting prompt stays a predictable size
+    person["insights"] = build_insights(
+        {
+            "LinkedIn Summary": person.get("linkedin_summary"),
+            "Internet Content": person["internet_content"],
+            "Twitter Summary": format_tweets(person.get("twitter_summary")),
+        },
+        INSIGHTS_TOKEN_BUDGET,
+    )
 
 
 if __name__ == "__main__":
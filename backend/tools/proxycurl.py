@@ -0,0 +1,150 @@
+import asyncio
+import os
+import random
+from dataclasses import asdict
+
+import diskcache
+import httpx
+
+from CONSTANTS import PROXYCURL_BASE_URL, PROXYCURL_CACHE_TTL, PROXYCURL_CONCURRENCY
+from tools.linkedin_parser import Education, Experience
+
+# shared across every call so connections get pooled and kept alive
+_client = None
+_semaphore = None
+_cache = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=PROXYCURL_BASE_URL,
+            headers={"Authorization": f"Bearer {os.getenv('PROXYCURL_API_KEY')}"},
+            limits=httpx.Limits(
+                max_connections=PROXYCURL_CONCURRENCY,
+                max_keepalive_connections=PROXYCURL_CONCURRENCY,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PROXYCURL_CONCURRENCY)
+    return _semaphore
+
+
+def _get_cache() -> diskcache.Cache:
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(os.path.join("data", "proxycurl_cache"))
+    return _cache
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_profile(profile_link: str, max_retries: int = 4, use_cache: bool = True):
+    """
+    Raw proxycurl person profile for a linkedin url, or None if it couldn't be fetched.
+    Retries 429s / 5xxs with jittered exponential backoff, honoring Retry-After.
+    """
+    cache = _get_cache()
+    if use_cache:
+        cached = cache.get(profile_link)
+        if cached is not None:
+            return cached
+
+    params = {
+        "url": profile_link,
+        "use_cache": "if-present",
+        "fallback_to_cache": "on-error",
+    }
+
+    for attempt in range(max_retries + 1):
+        async with _get_semaphore():
+            try:
+                response = await get_client().get("/api/v2/linkedin", params=params)
+            except httpx.TransportError as e:
+                print(f"Proxycurl connection error for {profile_link}: {e}")
+                response = None
+
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            cache.set(profile_link, data, expire=PROXYCURL_CACHE_TTL)
+            return data
+
+        retryable = response is None or response.status_code == 429 or response.status_code >= 500
+        if not retryable or attempt == max_retries:
+            print("Proxycurl error:", response.text if response is not None else "no response")
+            return None
+
+        delay = 2**attempt + random.uniform(0, 1)
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                delay = float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        # back off outside the semaphore so other profiles can go in the meantime
+        print(f"Proxycurl retry {attempt + 1} for {profile_link} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+def _format_date(date: dict) -> str:
+    if not date:
+        return ""
+    return "/".join(str(date[k]) for k in ("month", "year") if date.get(k))
+
+
+def _date_range(item: dict) -> str:
+    start = _format_date(item.get("starts_at"))
+    end = _format_date(item.get("ends_at")) or "Present"
+    return f"{start} - {end}" if start else ""
+
+
+def profile_to_sections(data: dict) -> dict:
+    """Same section shape the playwright scraper produces: profile, experience, education, posts"""
+    profile = {}
+    if data.get("full_name"):
+        profile["name"] = data["full_name"]
+    if data.get("headline") or data.get("occupation"):
+        profile["description"] = data.get("headline") or data.get("occupation")
+    if data.get("summary"):
+        profile["about"] = data["summary"]
+
+    experience = [
+        Experience(
+            role=item.get("title") or "",
+            company=item.get("company") or "",
+            dates=_date_range(item),
+            location=item.get("location") or "",
+            description=item.get("description") or "",
+        )
+        for item in data.get("experiences") or []
+    ]
+    education = [
+        Education(
+            school=item.get("school") or "",
+            degree=", ".join(
+                p for p in (item.get("degree_name"), item.get("field_of_study")) if p
+            ),
+            dates=_date_range(item),
+            description=item.get("description") or "",
+        )
+        for item in data.get("education") or []
+    ]
+    posts = [a["title"] for a in (data.get("activities") or [])[:5] if a.get("title")]
+
+    return {
+        "profile": profile,
+        "experience": [asdict(e) for e in experience],
+        "education": [asdict(e) for e in education],
+        "posts": posts or None,
+    }
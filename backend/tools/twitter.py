@@ -4,6 +4,33 @@ from browser_use import Agent
 from langchain_openai import ChatOpenAI
 
 from utils.notifications import notify_user
+from utils.snapshot_cache import get_snapshot, put_snapshot
+
+
+async def _load_twitter_profile(handle: str, twitter_url: str, scroll_attempts: int, page) -> str:
+    """Open a profile, follow them if we aren't already, and scroll to load tweets"""
+    await page.goto(twitter_url)
+    await page.wait_for_timeout(3000)
+
+    # Attempt to click the Follow button manually
+    try:
+        follow_text = await page.inner_text("div[data-testid='placementTracking']")
+        if "Follow" in follow_text and not "Following" in follow_text:
+            await page.click("div[data-testid='placementTracking']")
+            print(f"✅ Followed @{handle}")
+        elif "Following" in follow_text:
+            print(f"❌ Already following @{handle}")
+        else:
+            print(f"⚠️ Could not find Follow button for @{handle}")
+    except Exception as e:
+        print(f"⚠️ Could not follow @{handle}: {e}")
+
+    # Scroll to load more content if needed
+    for _ in range(scroll_attempts):
+        await page.mouse.wheel(0, 3000)
+        await page.wait_for_timeout(1500)
+
+    return await page.content()
 
 
 async def scrape_twitter_posts(handle: str, max_tweets=5, scroll_attempts=2, browser=None, page=None) -> list[str]:
@@ -29,28 +56,14 @@ async def scrape_twitter_posts(handle: str, max_tweets=5, scroll_attempts=2, bro
         handle = handle.replace("@", "")
 
     twitter_url = f"https://twitter.com/{handle}"
-    await page.goto(twitter_url)
-    await page.wait_for_timeout(3000)
+    # already looked at (and followed) this profile recently, no need to navigate again
+    html = get_snapshot(twitter_url)
+    if html is None:
+        html = await _load_twitter_profile(handle, twitter_url, scroll_attempts, page)
+        put_snapshot(twitter_url, html)
+    else:
+        print(f"📦 Snapshot hit for {twitter_url}")
 
-    # Attempt to click the Follow button manually
-    try:
-        follow_text = await page.inner_text("div[data-testid='placementTracking']")
-        if "Follow" in follow_text and not "Following" in follow_text:
-            await page.click("div[data-testid='placementTracking']")
-            print(f"✅ Followed @{handle}")
-        elif "Following" in follow_text:
-            print(f"❌ Already following @{handle}")
-        else:
-            print(f"⚠️ Could not find Follow button for @{handle}")
-    except Exception as e:
-        print(f"⚠️ Could not follow @{handle}: {e}")
-
-    # Scroll to load more content if needed
-    for _ in range(scroll_attempts):
-        await page.mouse.wheel(0, 3000)
-        await page.wait_for_timeout(1500)
-
-    html = await page.content()
     soup = BeautifulSoup(html, "html.parser")
 
     tweet_blocks = soup.find_all("article", attrs={"role": "article"})
@@ -69,6 +82,15 @@ async def scrape_twitter_posts(handle: str, max_tweets=5, scroll_attempts=2, bro
     return tweets
 
 
+def format_tweets(tweets) -> str:
+    """Scraped tweets as one tweet per line for prompts"""
+    if not tweets:
+        return ""
+    if isinstance(tweets, str):
+        return tweets
+    return "\n".join(f"- {tweet}" for tweet in tweets)
+
+
 async def send_twitter_dm(username_or_handle: str, message_text: str, page=None):
     try:
         # Normalize handle
@@ -102,10 +124,12 @@ async def send_twitter_dm(username_or_handle: str, message_text: str, page=None)
         # Click send (paper plane icon)
         await page.click("div[data-testid='dmComposerSendButton']")
         print(f"DM sent to @{username}")
+        return True
     except Exception as e:
         print(f"Error sending DM to @{username}: {e}")
         notify_user(
             "Error Sending DM",
             f"Error sending DM to @{username}: {e}",
             duration=5,
-        )
\ No newline at end of file
+        )
+        return False
\ No newline at end of file
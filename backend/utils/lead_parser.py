@@ -0,0 +1,189 @@
+import re
+from urllib.parse import urlparse
+
+URL_RE = re.compile(r"(?:https?://)?(?:www\.)?[a-z0-9.-]+\.[a-z]{2,}(?:/[^\s,;)\]]*)?", re.I)
+# the lookbehinds keep other hosts that merely end in "x" / "linkedin" (netflix.com) out
+LINKEDIN_RE = re.compile(r"(?<![\w.-])(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/([A-Za-z0-9_%-]+)/?", re.I)
+TWITTER_RE = re.compile(
+    r"(?<![\w.-])(?:https?://)?(?:www\.|mobile\.)?(?:x|twitter)\.com/(?!home\b|i/|intent/|search\b)([A-Za-z0-9_]{1,15})\b",
+    re.I,
+)
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@((?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,})\b")
+# @handle that isn't the tail of an email address
+HANDLE_RE = re.compile(r"(?<![\w.])@([A-Za-z0-9_]{1,15})\b")
+NAME_LABEL_RE = re.compile(r"^\s*name\s*[:\-]\s*", re.I)
+HANDLE_LABEL_RE = re.compile(r"^\s*(?:twitter|x)\s*[:\-]\s*", re.I)
+NAME_WORD_RE = re.compile(r"^[A-Z][a-zA-Z'\-]*\.?$|^[A-Z]\.$")
+
+SOCIAL_DOMAINS = {"linkedin.com", "x.com", "twitter.com", "t.co", "lnkd.in"}
+FREEMAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "hotmail.com", "outlook.com", "icloud.com",
+    "me.com", "aol.com", "proton.me", "protonmail.com", "live.com",
+}
+# things that look like domains in notes but are files or languages
+NOT_TLDS = {"js", "py", "md", "txt", "pdf", "png", "jpg", "jpeg", "gif", "csv", "json", "ts", "rs", "go"}
+
+
+def _root_domain(host: str) -> str:
+    host = host.lower().strip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def _domain_candidates(text: str) -> list:
+    candidates = []
+    for match in EMAIL_RE.finditer(text):
+        domain = _root_domain(match.group(1))
+        if domain not in FREEMAIL_DOMAINS and domain not in candidates:
+            candidates.append(domain)
+    # drop emails first so their domains aren't counted as bare domains too
+    for match in URL_RE.finditer(EMAIL_RE.sub(" ", text)):
+        url = match.group(0)
+        host = urlparse(url if "://" in url else f"http://{url}").hostname or ""
+        domain = _root_domain(host)
+        tld = domain.rsplit(".", 1)[-1]
+        if (
+            not domain
+            or tld in NOT_TLDS
+            or any(domain == s or domain.endswith("." + s) for s in SOCIAL_DOMAINS)
+            or domain in FREEMAIL_DOMAINS
+            or domain in candidates
+        ):
+            continue
+        candidates.append(domain)
+    return candidates
+
+
+def _is_name(text: str) -> bool:
+    words = text.split()
+    return 2 <= len(words) <= 4 and all(NAME_WORD_RE.match(w) for w in words)
+
+
+def _name_candidates(lines: list) -> list:
+    candidates = []
+    for line in lines:
+        line = NAME_LABEL_RE.sub("", line).strip()
+        if _is_name(line):
+            candidates.append(line)
+    return candidates
+
+
+def _matches_slug(name: str, slug: str) -> bool:
+    """Every full word of the name shows up in the linkedin slug (jesse zhang ~ thejessezhang)"""
+    slug = re.sub(r"[^a-z]", "", slug.lower())
+    words = [re.sub(r"[^a-z]", "", w.lower()) for w in name.split()]
+    words = [w for w in words if len(w) > 1]
+    return len(words) >= 2 and all(w in slug for w in words)
+
+
+def _pick_name(names: list, lines: list, slug: str = None):
+    """
+    The name, only when it's safe to skip the LLM: "Stanford University" or "Head Of Sales" look
+    just like names. With a linkedin slug the name has to match it, without one it has to be the
+    only capitalized line besides urls / handles.
+    """
+    if slug:
+        matching = [n for n in names if _matches_slug(n, slug)]
+        return matching[0] if len(matching) == 1 else None
+    if len(names) != 1:
+        return None
+    competing = [
+        line
+        for line in lines
+        if line[0].isupper() and NAME_LABEL_RE.sub("", line).strip() != names[0] and not URL_RE.fullmatch(line)
+    ]
+    return None if competing else names[0]
+
+
+def _bare_handles(lines: list) -> list:
+    """
+    [(line, match, rest)] for @handles that are the person's own: alone on their line ("@jesse",
+    "Twitter: @jesse") or right next to the name ("Jesse Zhang @jesse"), rest being the line
+    without the handle. "met at @ycombinator demo day" is a mention, not their handle.
+    """
+    handles = []
+    for line in lines:
+        matches = list(HANDLE_RE.finditer(line))
+        if len(matches) != 1:
+            continue
+        rest = HANDLE_LABEL_RE.sub("", line.replace(matches[0].group(0), " ")).strip(" \t-|,;:()")
+        if not rest or _is_name(NAME_LABEL_RE.sub("", rest).strip()):
+            handles.append((line, matches[0], rest))
+    return handles
+
+
+def _unique(matches: list) -> dict:
+    """handle / slug (lowercased) -> first match, several keys means the lead is ambiguous"""
+    unique = {}
+    for match in matches:
+        unique.setdefault(match.group(1).lower(), match)
+    return unique
+
+
+def extract_lead_fields(text: str):
+    """
+    Pull the fields of a pasted lead that can be read off the text without a model: linkedin and
+    x/twitter urls (or an @handle), the company domain (from a work email or a bare domain / url),
+    and the name when one line plainly is a name (see _pick_name).
+
+    Returns (fields, unresolved) where unresolved lists the fields that are missing or ambiguous
+    and worth asking the LLM about. A missing name is fine when there's a linkedin url (the
+    scraper reads it from the profile), and urls / handles are never guessed: several different
+    ones leave the field to the LLM.
+    """
+    fields = {}
+    consumed = set()
+    unresolved = []
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    slug = None
+    linkedins = _unique(LINKEDIN_RE.finditer(text))
+    if len(linkedins) == 1:
+        linkedin = next(iter(linkedins.values()))
+        slug = linkedin.group(1)
+        fields["linkedin"] = f"https://www.linkedin.com/in/{slug}/"
+        consumed.update(m.group(0) for m in LINKEDIN_RE.finditer(text))
+    elif linkedins:
+        unresolved.append("linkedin")
+
+    bare_handles = _bare_handles(lines)
+    handles = _unique(list(TWITTER_RE.finditer(text)) + [match for _, match, _ in bare_handles])
+    if len(handles) == 1:
+        fields["twitter_handle"] = f"https://x.com/{next(iter(handles.values())).group(1)}"
+        consumed.update(m.group(0) for m in TWITTER_RE.finditer(text))
+        consumed.update(match.group(0) for _, match, _ in bare_handles)
+    elif handles:
+        unresolved.append("twitter_handle")
+
+    domains = _domain_candidates(text)
+    if len(domains) == 1:
+        fields["domain"] = domains[0]
+    else:
+        unresolved.append("domain")
+
+    # "Jesse Zhang @jesse" is a name line once its handle is taken out
+    name_lines = list(lines)
+    if "twitter_handle" in fields:
+        for line, _, rest in bare_handles:
+            name_lines[name_lines.index(line)] = rest
+    name_lines = [line for line in name_lines if line]
+    names = _name_candidates(name_lines)
+    name = _pick_name(names, name_lines, slug)
+    if name:
+        fields["name"] = name
+        consumed.add(name)
+    elif names or "linkedin" not in fields:
+        unresolved.append("name")
+
+    # whatever is left once the extracted bits are taken out goes to notes
+    notes = []
+    for line in lines:
+        rest = NAME_LABEL_RE.sub("", line)
+        for part in consumed:
+            rest = rest.replace(part, "")
+        rest = HANDLE_LABEL_RE.sub("", rest)
+        if rest.strip(" \t-|,;:"):
+            notes.append(line)
+    if notes:
+        fields["notes"] = "\n".join(notes)
+
+    return fields, unresolved
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+import openai
+
+# (requests per minute, tokens per minute) per model, override with LLM_RATE_LIMITS='{"gpt-4o": [500, 30000]}'
+DEFAULT_RATE_LIMITS = {
+    "gpt-3.5-turbo": (3500, 200_000),
+    "gpt-4o": (500, 30_000),
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4": (500, 10_000),
+}
+FALLBACK_RATE_LIMIT = (500, 30_000)
+RATE_LIMITS = {
+    **DEFAULT_RATE_LIMITS,
+    **{k: tuple(v) for k, v in json.loads(os.getenv("LLM_RATE_LIMITS") or "{}").items()},
+}
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Refills continuously up to `per_minute`, acquire() waits until there's enough in the bucket"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        # a single huge request can never exceed the bucket, otherwise it would wait forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class LLMScheduler:
+    """
+    One shared gate in front of every LLM request: caps requests in flight, keeps each model under
+    its requests/tokens per minute budget, and retries rate limits / transient errors with jittered
+    exponential backoff (honoring Retry-After when the API sends it).
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_retries: int = LLM_MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.buckets = {}
+        self.metrics = {
+            "queued": 0,
+            "in_flight": 0,
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+        }
+
+    def _buckets_for(self, model: str):
+        if model not in self.buckets:
+            rpm, tpm = RATE_LIMITS.get(model, FALLBACK_RATE_LIMIT)
+            self.buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return self.buckets[model]
+
+    async def _acquire(self, model: str, estimated_tokens: int):
+        requests_bucket, tokens_bucket = self._buckets_for(model)
+        self.metrics["queued"] += 1
+        start = time.monotonic()
+        try:
+            # the model's own budget first, so a model waiting on its rate limit doesn't sit on a
+            # concurrency slot another model could use
+            await requests_bucket.acquire(1)
+            await tokens_bucket.acquire(estimated_tokens)
+            await self.semaphore.acquire()
+        finally:
+            waited = time.monotonic() - start
+            self.metrics["queued"] -= 1
+            self.metrics["total_wait_s"] += waited
+            self.metrics["max_wait_s"] = max(self.metrics["max_wait_s"], waited)
+
+    def _release(self):
+        self.metrics["in_flight"] -= 1
+        self.semaphore.release()
+
+    def _retry_delay(self, model: str, error: Exception, attempt: int) -> float:
+        """How long to back off before the next attempt, re-raises once retries are used up"""
+        if isinstance(error, openai.RateLimitError):
+            self.metrics["rate_limited"] += 1
+        if attempt == self.max_retries:
+            self.metrics["failures"] += 1
+            raise error
+        delay = _retry_after(error) or min(60, 2**attempt) + random.uniform(0, 1)
+        print(f"⏳ {model} {type(error).__name__}, retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    async def run(self, model: str, estimated_tokens: int, call):
+        """Run `call` (a no-arg coroutine function making one request) under the model's budget"""
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(model, estimated_tokens)
+            self.metrics["in_flight"] += 1
+            self.metrics["requests"] += 1
+            try:
+                return await call()
+            except RETRYABLE_ERRORS as e:
+                delay = self._retry_delay(model, e, attempt)
+            finally:
+                self._release()
+
+            # back off outside the semaphore so other requests can go in the meantime
+            self.metrics["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def stream(self, model: str, estimated_tokens: int, call):
+        """
+        run() for a streaming request, yielding its chunks. The slot is held until the stream is
+        read to the end (or dropped), so long streams count against max_concurrency. Only opening
+        the stream is retried, a stream that breaks halfway raises.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(model, estimated_tokens)
+            self.metrics["in_flight"] += 1
+            self.metrics["requests"] += 1
+            try:
+                stream = await call()
+            except RETRYABLE_ERRORS as e:
+                self._release()
+                delay = self._retry_delay(model, e, attempt)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                try:
+                    async for chunk in stream:
+                        yield chunk
+                finally:
+                    self._release()
+                return
+
+            self.metrics["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def get_metrics(self) -> dict:
+        requests = self.metrics["requests"]
+        return {
+            **self.metrics,
+            "avg_wait_s": self.metrics["total_wait_s"] / requests if requests else 0.0,
+        }
+
+
+def _retry_after(error) -> float:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+scheduler = LLMScheduler()
+
+
+def get_llm_metrics() -> dict:
+    return scheduler.get_metrics()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+# task class -> models to try in order and the latency budget (seconds) a call should finish in.
+# override with MODEL_ROUTES='{"write": {"models": ["gpt-4o"], "latency_budget_s": 60}}'
+DEFAULT_ROUTES = {
+    "extract": {"models": ["gpt-3.5-turbo", "gpt-4o-mini"], "latency_budget_s": 10},
+    "classify": {"models": ["gpt-3.5-turbo", "gpt-4o-mini"], "latency_budget_s": 10},
+    "summarize": {"models": ["gpt-3.5-turbo", "gpt-4o-mini"], "latency_budget_s": 20},
+    "write": {"models": ["gpt-4o", "gpt-4o-mini"], "latency_budget_s": 45},
+}
+MODEL_ROUTES = {**DEFAULT_ROUTES, **json.loads(os.getenv("MODEL_ROUTES") or "{}")}
+
+# a model is degraded when its recent p95 latency is over budget or too many calls fail
+MAX_ERROR_RATE = float(os.getenv("MODEL_MAX_ERROR_RATE", "0.2"))
+HEALTH_WINDOW_S = 300
+HEALTH_MIN_SAMPLES = 5
+
+
+class ModelHealth:
+    """Latency and success of a model's calls over the last HEALTH_WINDOW_S seconds"""
+
+    def __init__(self):
+        self.samples = deque(maxlen=200)
+
+    def observe(self, latency: float, ok: bool):
+        self.samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self):
+        cutoff = time.monotonic() - HEALTH_WINDOW_S
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return self.samples
+
+    def p95(self) -> float:
+        latencies = sorted(latency for _, latency, _ in self._recent())
+        return latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+
+    def error_rate(self) -> float:
+        samples = self._recent()
+        return sum(not ok for _, _, ok in samples) / len(samples) if samples else 0.0
+
+    def degraded(self, latency_budget: float) -> bool:
+        if len(self._recent()) < HEALTH_MIN_SAMPLES:
+            return False
+        return self.p95() > latency_budget or self.error_rate() > MAX_ERROR_RATE
+
+
+class ModelRouter:
+    """
+    Picks the model for a task class. Healthy models go first in their configured order, degraded
+    ones are moved to the back (they recover once their bad samples age out of the window). A call
+    that runs past the latency budget is hedged with the next model and whichever answers first
+    wins; a call that fails falls back to the next model.
+    """
+
+    def __init__(self, routes: dict = MODEL_ROUTES):
+        self.routes = routes
+        self.health = {}
+        self.stats = {"calls": 0, "hedged": 0, "fallbacks": 0, "served": {}}
+
+    def _health(self, model: str) -> ModelHealth:
+        if model not in self.health:
+            self.health[model] = ModelHealth()
+        return self.health[model]
+
+    def latency_budget(self, task: str) -> float:
+        return self.routes[task]["latency_budget_s"]
+
+    def candidates(self, task: str, latency_budget: float = None) -> list:
+        if task not in self.routes:
+            raise ValueError(f"Unknown task class: {task}. Use one of {list(self.routes)}")
+        budget = latency_budget or self.latency_budget(task)
+        models = self.routes[task]["models"]
+        healthy = [m for m in models if not self._health(m).degraded(budget)]
+        return healthy + [m for m in models if m not in healthy]
+
+    def observe(self, model: str, latency: float, ok: bool):
+        self._health(model).observe(latency, ok)
+
+    async def route(self, task: str, call, latency_budget: float = None):
+        """
+        Run `call(model)` (a coroutine function making one request) for the task, returns
+        (result, model that served it)
+        """
+        budget = latency_budget or self.latency_budget(task)
+        models = self.candidates(task, budget)
+        self.stats["calls"] += 1
+        pending = {}
+        tried = 0
+        last_error = None
+
+        def launch():
+            nonlocal tried
+            model = models[tried]
+            tried += 1
+            pending[asyncio.ensure_future(call(model))] = (model, time.monotonic())
+
+        launch()
+        try:
+            while pending:
+                # only worth waiting on a timer while there's another model to hedge with
+                timeout = budget if tried < len(models) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"🐢 {task} over its {budget}s budget, hedging with {models[tried]}")
+                    self.stats["hedged"] += 1
+                    launch()
+                    continue
+
+                for future in done:
+                    model, started = pending.pop(future)
+                    if future.exception() is None:
+                        self.observe(model, time.monotonic() - started, True)
+                        self.stats["served"][model] = self.stats["served"].get(model, 0) + 1
+                        return future.result(), model
+                    last_error = future.exception()
+                    self.observe(model, time.monotonic() - started, False)
+                    print(f"⚠️ {model} failed for {task}: {type(last_error).__name__}")
+
+                if not pending and tried < len(models):
+                    self.stats["fallbacks"] += 1
+                    launch()
+            raise last_error
+        finally:
+            # hedges that lost the race, they were at least this slow
+            for future, (model, started) in pending.items():
+                future.cancel()
+                self.observe(model, time.monotonic() - started, True)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "models": {
+                model: {
+                    "samples": len(health._recent()),
+                    "p95_s": health.p95(),
+                    "error_rate": health.error_rate(),
+                }
+                for model, health in self.health.items()
+            },
+        }
+
+
+router = ModelRouter()
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+OUTBOX_DB = os.path.join("data", "outbox.db")
+
+# seconds between two sends on the same channel, gmail and X both flag accounts that blast messages
+DEFAULT_INTERVALS = {
+    "email": 20,
+    "twitter_dm": 120,
+}
+OUTBOX_INTERVALS = {
+    **DEFAULT_INTERVALS,
+    **json.loads(os.getenv("OUTBOX_INTERVALS") or "{}"),
+}
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# a failed send is retried after 1, 2, 4, ... minutes
+RETRY_BASE_S = 60
+# how often an idle channel looks for due messages when nothing new was enqueued
+IDLE_POLL_S = 30
+
+
+class Undeliverable(Exception):
+    """Raised by a channel's send() when retrying can't help (the address was refused)"""
+
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class Outbox:
+    """
+    Messages waiting to go out, in sqlite so nothing is lost if the server restarts mid-send.
+    Each channel gets its own dispatcher task that sends the oldest due message, then waits out
+    the channel's interval. register() a send(recipient, payload) -> bool per channel, and
+    optionally on_sent(row) / on_failed(row) to record the outcome on the person. send() raising
+    Undeliverable fails the message without retries. A message stored precompiled (mime) reaches
+    send() as payload["mime"].
+    """
+
+    def __init__(self, db_path: str = OUTBOX_DB, intervals: dict = None):
+        self.db_path = db_path
+        self.intervals = intervals or OUTBOX_INTERVALS
+        self._db = None
+        self._channels = {}
+        self._wakeups = {}
+        self._tasks = []
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_path)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    domain TEXT,
+                    person TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    error TEXT,
+                    mime BLOB
+                )
+                """
+            )
+            # outboxes from before messages were stored precompiled
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(messages)")}
+            if "mime" not in columns:
+                self._db.execute("ALTER TABLE messages ADD COLUMN mime BLOB")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS messages_due ON messages (channel, status, next_attempt_at)"
+            )
+            # sends interrupted by a restart go out again
+            self._db.execute("UPDATE messages SET status = ? WHERE status = ?", (PENDING, SENDING))
+            self._db.commit()
+        return self._db
+
+    def register(self, channel: str, send, on_sent=None, on_failed=None):
+        self._channels[channel] = (send, on_sent, on_failed)
+
+    def enqueue(
+        self, channel: str, recipient: str, payload: dict, domain: str = None, person: str = None, mime: bytes = None
+    ):
+        """Queue a message, returns its id, or None if it's already queued or sent"""
+        db = self._get_db()
+        existing = db.execute(
+            "SELECT id FROM messages WHERE channel = ? AND recipient = ? AND person IS ? AND status != ?",
+            (channel, recipient, person, FAILED),
+        ).fetchone()
+        if existing:
+            return None
+        now = time.time()
+        cursor = db.execute(
+            """
+            INSERT INTO messages (channel, recipient, payload, domain, person, status, next_attempt_at, created_at, mime)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (channel, recipient, json.dumps(payload), domain, person, PENDING, now, now, mime),
+        )
+        db.commit()
+        if channel in self._wakeups:
+            self._wakeups[channel].set()
+        return cursor.lastrowid
+
+    def _claim(self, channel: str):
+        """The oldest due message on a channel, marked as sending, or None"""
+        db = self._get_db()
+        row = db.execute(
+            """
+            SELECT * FROM messages WHERE channel = ? AND status = ? AND next_attempt_at <= ?
+            ORDER BY next_attempt_at, id LIMIT 1
+            """,
+            (channel, PENDING, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE messages SET status = ? WHERE id = ?", (SENDING, row["id"]))
+        db.commit()
+        return dict(row)
+
+    def _next_due_in(self, channel: str) -> float:
+        row = self._get_db().execute(
+            "SELECT MIN(next_attempt_at) FROM messages WHERE channel = ? AND status = ?",
+            (channel, PENDING),
+        ).fetchone()
+        if row[0] is None:
+            return IDLE_POLL_S
+        return min(max(row[0] - time.time(), 0), IDLE_POLL_S)
+
+    def _finish(self, row: dict, ok: bool, error: str = None, retry: bool = True) -> str:
+        """Record a send attempt, returns the message's new status"""
+        db = self._get_db()
+        attempts = row["attempts"] + 1
+        if ok:
+            status = SENT
+            db.execute(
+                "UPDATE messages SET status = ?, attempts = ?, sent_at = ?, error = NULL WHERE id = ?",
+                (SENT, attempts, time.time(), row["id"]),
+            )
+        elif not retry or attempts >= OUTBOX_MAX_ATTEMPTS:
+            status = FAILED
+            db.execute(
+                "UPDATE messages SET status = ?, attempts = ?, error = ? WHERE id = ?",
+                (FAILED, attempts, error, row["id"]),
+            )
+        else:
+            status = PENDING
+            retry_at = time.time() + RETRY_BASE_S * 2 ** (attempts - 1)
+            db.execute(
+                "UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, error = ? WHERE id = ?",
+                (PENDING, attempts, retry_at, error, row["id"]),
+            )
+        db.commit()
+        return status
+
+    async def _dispatch(self, channel: str):
+        send, on_sent, on_failed = self._channels[channel]
+        wakeup = self._wakeups[channel]
+        while True:
+            row = self._claim(channel)
+            if row is None:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=self._next_due_in(channel))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            print(f"📤 Sending {channel} to {row['recipient']} (attempt {row['attempts'] + 1})")
+            payload = json.loads(row["payload"])
+            if row["mime"] is not None:
+                payload["mime"] = row["mime"]
+            retry = True
+            try:
+                ok = bool(await send(row["recipient"], payload))
+                error = None if ok else "send failed"
+            except Undeliverable as e:
+                ok, error, retry = False, f"undeliverable: {e}", False
+            except Exception as e:
+                ok, error = False, f"{type(e).__name__}: {e}"
+            status = self._finish(row, ok, error, retry)
+            callback = on_sent if status == SENT else on_failed if status == FAILED else None
+            if callback is not None:
+                try:
+                    callback({**row, "status": status, "error": error, "attempts": row["attempts"] + 1})
+                except Exception as e:
+                    print(f"Error recording {channel} to {row['recipient']}: {e}")
+            await asyncio.sleep(self.intervals.get(channel, 0))
+
+    def start(self):
+        """Start a dispatcher for every registered channel, call from inside the event loop"""
+        for channel in self._channels:
+            if channel not in self._wakeups:
+                self._wakeups[channel] = asyncio.Event()
+                self._tasks.append(asyncio.create_task(self._dispatch(channel)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeups = {}
+
+    def get_messages(self, domain: str = None, person: str = None, limit: int = 100) -> list:
+        query, params = "SELECT * FROM messages WHERE 1 = 1", []
+        if domain:
+            query, params = query + " AND domain = ?", params + [domain]
+        if person:
+            query, params = query + " AND person = ?", params + [person]
+        rows = self._get_db().execute(query + " ORDER BY id DESC LIMIT ?", params + [limit])
+        return [
+            {**dict(r), "payload": json.loads(r["payload"]), "mime": len(r["mime"]) if r["mime"] else None}
+            for r in rows
+        ]
+
+    def get_stats(self) -> dict:
+        """channel -> status -> count"""
+        stats = {}
+        for channel, status, count in self._get_db().execute(
+            "SELECT channel, status, COUNT(*) FROM messages GROUP BY channel, status"
+        ):
+            stats.setdefault(channel, {})[status] = count
+        return stats
+
+
+outbox = Outbox()
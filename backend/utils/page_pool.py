@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+# one pool per (context, site) so the concurrency cap holds across every caller hitting that site
+_pools = {}
+
+
+class PagePool:
+    """
+    Hands out pages from a browser context, at most `size` at a time. Pages are kept open and
+    reused between leases instead of being opened and closed for every navigation.
+    """
+
+    def __init__(self, context, size: int):
+        self.context = context
+        self.size = size
+        self.semaphore = asyncio.Semaphore(size)
+        self.idle = []
+
+    @asynccontextmanager
+    async def lease(self):
+        async with self.semaphore:
+            page = None
+            while self.idle and page is None:
+                candidate = self.idle.pop()
+                if not candidate.is_closed():
+                    page = candidate
+            if page is None:
+                page = await self.context.new_page()
+            try:
+                yield page
+            finally:
+                if not page.is_closed():
+                    self.idle.append(page)
+
+    async def close(self):
+        for page in self.idle:
+            if not page.is_closed():
+                await page.close()
+        self.idle = []
+
+
+async def close_page_pools():
+    """Close every pool's idle pages, on shutdown"""
+    for pool in _pools.values():
+        await pool.close()
+    _pools.clear()
+
+
+def get_page_pool(context, name: str, size: int) -> PagePool:
+    """Get (or create) the shared pool of pages for a site on a context"""
+    key = (id(context), name)
+    if key not in _pools or _pools[key].context is not context:
+        _pools[key] = PagePool(context, size)
+    return _pools[key]
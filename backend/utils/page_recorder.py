@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+RECORDINGS_DIR = os.path.join("data", "recordings")
+
+# images / fonts / video don't affect what the scrapers parse, so they're never recorded and
+# get aborted on replay, which also keeps replays fast
+SKIPPED_RESOURCE_TYPES = {"image", "media", "font"}
+
+
+def _request_key(method: str, url: str, post_data: str = None) -> str:
+    """Stable key for a request: method + url + hash of the body (for POST api calls)"""
+    body_hash = hashlib.sha1((post_data or "").encode()).hexdigest()[:12]
+    return hashlib.sha1(f"{method} {url} {body_hash}".encode()).hexdigest()
+
+
+class PageRecorder:
+    """
+    Records the network responses a browser context receives into data/recordings/<name>/ and
+    serves them back later via playwright routing, so tools/linkedin.py, tools/twitter.py and
+    tools/email.py can be run offline and deterministically against a headless chromium.
+
+    Layout:
+        data/recordings/<name>/index.jsonl   one line per recorded response (last one wins)
+        data/recordings/<name>/bodies/<sha>  raw response bodies, content addressed
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.dir = os.path.join(RECORDINGS_DIR, name)
+        self.bodies_dir = os.path.join(self.dir, "bodies")
+        self.index_path = os.path.join(self.dir, "index.jsonl")
+        # key -> list of entries, replayed in the order they were recorded
+        self.entries = {}
+        # key -> how many times it's been served during replay
+        self.cursors = {}
+        self.misses = []
+
+    def load(self):
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries.setdefault(entry["key"], []).append(entry)
+        return self
+
+    # ---------------------------- Recording ----------------------------
+
+    async def record(self, context):
+        """Start capturing every response that goes through the context"""
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        context.on("response", self._on_response)
+        print(f"🔴 Recording pages into {self.dir}")
+
+    async def _on_response(self, response):
+        request = response.request
+        if request.resource_type in SKIPPED_RESOURCE_TYPES:
+            return
+        # redirects have no body, the final response is what gets replayed
+        if 300 <= response.status < 400:
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            # page navigated away before the body was available
+            return
+
+        body_hash = hashlib.sha256(body).hexdigest()
+        body_path = os.path.join(self.bodies_dir, body_hash)
+        if not os.path.exists(body_path):
+            with open(body_path, "wb") as f:
+                f.write(body)
+
+        entry = {
+            "key": _request_key(request.method, request.url, request.post_data),
+            "method": request.method,
+            "url": request.url,
+            "resource_type": request.resource_type,
+            "status": response.status,
+            "headers": {
+                k: v
+                for k, v in (await response.all_headers()).items()
+                # the body is stored decoded, so these would corrupt the replay
+                if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+            },
+            "body": body_hash,
+            "recorded_at": time.time(),
+        }
+        self.entries.setdefault(entry["key"], []).append(entry)
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    # ---------------------------- Replaying ----------------------------
+
+    async def replay(self, context):
+        """Serve every request from disk, aborting anything that was never recorded"""
+        self.load()
+        self.cursors = {}
+        self.misses = []
+        await context.route("**/*", self._fulfill)
+        print(f"▶️ Replaying {sum(len(v) for v in self.entries.values())} responses from {self.dir}")
+
+    async def _fulfill(self, route):
+        request = route.request
+        key = _request_key(request.method, request.url, request.post_data)
+        entries = self.entries.get(key)
+        if request.resource_type in SKIPPED_RESOURCE_TYPES or not entries:
+            if entries is None and request.resource_type not in SKIPPED_RESOURCE_TYPES:
+                self.misses.append(request.url)
+            await route.abort()
+            return
+
+        # repeated requests to the same url get their responses in recorded order, the last one sticks
+        i = self.cursors.get(key, 0)
+        self.cursors[key] = i + 1
+        entry = entries[min(i, len(entries) - 1)]
+
+        with open(os.path.join(self.bodies_dir, entry["body"]), "rb") as f:
+            body = f.read()
+        await route.fulfill(status=entry["status"], headers=entry["headers"], body=body)
+
+
+async def attach_recorder(context, name: str, mode: str = "record") -> PageRecorder:
+    """Attach a recorder to an existing (e.g. CDP) context in either record or replay mode"""
+    recorder = PageRecorder(name)
+    if mode == "record":
+        await recorder.record(context)
+    elif mode == "replay":
+        await recorder.replay(context)
+    else:
+        raise ValueError(f"Unsupported recording mode: {mode}. Use 'record' or 'replay'")
+    return recorder
+
+
+@asynccontextmanager
+async def replay_context(name: str, headless: bool = True):
+    """
+    Local headless chromium context that serves everything from a recording, e.g.
+
+        async with replay_context("jesse") as context:
+            page = await context.new_page()
+            await scrape_twitter_posts("thejessezhang", page=page)
+    """
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as pw:
+        b = await pw.chromium.launch(headless=headless)
+        context = await b.new_context(viewport={"width": 1920, "height": 1080})
+        recorder = await attach_recorder(context, name, mode="replay")
+        try:
+            yield context
+        finally:
+            if recorder.misses:
+                print(f"⚠️ {len(recorder.misses)} requests weren't in the recording {name}")
+            await context.close()
+            await b.close()
+
+
+# run from backend/:
+#   python -m utils.page_recorder record jesse twitter thejessezhang   (needs the CDP chrome)
+#   python -m utils.page_recorder replay jesse twitter thejessezhang   (offline, headless)
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from tools.linkedin import get_employees
+    from tools.twitter import scrape_twitter_posts
+
+    parser = argparse.ArgumentParser(description="Record or replay the pages a tool visits")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("name", help="Recording name, stored under data/recordings/<name>")
+    parser.add_argument("tool", choices=["page", "twitter", "employees"])
+    parser.add_argument("target", help="URL for page/employees, handle for twitter")
+    args = parser.parse_args()
+
+    async def run_tool(context):
+        page = await context.new_page()
+        start = time.perf_counter()
+        if args.tool == "page":
+            await page.goto(args.target)
+            await page.wait_for_timeout(3000)
+            result = f"{len(await page.content())} chars of html"
+        elif args.tool == "twitter":
+            result = await scrape_twitter_posts(args.target, page=page)
+        else:
+            result = await get_employees(context, args.target, None)
+        print(f"⏱️ {args.tool} took {time.perf_counter() - start:.2f}s")
+        print(result)
+        await page.close()
+
+    async def main():
+        if args.mode == "replay":
+            async with replay_context(args.name) as context:
+                await run_tool(context)
+        else:
+            from CONSTANTS import PAGE_RECORDING
+            from person_processor import initialize_globals
+
+            _, context = await initialize_globals()
+            # initialize_globals already attached a recorder if PAGE_RECORDING is set
+            if PAGE_RECORDING != args.name:
+                await attach_recorder(context, args.name, mode="record")
+            await run_tool(context)
+
+    asyncio.run(main())
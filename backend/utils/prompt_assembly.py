@@ -0,0 +1,38 @@
+import hashlib
+import re
+
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+def prefix_fingerprint(text: str) -> str:
+    """Short hash of a prompt prefix, to see in telemetry which prefixes get provider cache hits"""
+    return hashlib.sha256(text.encode()).hexdigest()[:12] if text else None
+
+
+def assemble(template: str, **variables) -> tuple:
+    """
+    Split a prompt template into (system_prompt, user_prompt) so everything static comes first.
+
+    The providers cache prompts by exact prefix (openai from 1024 tokens on), so per-person data
+    .format()-ed into the middle of a template makes every call a miss on the long static text
+    after it (background, values, example emails). Instead each {placeholder} is swapped for a
+    <name> tag reference and the system prompt is the same for every person; the values go in the
+    user prompt, in the order given (most stable first), wrapped in matching tags. Like .format(),
+    variables the template doesn't use are ignored, and braces that aren't one of the variables
+    are left alone.
+    """
+    used = set(PLACEHOLDER_RE.findall(template))
+    variables = {name: value for name, value in variables.items() if name in used}
+    system_prompt = PLACEHOLDER_RE.sub(
+        lambda m: f"<{m.group(1)}>" if m.group(1) in variables else m.group(0), template
+    ).strip()
+    user_prompt = "\n\n".join(
+        f"<{name}>\n{_render(value)}\n</{name}>" for name, value in variables.items()
+    )
+    return system_prompt, user_prompt
+
+
+def _render(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return "\n".join(str(v) for v in value)
+    return str(value).strip()
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+
+import diskcache
+
+PROMPT_CACHE_DIR = os.path.join("data", "prompt_cache")
+PROMPT_CACHE_SIZE_MB = int(os.getenv("PROMPT_CACHE_SIZE_MB", "256"))
+
+_cache = None
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_prompt_cache() -> diskcache.Cache:
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(
+            PROMPT_CACHE_DIR,
+            size_limit=PROMPT_CACHE_SIZE_MB * 1024 * 1024,
+            eviction_policy="least-recently-used",
+        )
+    return _cache
+
+
+def prompt_cache_key(**params) -> str:
+    """Hash of everything that determines a completion (provider, model, prompts, sampling params)"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def get_cached_response(key: str):
+    response = get_prompt_cache().get(key)
+    if response is None:
+        _stats["misses"] += 1
+    else:
+        _stats["hits"] += 1
+    return response
+
+
+def cache_response(key: str, response: str):
+    get_prompt_cache().set(key, response)
+
+
+def get_prompt_cache_stats() -> dict:
+    cache = get_prompt_cache()
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+        "entries": len(cache),
+        "size_bytes": cache.volume(),
+    }
+
+
+def clear_prompt_cache():
+    get_prompt_cache().clear()
+    _stats.update(hits=0, misses=0)
@@ -1,19 +1,22 @@
 from typing import Optional, Literal
+import asyncio
+import json
 import os
-os.environ["TRANSFORMERS_NO_TF"] = "1"
-# from transformers import pipeline
+import time
 from openai import AsyncOpenAI
 
-_local_model = None
-openai = AsyncOpenAI()
+from utils.llm_scheduler import scheduler
+from utils.model_router import router
+from utils.local_model import local_model
+from utils.prompt_assembly import prefix_fingerprint
+from utils.prompt_cache import cache_response, get_cached_response, prompt_cache_key
+from utils.semantic_cache import semantic_cache_enabled, semantic_lookup, semantic_store
+from utils.telemetry import record_llm_call
+from utils.token_budget import count_tokens
 
-def get_local_model():
-    from transformers import pipeline
-    global _local_model
-    if _local_model is None:
-        # Use a small but capable model for text generation
-        _local_model = pipeline('text-generation', model='TinyLlama/TinyLlama-1.1B-Chat-v1.0')
-    return _local_model
+# retries are handled by the scheduler so they respect the shared rate limits.
+# set OPENAI_BASE_URL to point this at a local fake server for testing
+openai = AsyncOpenAI(max_retries=0, base_url=os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1")
 
 # create quick prompter function where you can specify provider model and prompt
 async def prompt(
@@ -22,7 +25,13 @@ async def prompt(
     model: Optional[str] = None,
     provider: Literal["openai", "google", "local"] = "openai",
     temperature: float = 0.3,
-    max_tokens: int = 1024
+    max_tokens: int = 1024,
+    cache: bool = True,
+    json_mode: bool = False,
+    call_site: Optional[str] = None,
+    person: Optional[str] = None,
+    task: Optional[str] = None,
+    latency_budget: Optional[float] = None,
 ) -> str:
     """
     Generic prompt function that supports both OpenAI and Google Gemini models.
@@ -35,23 +44,159 @@ async def prompt(
         provider: Which AI provider to use ("openai" or "google" or "local")
         temperature: Controls randomness (0-1)
         max_tokens: Maximum number of tokens to generate
+        cache: Serve / store the response from the persistent prompt cache.
+               Turn off for calls that should come out different every time.
+               With SEMANTIC_CACHE on, call sites listed in SEMANTIC_THRESHOLDS also reuse
+               the completion of a near-identical earlier prompt
+        json_mode: Ask the provider for a JSON object response (openai only)
+        call_site: Short tag for where the call comes from (e.g. "email_body"), for telemetry
+        person: Name of the person the call is for, for telemetry
+        task: Task class ("extract", "classify", "summarize", "write") to let the model router
+              pick the openai model instead of passing one, with hedging / fallback to a faster
+              model when the preferred one is slow or failing
+        latency_budget: Seconds the call should finish in, defaults to the task class budget
     
     Returns:
         Generated text response
     """
+    routed = _routed(provider, model, task)
     if provider == "openai":
-        # Use OpenAI's API
-        model = model or os.getenv("OPENAI_MODEL", "gpt-4")
-        response = await openai.chat.completions.create(
+        # routed calls are cached under the task, whichever model ended up serving them
+        model = model or (f"route:{task}" if routed else os.getenv("OPENAI_MODEL", "gpt-4"))
+
+    start = time.perf_counter()
+    tags = dict(
+        call_site=call_site,
+        person=person,
+        provider=provider,
+        model=model,
+        prefix=prefix_fingerprint(system_prompt),
+    )
+
+    key = None
+    if cache:
+        key = prompt_cache_key(
+            provider=provider,
+            model=model,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_mode=json_mode,
+        )
+        cached = get_cached_response(key)
+        if cached is not None:
+            _record(tags, start, "hit")
+            return cached
+
+    semantic = cache and semantic_cache_enabled(call_site)
+    if semantic:
+        # same request apart from the user prompt, the similarity is only over the user prompt
+        scope_key = prompt_cache_key(
+            provider=provider,
+            model=model,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_mode=json_mode,
+        )
+        cached, embedding = await semantic_lookup(call_site, scope_key, user_prompt)
+        if cached is not None:
+            _record(tags, start, "semantic")
+            cache_response(key, cached)
+            return cached
+
+    try:
+        if routed:
+            (response, usage), tags["model"] = await router.route(
+                task,
+                lambda served_model: _complete(
+                    system_prompt, user_prompt, served_model, provider, temperature, max_tokens, json_mode
+                ),
+                latency_budget,
+            )
+        else:
+            response, usage = await _complete(
+                system_prompt, user_prompt, model, provider, temperature, max_tokens, json_mode
+            )
+    except Exception as e:
+        _record(tags, start, "miss" if cache else "off", error=f"{type(e).__name__}: {e}")
+        raise
+    _record(tags, start, "miss" if cache else "off", usage)
+    if cache:
+        cache_response(key, response)
+    if semantic:
+        semantic_store(call_site, scope_key, user_prompt, embedding, response)
+    return response
+
+
+def _routed(provider: str, model: Optional[str], task: Optional[str]) -> bool:
+    """An explicit model always wins over the task's route"""
+    return provider == "openai" and model is None and task is not None
+
+
+def _record(tags: dict, start: float, cache_status: str, usage: tuple = (0, 0, 0), error: str = None):
+    record_llm_call(
+        **tags,
+        prompt_tokens=usage[0],
+        completion_tokens=usage[1],
+        cached_tokens=usage[2],
+        latency_ms=(time.perf_counter() - start) * 1000,
+        cache_status=cache_status,
+        error=error,
+    )
+
+
+def _openai_usage(usage) -> tuple:
+    """
+    (prompt_tokens, completion_tokens, cached_tokens) from an openai usage object, which can be
+    missing. cached_tokens is how much of the prompt prefix the provider had cached
+    """
+    if usage is None:
+        return (0, 0, 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    return (usage.prompt_tokens or 0, usage.completion_tokens or 0, cached_tokens)
+
+
+def _openai_request(
+    system_prompt, user_prompt, model, temperature, max_tokens, json_mode=False, stream=False
+):
+    """
+    Chat completion request, sent through the shared rate-limited scheduler. With stream it's an
+    async iterator of chunks that holds its scheduler slot until it's read to the end.
+    """
+    # rough estimate, ~4 characters per token
+    estimated_tokens = (len(system_prompt) + len(user_prompt)) // 4 + max_tokens
+    return (scheduler.stream if stream else scheduler.run)(
+        model,
+        estimated_tokens,
+        lambda: openai.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            stream=stream,
+            # the last streamed chunk then carries the token usage
+            **({"stream_options": {"include_usage": True}} if stream else {}),
+            **({"response_format": {"type": "json_object"}} if json_mode else {}),
+        ),
+    )
+
+
+async def _complete(
+    system_prompt, user_prompt, model, provider, temperature, max_tokens, json_mode=False
+) -> tuple:
+    """(response text, (prompt_tokens, completion_tokens, cached_tokens))"""
+    if provider == "openai":
+        # Use OpenAI's API
+        response = await _openai_request(
+            system_prompt, user_prompt, model, temperature, max_tokens, json_mode
         )
-        return response.choices[0].message.content.strip()
+        return response.choices[0].message.content.strip(), _openai_usage(response.usage)
     
     # elif provider == "google":
     #     # Use Google's Gemini API
@@ -73,19 +218,274 @@ async def prompt(
     #     return response.text.strip()
     
     elif provider == "local":
-        # Use local LLM for text generation
-        model = get_local_model()
-        
-        # Combine system and user prompts
-        full_prompt = f"{system_prompt}\n\nUser: {user_prompt}\nAssistant:"
-        
-        # Generate response
+        # Use local LLM for text generation, runs off the event loop and batches with other local prompts
+        # The system prompt goes in as the prefix, so its encoded state is reused across calls
+        suffix = f"\n\nUser: {user_prompt}\nAssistant:"
+        full_prompt = f"{system_prompt}{suffix}"
+
         # dumb token override for now
-        max_length = full_prompt.count(" ") + 50
-        response = model(full_prompt, max_new_tokens=128, num_return_sequences=1)[0]['generated_text']
-        
-        # Extract just the assistant's response
-        return response.split("Assistant:")[-1].strip()
-    
+        response = await local_model.generate(suffix, max_new_tokens=128, prefix=system_prompt or None)
+
+        # Extract just the assistant's response, local generation has no usage so count it ourselves
+        response = response.split("Assistant:")[-1].strip()
+        return response, (count_tokens(full_prompt), count_tokens(response), 0)
+
     else:
         raise ValueError(f"Unsupported provider: {provider}. Use 'openai', 'google', or 'local'")
+
+
+async def prompt_stream(
+    system_prompt: str = "",
+    user_prompt: str = "",
+    model: Optional[str] = None,
+    provider: Literal["openai", "google", "local"] = "openai",
+    temperature: float = 0.3,
+    max_tokens: int = 1024,
+    cache: bool = True,
+    call_site: Optional[str] = None,
+    person: Optional[str] = None,
+    task: Optional[str] = None,
+):
+    """
+    Same as prompt(), but an async generator of text deltas as the model writes them, so callers
+    can show output right away. Cache hits and non-streaming providers yield the whole text once.
+    Shares the cache with prompt(), so a streamed completion is a cache hit for prompt() and back.
+    A routed stream can't be hedged once it has started, so it just goes to the healthiest model.
+    """
+    routed = _routed(provider, model, task)
+    if provider == "openai":
+        model = model or (f"route:{task}" if routed else os.getenv("OPENAI_MODEL", "gpt-4"))
+
+    start = time.perf_counter()
+    tags = dict(
+        call_site=call_site,
+        person=person,
+        provider=provider,
+        model=model,
+        prefix=prefix_fingerprint(system_prompt),
+    )
+
+    key = None
+    if cache:
+        key = prompt_cache_key(
+            provider=provider,
+            model=model,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_mode=False,
+        )
+        cached = get_cached_response(key)
+        if cached is not None:
+            _record(tags, start, "hit")
+            yield cached
+            return
+
+    chunks = []
+    usage = (0, 0, 0)
+    if provider == "openai":
+        served_model = router.candidates(task)[0] if routed else model
+        tags["model"] = served_model
+        stream = _openai_request(
+            system_prompt, user_prompt, served_model, temperature, max_tokens, stream=True
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = _openai_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    delta = chunk.choices[0].delta.content
+                    # strip leading whitespace like prompt() does
+                    if not chunks:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    chunks.append(delta)
+                    yield delta
+        except Exception as e:
+            # failing to open the stream and breaking off halfway both count against the model
+            if routed:
+                router.observe(served_model, time.perf_counter() - start, False)
+            _record(tags, start, "miss" if cache else "off", usage, error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            await stream.aclose()
+        if routed:
+            router.observe(served_model, time.perf_counter() - start, True)
+    else:
+        response, usage = await _complete(system_prompt, user_prompt, model, provider, temperature, max_tokens)
+        chunks.append(response)
+        yield response
+
+    _record(tags, start, "miss" if cache else "off", usage)
+    if cache:
+        cache_response(key, "".join(chunks).strip())
+
+
+# ---------------------------- Batching ----------------------------
+
+BATCH_PROMPT = """You will be given a JSON object mapping ids to independent inputs.
+Apply the instructions below to each input separately, as if it were the only one.
+Respond with a JSON object mapping every id to its output as a string.
+
+Instructions:
+{instructions}"""
+
+
+async def prompt_batch(
+    system_prompt: str,
+    items: list,
+    model: Optional[str] = None,
+    provider: Literal["openai", "google", "local"] = "openai",
+    temperature: float = 0.3,
+    max_tokens_per_item: int = 400,
+    batch_size: int = 10,
+    cache: bool = True,
+    call_site: Optional[str] = None,
+    persons: Optional[list] = None,
+    task: Optional[str] = None,
+) -> list:
+    """
+    Run the same instructions over many independent inputs, packing up to batch_size of them into
+    a single JSON-mode request. Outputs come back in the same order as items. Any item the batch
+    response is missing (or a whole batch that fails) falls back to a regular prompt() call.
+    persons optionally names the person each item is for, for telemetry (batched calls are
+    recorded without a person since they cover several).
+    """
+    results = [None] * len(items)
+
+    async def run_chunk(indices):
+        if provider == "openai" and len(indices) > 1:
+            try:
+                response = await prompt(
+                    system_prompt=BATCH_PROMPT.format(instructions=system_prompt),
+                    user_prompt=json.dumps({str(i): items[i] for i in indices}),
+                    model=model,
+                    provider=provider,
+                    temperature=temperature,
+                    max_tokens=max_tokens_per_item * len(indices),
+                    cache=cache,
+                    json_mode=True,
+                    call_site=call_site,
+                    task=task,
+                    # a packed request writes len(indices) outputs, give it that much longer
+                    latency_budget=router.latency_budget(task) * len(indices) if task else None,
+                )
+                outputs = json.loads(response)
+                for i in indices:
+                    output = outputs.get(str(i))
+                    if isinstance(output, str) and output.strip():
+                        results[i] = output.strip()
+            except Exception as e:
+                print(f"Batch of {len(indices)} failed, falling back to single prompts: {e}")
+
+        missing = [i for i in indices if results[i] is None]
+        singles = await asyncio.gather(
+            *(
+                prompt(
+                    system_prompt=system_prompt,
+                    user_prompt=items[i],
+                    model=model,
+                    provider=provider,
+                    temperature=temperature,
+                    max_tokens=max_tokens_per_item,
+                    cache=cache,
+                    call_site=call_site,
+                    person=persons[i] if persons else None,
+                    task=task,
+                )
+                for i in missing
+            )
+        )
+        for i, output in zip(missing, singles):
+            results[i] = output
+
+    chunks = [
+        list(range(start, min(start + batch_size, len(items))))
+        for start in range(0, len(items), batch_size)
+    ]
+    await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return results
+
+
+# offline mode: OpenAI Batch API files, half the price but results can take up to 24h
+
+
+def write_batch_file(
+    path: str,
+    requests: list,
+    model: Optional[str] = None,
+    temperature: float = 0.3,
+    max_tokens: int = 1024,
+) -> str:
+    """
+    Write a Batch API input file. requests is a list of dicts with custom_id, system_prompt and
+    user_prompt.
+    """
+    model = model or os.getenv("OPENAI_MODEL", "gpt-4")
+    with open(path, "w") as f:
+        for request in requests:
+            body = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": request.get("system_prompt", "")},
+                    {"role": "user", "content": request["user_prompt"]},
+                ],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            }
+            f.write(
+                json.dumps(
+                    {
+                        "custom_id": request["custom_id"],
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    }
+                )
+                + "\n"
+            )
+    return path
+
+
+def read_batch_results(path: str) -> dict:
+    """custom_id -> completion text (None for requests that errored) from a Batch API output file"""
+    results = {}
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                content = response["body"]["choices"][0]["message"]["content"]
+                results[record["custom_id"]] = content.strip()
+            else:
+                results[record["custom_id"]] = None
+    return results
+
+
+async def submit_batch_file(path: str) -> str:
+    """Upload a Batch API input file and start the batch, returns the batch id"""
+    with open(path, "rb") as f:
+        uploaded = await openai.files.create(file=f, purpose="batch")
+    batch = await openai.batches.create(
+        input_file_id=uploaded.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} from {path}")
+    return batch.id
+
+
+async def fetch_batch_results(batch_id: str, output_path: str) -> Optional[dict]:
+    """Download and parse a finished batch's results, None if it isn't done yet"""
+    batch = await openai.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        print(f"Batch {batch_id} is {batch.status}")
+        return None
+    content = await openai.files.content(batch.output_file_id)
+    with open(output_path, "wb") as f:
+        f.write(content.read())
+    return read_batch_results(output_path)
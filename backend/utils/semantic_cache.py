@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import re
+
+import numpy as np
+
+# off unless asked for, it pulls in sentence-transformers and an embedding model
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_CACHE_DIR = os.path.join("data", "semantic_cache")
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+# cosine similarity a prompt needs to reuse another's completion, per call site. Only deterministic
+# extraction tasks belong here, never anything that writes to the person
+DEFAULT_THRESHOLDS = {
+    "parse_text": 0.97,
+    "email_extract": 0.98,
+}
+SEMANTIC_THRESHOLDS = {
+    **DEFAULT_THRESHOLDS,
+    **json.loads(os.getenv("SEMANTIC_CACHE_THRESHOLDS") or "{}"),
+}
+
+_model = None
+_disabled = False
+_indexes = {}
+_stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+
+def semantic_cache_enabled(call_site: str) -> bool:
+    return SEMANTIC_CACHE and not _disabled and call_site in SEMANTIC_THRESHOLDS
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[\w@.+-]*\w", text.lower()))
+
+
+def _embed(text: str) -> np.ndarray:
+    # runs on a worker thread, the model is loaded on first use
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+
+        _model = SentenceTransformer(SEMANTIC_CACHE_MODEL, device="cpu")
+        print(f"🧭 Loaded semantic cache model {SEMANTIC_CACHE_MODEL}")
+    return _model.encode(_normalize(text), normalize_embeddings=True).astype(np.float32)
+
+
+def _identities(response: str) -> list:
+    """Who an extraction is about: the name's words, linkedin / x handles and domain of a JSON response"""
+    try:
+        fields = json.loads(response)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(fields, dict):
+        return []
+    identities = []
+    for field in ("name", "linkedin", "twitter_handle", "domain"):
+        value = fields.get(field)
+        if not isinstance(value, str) or not value.strip():
+            continue
+        if field == "name":
+            identities += [w for w in _words(value) if len(w) > 1]
+        else:
+            identities.append(value.lower().rstrip("/").rsplit("/", 1)[-1].lstrip("@"))
+    return identities
+
+
+def _same_subject(cached_text: str, text: str, response: str) -> bool:
+    """
+    A near-duplicate prompt about someone else (same lead template, different person) must not get
+    their completion: the cached name / handles have to be in the new prompt, and the completion
+    can't use words that only the old prompt had (a name in an extracted email)
+    """
+    normalized = _normalize(text)
+    if any(identity not in normalized for identity in _identities(response)):
+        return False
+    only_cached = _words(cached_text) - _words(text)
+    return not (only_cached & _words(response))
+
+
+class SemanticIndex:
+    """
+    Unit-normalized prompt embeddings and their (prompt, completion) for one scope (call site +
+    everything in the request except the user prompt), so a dot product is the cosine similarity.
+    Kept in memory and appended to data/semantic_cache/<scope>.f32 (raw vectors) / .jsonl, the
+    files are only rewritten when they've grown a quarter past SEMANTIC_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, scope: str):
+        self.vectors_path = os.path.join(SEMANTIC_CACHE_DIR, f"{scope}.f32")
+        self.entries_path = os.path.join(SEMANTIC_CACHE_DIR, f"{scope}.jsonl")
+        self.vectors = None
+        self.entries = []
+        if os.path.exists(self.entries_path):
+            self._load()
+        else:
+            self._load_legacy(scope)
+            if not self.entries and os.path.exists(self.vectors_path):
+                os.remove(self.vectors_path)
+
+    def _load(self):
+        with open(self.entries_path, "r") as f:
+            for line in f:
+                try:
+                    self.entries.append(json.loads(line))
+                except ValueError:
+                    # cut off mid-write, everything before it is fine
+                    break
+        vectors = np.fromfile(self.vectors_path, dtype=np.float32) if os.path.exists(self.vectors_path) else None
+        dim = self.entries[0]["dim"] if self.entries else 0
+        count = min(len(self.entries), vectors.size // dim) if dim and vectors is not None else 0
+        consistent = count == len(self.entries) and vectors is not None and vectors.size == count * dim
+        self.entries = self.entries[:count]
+        self.vectors = vectors[: count * dim].reshape(count, dim) if count else None
+        if not consistent:
+            # a crash between the two appends, line them back up before appending more
+            self._rewrite()
+
+    def _load_legacy(self, scope: str):
+        """Stores from before entries were appended (<scope>.npz / .json, responses only)"""
+        npz_path = os.path.join(SEMANTIC_CACHE_DIR, f"{scope}.npz")
+        json_path = os.path.join(SEMANTIC_CACHE_DIR, f"{scope}.json")
+        if not (os.path.exists(npz_path) and os.path.exists(json_path)):
+            return
+        self.vectors = np.load(npz_path)["vectors"].astype(np.float32)
+        with open(json_path, "r") as f:
+            self.entries = [{"text": "", "response": r, "dim": self.vectors.shape[1]} for r in json.load(f)]
+        self._rewrite()
+        os.remove(npz_path)
+        os.remove(json_path)
+
+    def search(self, vector: np.ndarray):
+        """(similarity, entry) of the closest stored prompt"""
+        if self.vectors is None or not self.entries:
+            return 0.0, None
+        similarities = self.vectors @ vector
+        best = int(np.argmax(similarities))
+        return float(similarities[best]), self.entries[best]
+
+    def add(self, vector: np.ndarray, text: str, response: str):
+        entry = {"text": _normalize(text), "response": response, "dim": int(vector.shape[0])}
+        self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+        self.entries.append(entry)
+        if len(self.entries) > SEMANTIC_CACHE_MAX_ENTRIES * 5 // 4:
+            self.vectors = self.vectors[-SEMANTIC_CACHE_MAX_ENTRIES:]
+            self.entries = self.entries[-SEMANTIC_CACHE_MAX_ENTRIES:]
+            self._rewrite()
+            return
+        os.makedirs(SEMANTIC_CACHE_DIR, exist_ok=True)
+        # vector first, a crash in between leaves an extra vector that _load ignores
+        with open(self.vectors_path, "ab") as f:
+            f.write(vector.astype(np.float32).tobytes())
+        with open(self.entries_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _rewrite(self):
+        os.makedirs(SEMANTIC_CACHE_DIR, exist_ok=True)
+        vectors = self.vectors if self.vectors is not None else np.zeros(0, dtype=np.float32)
+        vectors.astype(np.float32).tofile(self.vectors_path)
+        with open(self.entries_path, "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in self.entries)
+
+
+def _get_index(call_site: str, scope_key: str) -> SemanticIndex:
+    scope = f"{call_site}-{scope_key[:16]}"
+    if scope not in _indexes:
+        _indexes[scope] = SemanticIndex(scope)
+    return _indexes[scope]
+
+
+async def semantic_lookup(call_site: str, scope_key: str, text: str):
+    """
+    (cached response or None, embedding of text). Pass the embedding back to semantic_store on a
+    miss so the prompt isn't embedded twice. If the embedding model can't be loaded (e.g.
+    sentence-transformers isn't installed) the cache turns itself off and this is always a miss.
+    """
+    global _disabled
+    try:
+        vector = await asyncio.to_thread(_embed, text)
+    except Exception as e:
+        _disabled = True
+        print(f"⚠️ Semantic cache off, couldn't load {SEMANTIC_CACHE_MODEL}: {type(e).__name__}: {e}")
+        return None, None
+    similarity, entry = _get_index(call_site, scope_key).search(vector)
+    if entry is not None and similarity >= SEMANTIC_THRESHOLDS[call_site]:
+        if _same_subject(entry["text"], text, entry["response"]):
+            _stats["hits"] += 1
+            print(f"🧭 Semantic cache hit for {call_site} ({similarity:.3f})")
+            return entry["response"], vector
+        _stats["rejected"] += 1
+        print(f"🧭 Semantic cache match for {call_site} ({similarity:.3f}) is about someone else, skipping")
+    _stats["misses"] += 1
+    return None, vector
+
+
+def semantic_store(call_site: str, scope_key: str, text: str, vector: np.ndarray, response: str):
+    if vector is None:
+        return
+    _get_index(call_site, scope_key).add(vector, text, response)
+
+
+def get_semantic_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "enabled": SEMANTIC_CACHE and not _disabled,
+        "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+        "entries": {scope: len(index.entries) for scope, index in _indexes.items()},
+    }
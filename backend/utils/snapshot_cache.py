@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from CONSTANTS import SNAPSHOT_TTL
+
+SNAPSHOT_DIR = os.path.join("data", "snapshots")
+URLS_DIR = os.path.join(SNAPSHOT_DIR, "urls")
+BLOBS_DIR = os.path.join(SNAPSHOT_DIR, "blobs")
+
+
+def _url_path(url: str) -> str:
+    return os.path.join(URLS_DIR, hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+
+def _blob_path(content_hash: str) -> str:
+    return os.path.join(BLOBS_DIR, content_hash + ".gz")
+
+
+def get_snapshot(url: str, max_age: float = None):
+    """
+    Cached page content for a url, or None if we don't have it or it's expired. max_age
+    overrides the ttl the snapshot was stored with.
+    """
+    url_path = _url_path(url)
+    if not os.path.exists(url_path):
+        return None
+    try:
+        with open(url_path, "r") as f:
+            entry = json.load(f)
+        age = time.time() - entry["fetched_at"]
+        if age > (entry["ttl"] if max_age is None else max_age):
+            return None
+        with gzip.open(_blob_path(entry["hash"]), "rt", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Bad snapshot for {url}: {e}")
+        return None
+
+
+def put_snapshot(url: str, content: str, ttl: float = SNAPSHOT_TTL) -> str:
+    """Store page content for a url. Blobs are content addressed so identical pages are stored once"""
+    os.makedirs(URLS_DIR, exist_ok=True)
+    os.makedirs(BLOBS_DIR, exist_ok=True)
+
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    blob_path = _blob_path(content_hash)
+    if not os.path.exists(blob_path):
+        with _atomic_write(blob_path) as tmp_path:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(content)
+
+    url_path = _url_path(url)
+    with _atomic_write(url_path) as tmp_path:
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"url": url, "hash": content_hash, "fetched_at": time.time(), "ttl": ttl}, f
+            )
+    return content_hash
+
+
+@contextmanager
+def _atomic_write(path: str):
+    """
+    Yields a temp path next to `path` that's moved into place once written, so a crash halfway
+    never leaves a truncated blob that later reads would serve as the page
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+async def fetch_page_html(page, url: str, wait_ms: int = 3000, ttl: float = SNAPSHOT_TTL) -> str:
+    """page.goto + page.content(), but served from the snapshot cache if we fetched it recently"""
+    html = get_snapshot(url)
+    if html is not None:
+        print(f"📦 Snapshot hit for {url}")
+        return html
+
+    await page.goto(url)
+    await page.wait_for_timeout(wait_ms)
+    html = await page.content()
+    put_snapshot(url, html, ttl)
+    return html
@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import time
+from collections import deque
+
+TELEMETRY_DB = os.path.join("data", "llm_telemetry.db")
+RECENT_CALLS = 1000
+
+# USD per 1M (prompt, completion) tokens, prompt tokens served from the provider's cache cost half
+CACHED_PROMPT_DISCOUNT = 0.5
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4": (30.00, 60.00),
+}
+
+# most recent calls in memory, everything in sqlite
+recent_calls = deque(maxlen=RECENT_CALLS)
+_db = None
+
+
+def _get_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(TELEMETRY_DB), exist_ok=True)
+        _db = sqlite3.connect(TELEMETRY_DB)
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                call_site TEXT,
+                person TEXT,
+                provider TEXT,
+                model TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                latency_ms REAL,
+                cache_status TEXT,
+                cost_usd REAL,
+                error TEXT,
+                cached_tokens INTEGER,
+                prefix TEXT
+            )
+            """
+        )
+        # databases from before cached_tokens / prefix were recorded
+        columns = {row[1] for row in _db.execute("PRAGMA table_info(llm_calls)")}
+        for column, kind in (("cached_tokens", "INTEGER"), ("prefix", "TEXT")):
+            if column not in columns:
+                _db.execute(f"ALTER TABLE llm_calls ADD COLUMN {column} {kind}")
+        _db.commit()
+    return _db
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    prompt_cost = (prompt_tokens - cached_tokens * CACHED_PROMPT_DISCOUNT) * prompt_price
+    return (prompt_cost + completion_tokens * completion_price) / 1_000_000
+
+
+def record_llm_call(
+    call_site: str = None,
+    person: str = None,
+    provider: str = None,
+    model: str = None,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cached_tokens: int = 0,
+    prefix: str = None,
+    latency_ms: float = 0.0,
+    cache_status: str = "off",
+    error: str = None,
+):
+    """
+    Record one prompt() call. cache_status is hit / semantic / miss / off (our caches),
+    cached_tokens the prompt tokens the provider served from its own prefix cache and prefix the
+    fingerprint of the system prompt
+    """
+    call = {
+        "ts": time.time(),
+        "call_site": call_site or "untagged",
+        "person": person,
+        "provider": provider,
+        "model": model,
+        "prompt_tokens": prompt_tokens or 0,
+        "completion_tokens": completion_tokens or 0,
+        "cached_tokens": cached_tokens or 0,
+        "prefix": prefix,
+        "latency_ms": latency_ms,
+        "cache_status": cache_status,
+        "cost_usd": 0.0 if cache_status in ("hit", "semantic") else estimate_cost(
+            model, prompt_tokens or 0, completion_tokens or 0, cached_tokens or 0
+        ),
+        "error": error,
+    }
+    recent_calls.append(call)
+    try:
+        db = _get_db()
+        db.execute(
+            f"INSERT INTO llm_calls ({', '.join(call)}) VALUES ({', '.join('?' for _ in call)})",
+            list(call.values()),
+        )
+        db.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ Couldn't record llm call: {e}")
+
+
+GROUPINGS = ("call_site", "person", "model", "prefix")
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+
+def llm_report(by: str = "call_site", since_hours: float = None) -> list:
+    """Calls, tokens, cost, latency and cache hit rates aggregated by call_site, person, model or prefix"""
+    if by not in GROUPINGS:
+        raise ValueError(f"Unsupported grouping: {by}. Use one of {GROUPINGS}")
+
+    query = f"SELECT {by}, prompt_tokens, completion_tokens, cached_tokens, latency_ms, cache_status, cost_usd, error FROM llm_calls"
+    params = []
+    if since_hours is not None:
+        query += " WHERE ts >= ?"
+        params.append(time.time() - since_hours * 3600)
+
+    groups = {}
+    rows = _get_db().execute(query, params)
+    for key, prompt_tokens, completion_tokens, cached_tokens, latency_ms, cache_status, cost, error in rows:
+        group = groups.setdefault(
+            key or "unknown",
+            {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cached_tokens": 0,
+                "cost_usd": 0.0,
+                "cache_hits": 0,
+                "errors": 0,
+                "latencies": [],
+            },
+        )
+        group["calls"] += 1
+        group["prompt_tokens"] += prompt_tokens or 0
+        group["completion_tokens"] += completion_tokens or 0
+        group["cached_tokens"] += cached_tokens or 0
+        group["cost_usd"] += cost or 0.0
+        group["cache_hits"] += cache_status in ("hit", "semantic")
+        group["errors"] += error is not None
+        group["latencies"].append(latency_ms or 0.0)
+
+    report = []
+    for key, group in groups.items():
+        latencies = group.pop("latencies")
+        report.append(
+            {
+                by: key,
+                **group,
+                "cache_hit_rate": group["cache_hits"] / group["calls"],
+                "cached_token_rate": group["cached_tokens"] / group["prompt_tokens"] if group["prompt_tokens"] else 0.0,
+                "total_latency_s": sum(latencies) / 1000,
+                "p50_latency_ms": _percentile(latencies, 0.5),
+                "p95_latency_ms": _percentile(latencies, 0.95),
+            }
+        )
+    return sorted(report, key=lambda row: row["cost_usd"], reverse=True)
+
+
+# run from backend/: python -m utils.telemetry --by call_site --since 24
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LLM cost and latency by call site / person")
+    parser.add_argument("--by", choices=GROUPINGS, default="call_site")
+    parser.add_argument("--since", type=float, help="Only the last N hours")
+    args = parser.parse_args()
+
+    rows = llm_report(args.by, args.since)
+    print(f"{args.by:<28}{'calls':>7}{'prompt':>10}{'cached':>8}{'compl':>9}{'cost $':>10}{'hit%':>7}{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}")
+    for row in rows:
+        print(
+            f"{str(row[args.by])[:27]:<28}{row['calls']:>7}{row['prompt_tokens']:>10}{row['cached_tokens']:>8}{row['completion_tokens']:>9}"
+            f"{row['cost_usd']:>10.4f}{row['cache_hit_rate'] * 100:>6.0f}%{row['p50_latency_ms']:>9.0f}"
+            f"{row['p95_latency_ms']:>9.0f}{row['total_latency_s']:>9.1f}"
+        )
@@ -0,0 +1,126 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+STOPWORDS = set(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our "
+    "she that the their they this to was we were will with you your".split()
+)
+# below this a section is cut short instead of compressed, a couple of sentences won't fit anyway
+MIN_COMPRESS_TOKENS = 32
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count for the model, ~4 characters per token if tiktoken isn't installed"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def _split_sentences(text: str) -> list:
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", line) if s.strip())
+    return sentences
+
+
+def compress_text(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Extractive compression: keep the sentences that carry the most frequent (non stopword) terms
+    of the text, in their original order, until max_tokens is used up.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    sentences = _split_sentences(text)
+    words = lambda s: [w for w in re.findall(r"[a-z0-9']+", s.lower()) if w not in STOPWORDS]
+    frequencies = Counter(w for s in sentences for w in words(s))
+
+    def score(sentence):
+        terms = words(sentence)
+        return sum(frequencies[w] for w in set(terms)) / (len(terms) ** 0.5) if terms else 0
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+    kept, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(sentences[i], model) + 1
+        if used + cost <= max_tokens:
+            kept.add(i)
+            used += cost
+
+    if not kept:
+        # a single sentence bigger than the whole budget, just cut it
+        return truncate_tokens(text, max_tokens, model)
+    return "\n".join(sentences[i] for i in sorted(kept))
+
+
+def fit_sections(sections: dict, budget: int, model: str = "gpt-4o") -> dict:
+    """
+    Shrink named text sections so together they fit in `budget` tokens. Small sections are left
+    alone and the largest ones are compressed down to a shared cap (water-filling), so one huge
+    section (e.g. OSINT internet content) can't crowd out the rest. Caps too small to compress
+    into are truncated outright (a cap of 0 drops the section). Logs what was cut.
+    """
+    sizes = {name: count_tokens(text, model) for name, text in sections.items() if text}
+    total = sum(sizes.values())
+    if total <= budget:
+        return dict(sections)
+
+    # find the largest cap such that sum(min(size, cap)) <= budget
+    remaining, cap = max(budget, 0), 0
+    ordered = sorted(sizes.items(), key=lambda item: item[1])
+    for i, (_, size) in enumerate(ordered):
+        share = remaining // (len(ordered) - i)
+        if size <= share:
+            remaining -= size
+        else:
+            cap = share
+            break
+
+    fitted = dict(sections)
+    trimmed = []
+    for name, size in sizes.items():
+        if size <= cap:
+            continue
+        if cap >= MIN_COMPRESS_TOKENS:
+            fitted[name] = compress_text(sections[name], cap, model)
+        elif cap > 0:
+            fitted[name] = truncate_tokens(sections[name], cap, model)
+        else:
+            fitted[name] = ""
+        # the character estimate (no tiktoken) can land a token over, cut whatever is left over
+        if count_tokens(fitted[name], model) > cap:
+            fitted[name] = truncate_tokens(fitted[name], cap - 1, model) if cap > 1 else ""
+        trimmed.append(name)
+        print(f"✂️ {name}: {size} -> {count_tokens(fitted[name], model)} tokens")
+    fitted_total = sum(count_tokens(text, model) for text in fitted.values() if text)
+    print(f"✂️ Trimmed {', '.join(trimmed)} to fit the budget: {total} -> {fitted_total} tokens (budget {budget})")
+    return fitted
+
+
+def build_insights(sections: dict, budget: int, model: str = "gpt-4o", separator: str = "\n") -> str:
+    """Join labeled sections into an insights blob that fits the token budget"""
+    fitted = fit_sections(sections, budget, model)
+    return separator.join(f"{name}: {text}" for name, text in fitted.items() if text)
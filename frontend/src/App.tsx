@@ -3,11 +3,17 @@ import { PersonCard } from "./components/PersonCard";
 import {
   generatePersonContent,
   sendPerson,
+  getOutbox,
   getCompanyPeople,
   getCompletePeopleRecords,
   Person,
+  SendResult,
 } from "./api";
 
+const OUTBOX_POLL_MS = 5000;
+// retries back off for a while, stop watching after this long
+const OUTBOX_WATCH_MS = 30 * 60 * 1000;
+
 interface NewPersonCard {
   id: string; // Temporary ID for new cards
   timestamp: number; // For ordering
@@ -89,21 +95,52 @@ function App() {
     }
   };
 
+  // the outbox sends in the background, poll it until everything queued for the person is done
+  const watchDelivery = (person: SendResult) => {
+    const startedAt = Date.now();
+    const intervalId = setInterval(async () => {
+      try {
+        const { messages } = await getOutbox(person.domain, person.name);
+        const queued = messages.filter((m) => person.queued.includes(m.id));
+        const done = queued.every((m) => m.status === "sent" || m.status === "failed");
+        if (!done && Date.now() - startedAt < OUTBOX_WATCH_MS) return;
+        clearInterval(intervalId);
+
+        const sentEmails = queued.filter((m) => m.channel === "email" && m.status === "sent");
+        const sentDm = queued.some((m) => m.channel === "twitter_dm" && m.status === "sent");
+        const failed = queued.filter((m) => m.status === "failed");
+        if (sentEmails.length || sentDm) {
+          setSuccess(
+            `Sent to ${person.name}: ${
+              sentEmails.length ? `emails ${sentEmails.map((m) => m.recipient).join(", ")}` : ""
+            }${sentDm ? `${sentEmails.length ? " and " : ""}the twitter message` : ""}`
+          );
+        }
+        if (failed.length) {
+          setError(`Failed to send to ${failed.map((m) => m.recipient).join(", ")} for ${person.name}`);
+        }
+        // picks up email_sent / twitter_message_sent the outbox recorded
+        fetchCompletePeopleRecords();
+      } catch (err) {
+        console.error("Failed to check the outbox:", err);
+      }
+    }, OUTBOX_POLL_MS);
+  };
+
   const handleSendPerson = async (person: Person, email2: string) => {
     try {
       person.email2 = email2;
       const person2 = await sendPerson(person);
-      if (person2.email_sent && person2.twitter_message_sent) {
-        setCompletePeople((prev) => [...prev, person2]);
-        setReviewingPeople((prev) =>
-          prev.filter((p) => { console.log(p.name, person2.name); return p.name !== person2.name; })
-        );
+      if (person2.queued.length || person2.email_sent?.length) {
+        setCompletePeople((prev) => [...prev.filter((p) => p.name !== person2.name), person2]);
+        setReviewingPeople((prev) => prev.filter((p) => p.name !== person2.name));
+      }
+      if (person2.queued.length) {
+        setSuccess(`Queued ${person2.queued.length} message(s) for ${person2.name}, sending in the background`);
+        watchDelivery(person2);
+      } else {
+        setSuccess(`Nothing new to send for ${person2.name}`);
       }
-      setSuccess(
-        `Successfully sent to emails ${person2.email_sent?.join(", ")}${
-          person2.twitter_message_sent && " and the twitter message"
-        }`
-      );
     } catch (err) {
       setError(`Failed to send outreach for ${person.name}`);
       console.error(err);
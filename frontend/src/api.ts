@@ -25,11 +25,33 @@ export async function generatePersonContent(text: string): Promise<Person> {
   return res.data;
 }
 
-export async function sendPerson(person: Person): Promise<Person> {
+export interface OutboxMessage {
+  id: number;
+  channel: "email" | "twitter_dm";
+  recipient: string;
+  status: "pending" | "sending" | "sent" | "failed";
+  attempts: number;
+  error?: string | null;
+}
+
+// the person as saved, plus the ids of the outbox messages queued for them
+export interface SendResult extends Person {
+  queued: number[];
+}
+
+export async function sendPerson(person: Person): Promise<SendResult> {
   const res = await axios.post(`${API_BASE}/api/send-person`, { person });
   return res.data;
 }
 
+export async function getOutbox(
+  domain: string,
+  name: string
+): Promise<{ messages: OutboxMessage[] }> {
+  const res = await axios.get(`${API_BASE}/api/outbox`, { params: { domain, name } });
+  return res.data;
+}
+
 interface CompanyPersonRecord {
   name: string;
   profile_link: string;